@@ -0,0 +1,192 @@
+from flask import Blueprint, render_template, request, session, flash, redirect, url_for
+from datetime import date, timedelta
+
+from db import dialect, get_db
+from humantime import utcnow
+
+# --- SLA analytics: reads come from the rollup tables the triggers maintain (see migrations/0009) ---
+GRAINS = ('hour', 'day', 'week')
+PERCENTILES = (50, 75, 90, 95, 99)
+DEFAULT_RANGE_DAYS = 30
+# Hourly buckets beyond this are better read as days
+MAX_HOURLY_DAYS = 31
+# upper_seconds of the catch-all last bin in sla_bins
+OVERFLOW_SECONDS = 1e17
+
+class ReportError(ValueError):
+    """Raised for a report range or grain the rollups can't answer."""
+
+# --- Rebuilding from stored rows ---
+BUCKET_SQL = {
+    'sqlite': {'hour': "strftime('%Y-%m-%d %H:00:00', {0})", 'day': 'date({0})'},
+    'postgresql': {'hour': "to_char({0}, 'YYYY-MM-DD HH24:00:00')", 'day': "to_char({0}, 'YYYY-MM-DD')"},
+}
+SECONDS_SQL = {
+    'sqlite': 'max(0, (julianday(closed_at) - julianday(created_at)) * 86400)',
+    'postgresql': 'greatest(0, extract(epoch FROM closed_at - created_at))',
+}
+
+# Every close still on record: transitions where they exist, closed_at for older and archived tickets
+CLOSES_CTE = '''
+    WITH closes (created_at, closed_at) AS (
+        SELECT t.created_at, x.changed_at FROM ticket_transitions x JOIN tickets t ON t.id = x.ticket_id
+        WHERE x.to_status = 'Closed'
+        UNION ALL
+        SELECT t.created_at, coalesce(t.closed_at, t.updated_at) FROM tickets t
+        WHERE t.status = 'Closed' AND NOT EXISTS (
+            SELECT 1 FROM ticket_transitions x WHERE x.ticket_id = t.id AND x.to_status = 'Closed')
+        UNION ALL
+        SELECT created_at, coalesce(closed_at, updated_at) FROM tickets_archive WHERE status = 'Closed'
+    )
+'''
+
+def rebuild_rollups(db):
+    """Recount the rollups from stored tickets, transitions and comments. Callers commit.
+
+    Deleted tickets drop out of the counts, and reopens are only known from recorded transitions.
+    """
+    name = dialect(db)
+    seconds = SECONDS_SQL[name]
+    db.execute('DELETE FROM ticket_rollups')
+    db.execute('DELETE FROM close_time_histogram')
+    for grain in ('hour', 'day'):
+        bucket = BUCKET_SQL[name][grain].format
+        db.execute(CLOSES_CTE + '''
+            INSERT INTO ticket_rollups (grain, bucket, opened, closed, reopened, comments, close_seconds)
+            SELECT ?, bucket, sum(opened), sum(closed), sum(reopened), sum(comments), sum(close_seconds)
+            FROM (
+                SELECT {created} AS bucket, 1 AS opened, 0 AS closed, 0 AS reopened, 0 AS comments,
+                       0.0 AS close_seconds FROM tickets
+                UNION ALL SELECT {created}, 1, 0, 0, 0, 0.0 FROM tickets_archive
+                UNION ALL SELECT {closed}, 0, 1, 0, 0, {seconds} FROM closes
+                UNION ALL SELECT {changed}, 0, 0, 1, 0, 0.0 FROM ticket_transitions WHERE from_status = 'Closed'
+                UNION ALL SELECT {created}, 0, 0, 0, 1, 0.0 FROM comments
+                UNION ALL SELECT {created}, 0, 0, 0, 1, 0.0 FROM comments_archive
+            ) AS events
+            WHERE bucket IS NOT NULL
+            GROUP BY bucket
+        '''.format(created=bucket('created_at'), closed=bucket('closed_at'), changed=bucket('changed_at'),
+                   seconds=seconds), (grain,))
+    db.execute(CLOSES_CTE + '''
+        INSERT INTO close_time_histogram (day, bin, closed)
+        SELECT day, bin, COUNT(*) FROM (
+            SELECT {day} AS day,
+                   (SELECT min(bin) FROM sla_bins WHERE upper_seconds > {seconds}) AS bin
+            FROM closes
+        ) AS c
+        WHERE day IS NOT NULL
+        GROUP BY day, bin
+    '''.format(day=BUCKET_SQL[name]['day'].format('closed_at'), seconds=seconds))
+
+# --- Reading ---
+def parse_report_args(args, today=None):
+    """(start, end, grain) from query args: inclusive UTC dates, the last 30 days by default."""
+    today = today or utcnow().date()
+    try:
+        end = date.fromisoformat(args['end']) if args.get('end') else today
+        start = (date.fromisoformat(args['start']) if args.get('start')
+                 else end - timedelta(days=DEFAULT_RANGE_DAYS - 1))
+    except ValueError:
+        raise ReportError('Dates must be YYYY-MM-DD.')
+    grain = args.get('grain') or 'day'
+    if grain not in GRAINS:
+        raise ReportError('grain must be one of %s.' % ', '.join(GRAINS))
+    if start > end:
+        raise ReportError('start must not be after end.')
+    if grain == 'hour' and (end - start).days >= MAX_HOURLY_DAYS:
+        raise ReportError('Hourly reports cover at most %d days.' % MAX_HOURLY_DAYS)
+    return start, end, grain
+
+def percentiles(histogram, wanted=PERCENTILES):
+    """Interpolated percentiles from (lower_seconds, upper_seconds, count) rows in bin order."""
+    total = sum(count for _, _, count in histogram)
+    result = {}
+    for p in wanted:
+        result['p%d' % p] = None
+        if not total:
+            continue
+        rank, seen = total * p / 100.0, 0
+        for lower, upper, count in histogram:
+            if count and seen + count >= rank:
+                # Closes are assumed to be spread evenly across their bin
+                if upper >= OVERFLOW_SECONDS:
+                    result['p%d' % p] = lower
+                else:
+                    result['p%d' % p] = lower + (upper - lower) * (rank - seen) / count
+                break
+            seen += count
+    return result
+
+def week_start(bucket):
+    day = date.fromisoformat(bucket[:10])
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+def sla_report(db, start, end, grain='day'):
+    """Volume, closes and time-to-close for start..end (inclusive UTC dates), bucketed by grain."""
+    stop = (end + timedelta(days=1)).isoformat()
+    buckets = []
+    for row in db.execute('''
+        SELECT bucket, opened, closed, reopened, comments, close_seconds FROM ticket_rollups
+        WHERE grain = ? AND bucket >= ? AND bucket < ?
+        ORDER BY bucket
+    ''', ('hour' if grain == 'hour' else 'day', start.isoformat(), stop)):
+        bucket = week_start(row['bucket']) if grain == 'week' else row['bucket']
+        if buckets and buckets[-1]['bucket'] == bucket:
+            current = buckets[-1]
+        else:
+            current = {'bucket': bucket, 'opened': 0, 'closed': 0, 'reopened': 0, 'comments': 0,
+                       'close_seconds': 0.0}
+            buckets.append(current)
+        for key in ('opened', 'closed', 'reopened', 'comments', 'close_seconds'):
+            current[key] += row[key]
+
+    totals = {key: sum(b[key] for b in buckets) for key in ('opened', 'closed', 'reopened', 'comments')}
+    close_seconds = sum(b['close_seconds'] for b in buckets)
+    for b in buckets:
+        b['mean_close_seconds'] = b.pop('close_seconds') / b['closed'] if b['closed'] else None
+
+    histogram = [(row['lower_seconds'], row['upper_seconds'], row['closed']) for row in db.execute('''
+        SELECT b.lower_seconds, b.upper_seconds, SUM(h.closed) AS closed
+        FROM close_time_histogram h
+        JOIN sla_bins b ON b.bin = h.bin
+        WHERE h.day >= ? AND h.day < ?
+        GROUP BY h.bin, b.lower_seconds, b.upper_seconds
+        ORDER BY h.bin
+    ''', (start.isoformat(), stop))]
+    time_to_close = percentiles(histogram)
+    time_to_close['count'] = sum(count for _, _, count in histogram)
+    time_to_close['mean'] = close_seconds / totals['closed'] if totals['closed'] else None
+
+    return {'start': start.isoformat(), 'end': end.isoformat(), 'grain': grain,
+            'totals': totals, 'time_to_close': time_to_close, 'buckets': buckets}
+
+# --- Formatting ---
+def format_duration(seconds):
+    if seconds is None:
+        return '–'
+    seconds = int(round(seconds))
+    if seconds < 3600:
+        return '%dm' % (seconds // 60) if seconds >= 60 else '%ds' % seconds
+    if seconds < 86400:
+        return '%dh %02dm' % (seconds // 3600, seconds % 3600 // 60)
+    return '%dd %dh' % (seconds // 86400, seconds % 86400 // 3600)
+
+# --- /admin/reports ---
+reports_bp = Blueprint('reports', __name__)
+
+@reports_bp.route('/admin/reports')
+def reports():
+    if session.get('role') != 'admin':
+        flash('You are not authorised to view this page.', 'error')
+        return redirect(url_for('dashboard'))
+    try:
+        start, end, grain = parse_report_args(request.args)
+    except ReportError as e:
+        flash(str(e), 'error')
+        start, end, grain = parse_report_args({})
+    report = sla_report(get_db(), start, end, grain)
+    return render_template('reports.html', report=report, percentiles=PERCENTILES, grains=GRAINS)
+
+def init_app(app):
+    app.add_template_filter(format_duration, 'duration')
+    app.register_blueprint(reports_bp)
@@ -0,0 +1,287 @@
+from flask import Blueprint, Response, request, session, jsonify, url_for
+from datetime import datetime
+import hashlib
+
+from db import get_db
+from storage import TICKET_COLUMNS, get_store
+from pagination import COMMENT_PAGE_SIZE, get_page_args, fetch_comment_page, fetch_ticket_page
+from events import publish
+from humantime import naturaltime
+from fragment_cache import invalidate_ticket
+from tasks import index_comments_later
+from batch import BatchError, apply_batch, matching_ids, parse_filter, parse_ids, parse_user_id, summarise
+from analytics import ReportError, parse_report_args, sla_report
+from duplicates import index_ticket, similar_to_text
+
+# --- JSON API (session auth, same role rules as the HTML routes) ---
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+def error(message, status):
+    return jsonify({'error': message}), status
+
+@api.before_request
+def require_login():
+    if 'user_id' not in session:
+        return error('Authentication required.', 401)
+
+def is_admin():
+    return session.get('role') == 'admin'
+
+def can_view(ticket):
+    return is_admin() or ticket['user_id'] == session['user_id']
+
+def get_ticket(ticket_id):
+    return get_store().ticket(ticket_id)
+
+def ticket_etag(ticket, kind='t'):
+    return '%s%d-v%d' % (kind, ticket['id'], ticket['version'])
+
+def conditional(etag, build):
+    # Answer If-None-Match before doing any serialization work
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = jsonify(build())
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp
+
+def precondition_failed(ticket):
+    # If-Match guards edits against lost updates from stale clients
+    return bool(request.if_match) and not request.if_match.contains(ticket_etag(ticket))
+
+def load_visible_ticket(ticket_id):
+    ticket = get_ticket(ticket_id)
+    if not ticket:
+        return None, error('Ticket not found.', 404)
+    if not can_view(ticket):
+        return None, error('You are not authorised to view this ticket.', 403)
+    return ticket, None
+
+def row_json(row):
+    # Timestamps come back from SQLite as datetimes; send ISO 8601 plus a relative form
+    data = dict(row)
+    for key, value in list(data.items()):
+        if isinstance(value, datetime):
+            data[key] = value.isoformat()
+            data[key.replace('_at', '_ago')] = naturaltime(value)
+    return data
+
+def ticket_json(ticket):
+    data = row_json(ticket)
+    data['url'] = url_for('api.ticket_detail', ticket_id=ticket['id'])
+    return data
+
+# --- Tickets ---
+@api.route('/tickets', methods=['GET'])
+def list_tickets():
+    before, after, limit = get_page_args()
+    conditions, params = [], []
+    if not is_admin():
+        conditions.append('t.user_id = ?')
+        params.append(session['user_id'])
+    status = request.args.get('status')
+    if status:
+        conditions.append('t.status = ?')
+        params.append(status)
+
+    q = 'SELECT ' + TICKET_COLUMNS + ' FROM tickets t JOIN users u ON t.user_id = u.id'
+    page = fetch_ticket_page(get_db(), q, conditions, params, before, after, limit)
+
+    # The page's ETag changes whenever any listed ticket's version or the page boundaries change
+    digest = hashlib.sha1()
+    for t in page['items']:
+        digest.update(b'%d:%d;' % (t['id'], t['version']))
+    digest.update(repr((page['next_before'], page['prev_after'])).encode())
+    etag = 'l' + digest.hexdigest()
+
+    return conditional(etag, lambda: {
+        'tickets': [ticket_json(t) for t in page['items']],
+        'next_before': page['next_before'],
+        'prev_after': page['prev_after'],
+        'limit': page['limit'],
+    })
+
+@api.route('/tickets', methods=['POST'])
+def create_ticket():
+    data = request.get_json(silent=True) or {}
+    title = (data.get('title') or '').strip()
+    description = (data.get('description') or '').strip()
+    if not title or not description:
+        return error('All fields are required.', 400)
+
+    store = get_store()
+    ticket_id = store.create_ticket(title, description, session['user_id'])
+    index_ticket(store.db, ticket_id, title, description)
+    store.commit()
+    ticket = get_ticket(ticket_id)
+    publish('ticket.created', ticket['id'], ticket['user_id'], title=ticket['title'], status=ticket['status'])
+    resp = jsonify(ticket_json(ticket))
+    resp.status_code = 201
+    resp.headers['Location'] = url_for('api.ticket_detail', ticket_id=ticket['id'])
+    resp.set_etag(ticket_etag(ticket))
+    return resp
+
+@api.route('/tickets/similar', methods=['GET'])
+def similar_tickets():
+    # Suggestions for the submit form: open near-duplicates of the text typed so far
+    title = request.args.get('title', '')
+    description = request.args.get('description', '')
+    if len((title + description).strip()) < 3:
+        return jsonify({'similar': []})
+    user_id = None if is_admin() else session['user_id']
+    matches = similar_to_text(get_db(), title, description, user_id)
+    for match in matches:
+        match.pop('cluster_id')
+        match['url'] = url_for('view_ticket', ticket_id=match['id'])
+    return jsonify({'similar': [row_json(m) for m in matches]})
+
+@api.route('/tickets/<int:ticket_id>', methods=['GET'])
+def ticket_detail(ticket_id):
+    ticket, err = load_visible_ticket(ticket_id)
+    if err:
+        return err
+    return conditional(ticket_etag(ticket), lambda: ticket_json(ticket))
+
+@api.route('/tickets/<int:ticket_id>', methods=['PATCH', 'PUT'])
+def update_ticket(ticket_id):
+    ticket, err = load_visible_ticket(ticket_id)
+    if err:
+        return err
+    if ticket['status'] == 'Closed':
+        return error('Closed tickets cannot be edited.', 409)
+    if precondition_failed(ticket):
+        return error('Ticket has changed since it was fetched.', 412)
+
+    data = request.get_json(silent=True) or {}
+    title = (data.get('title', ticket['title']) or '').strip()
+    description = (data.get('description', ticket['description']) or '').strip()
+    if not title or not description:
+        return error('All fields are required.', 400)
+
+    store = get_store()
+    store.update_ticket(ticket_id, title, description)
+    index_ticket(store.db, ticket_id, title, description)
+    store.commit()
+    ticket = get_ticket(ticket_id)
+    invalidate_ticket(ticket_id)
+    publish('ticket.updated', ticket_id, ticket['user_id'], title=ticket['title'])
+    resp = jsonify(ticket_json(ticket))
+    resp.set_etag(ticket_etag(ticket))
+    return resp
+
+@api.route('/tickets/<int:ticket_id>/close', methods=['POST'])
+def close_ticket(ticket_id):
+    if not is_admin():
+        return error('You are not authorised to close tickets.', 403)
+    ticket = get_ticket(ticket_id)
+    if not ticket:
+        return error('Ticket not found.', 404)
+    if precondition_failed(ticket):
+        return error('Ticket has changed since it was fetched.', 412)
+
+    store = get_store()
+    store.close_ticket(ticket_id)
+    store.commit()
+    ticket = get_ticket(ticket_id)
+    invalidate_ticket(ticket_id)
+    publish('ticket.closed', ticket_id, ticket['user_id'], status='Closed')
+    resp = jsonify(ticket_json(ticket))
+    resp.set_etag(ticket_etag(ticket))
+    return resp
+
+@api.route('/tickets/<int:ticket_id>', methods=['DELETE'])
+def delete_ticket(ticket_id):
+    if not is_admin():
+        return error('You are not authorised to delete tickets.', 403)
+    ticket = get_ticket(ticket_id)
+    if not ticket:
+        return error('Ticket not found.', 404)
+    if precondition_failed(ticket):
+        return error('Ticket has changed since it was fetched.', 412)
+
+    store = get_store()
+    store.delete_ticket(ticket_id)
+    store.commit()
+    invalidate_ticket(ticket_id)
+    publish('ticket.deleted', ticket_id, ticket['user_id'])
+    return '', 204
+
+# --- Batched admin operations ---
+@api.route('/tickets/bulk', methods=['POST'])
+def bulk_tickets():
+    if not is_admin():
+        return error('You are not authorised to change tickets in bulk.', 403)
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return error('Expected a JSON object.', 400)
+    action = data.get('action')
+    db = get_db()
+    try:
+        # Either explicit ids or everything matching {"status": ..., "user_id": ...}
+        if data.get('filter') is not None:
+            ids = matching_ids(db, *parse_filter(data['filter']))
+        else:
+            ids = data.get('ids') or []
+            if not isinstance(ids, list):
+                raise BatchError('ids must be a list.')
+            ids = parse_ids(ids)
+        results = apply_batch(db, action, ids, parse_user_id(data.get('user_id')))
+    except BatchError as e:
+        return error(str(e), 400)
+    return jsonify({
+        'action': action,
+        'results': {str(ticket_id): outcome for ticket_id, outcome in results.items()},
+        'summary': summarise(results),
+    })
+
+# --- Comments ---
+@api.route('/tickets/<int:ticket_id>/comments', methods=['GET'])
+def list_comments(ticket_id):
+    ticket, err = load_visible_ticket(ticket_id)
+    if err:
+        return err
+
+    before, after, limit = get_page_args(COMMENT_PAGE_SIZE)
+    page = fetch_comment_page(get_db(), ticket_id, before, after, limit)
+
+    # Comment changes bump the ticket version, so it doubles as the thread's version; the cursor
+    # arguments pick which page of that version this is
+    etag = '%s-%s-%s-%d' % (ticket_etag(ticket, 'c'), before, after, limit)
+    return conditional(etag, lambda: {
+        'comments': [row_json(c) for c in page['items']],
+        'next_before': page['next_before'],
+        'prev_after': page['prev_after'],
+        'limit': page['limit'],
+    })
+
+@api.route('/tickets/<int:ticket_id>/comments', methods=['POST'])
+def create_comment(ticket_id):
+    ticket, err = load_visible_ticket(ticket_id)
+    if err:
+        return err
+    if ticket['status'] == 'Closed':
+        return error('This ticket is closed. Comments are disabled.', 409)
+    data = request.get_json(silent=True) or {}
+    content = (data.get('content') or '').strip()
+    if not content:
+        return error('Comment content is required.', 400)
+
+    store = get_store()
+    comment_id = store.add_comment(ticket_id, session['user_id'], content)
+    index_comments_later(ticket_id)
+    store.commit()
+    invalidate_ticket(ticket_id)
+    publish('comment.created', ticket_id, ticket['user_id'], comment_id=comment_id)
+    return jsonify(row_json(store.comment(comment_id))), 201
+
+# --- Reports (read from the analytics rollups) ---
+@api.route('/reports/sla', methods=['GET'])
+def reports_sla():
+    if not is_admin():
+        return error('You are not authorised to view reports.', 403)
+    try:
+        start, end, grain = parse_report_args(request.args)
+    except ReportError as e:
+        return error(str(e), 400)
+    return jsonify(sla_report(get_db(), start, end, grain))
@@ -0,0 +1,138 @@
+from flask import current_app
+import click
+
+from db import get_db
+from bulk import tickets_cli
+
+# (tickets table, comments table, full-text table) for the hot and archived tiers
+HOT_TABLES = ('tickets', 'comments', 'ticket_search')
+ARCHIVE_TABLES = ('tickets_archive', 'comments_archive', 'ticket_archive_search')
+
+def tables_for(archived):
+    return ARCHIVE_TABLES if archived else HOT_TABLES
+
+def locate_ticket(db, ticket_id, columns='id, user_id, status, version'):
+    # Hot table first; the archive is only consulted on a miss
+    row = db.execute('SELECT %s FROM tickets WHERE id = ?' % columns, (ticket_id,)).fetchone()
+    if row is not None:
+        return row, False
+    row = db.execute('SELECT %s FROM tickets_archive WHERE id = ?' % columns, (ticket_id,)).fetchone()
+    return row, row is not None
+
+# --- Moving closed tickets to cold storage ---
+def archive_candidates(db, days, after_id, limit):
+    # updated_at is bumped by every status change, so it is at or after the close time
+    return [row[0] for row in db.execute('''
+        SELECT id FROM tickets
+        WHERE status = 'Closed' AND id > ? AND updated_at < datetime('now', ?)
+        ORDER BY id LIMIT ?
+    ''', (after_id, '-%d days' % days, limit))]
+
+def archive_batch(db, ids):
+    marks = ','.join('?' * len(ids))
+    with db:
+        db.execute('''
+            INSERT INTO tickets_archive (id, title, description, status, user_id, created_at, updated_at, version,
+                                         closed_at)
+            SELECT id, title, description, status, user_id, created_at, updated_at, version, closed_at
+            FROM tickets WHERE id IN (%s)
+        ''' % marks, ids)
+        comments = db.execute('''
+            INSERT INTO comments_archive (id, ticket_id, user_id, content, created_at)
+            SELECT id, ticket_id, user_id, content, created_at FROM comments WHERE ticket_id IN (%s)
+        ''' % marks, ids).rowcount
+        db.execute('''
+            INSERT INTO ticket_archive_search (rowid, title, description, comments)
+            SELECT t.id, t.title, t.description,
+                coalesce((SELECT group_concat(content, ?) FROM comments_archive WHERE ticket_id = t.id), '')
+            FROM tickets_archive t WHERE t.id IN (%s)
+        ''' % marks, ['\n'] + ids)
+        # Drop the search rows first so the cascaded comment deletes find nothing to rebuild
+        db.execute('DELETE FROM ticket_search WHERE rowid IN (%s)' % marks, ids)
+        db.execute('DELETE FROM tickets WHERE id IN (%s)' % marks, ids)
+        restore_counters(db, marks, ids)
+    return comments
+
+def restore_counters(db, marks, ids):
+    # The delete triggers took the moved rows out of ticket_stats and user_directory; archived tickets
+    # still count, so add them back before the batch commits
+    db.execute('''
+        UPDATE ticket_stats SET ticket_count = ticket_count + (
+            SELECT COUNT(*) FROM tickets_archive a
+            WHERE a.id IN (%s) AND coalesce(a.status, '') = ticket_stats.status
+                AND (ticket_stats.user_id = 0 OR a.user_id = ticket_stats.user_id))
+        WHERE user_id = 0 OR user_id IN (SELECT user_id FROM tickets_archive WHERE id IN (%s))
+    ''' % (marks, marks), ids + ids)
+    db.execute('''
+        UPDATE user_directory SET
+            open_count = open_count + (
+                SELECT COUNT(*) FROM tickets_archive a
+                WHERE a.id IN (%s) AND a.user_id = user_directory.user_id AND a.status = 'Open'),
+            closed_count = closed_count + (
+                SELECT COUNT(*) FROM tickets_archive a
+                WHERE a.id IN (%s) AND a.user_id = user_directory.user_id AND a.status = 'Closed'),
+            comment_count = comment_count + (
+                SELECT COUNT(*) FROM comments_archive c
+                WHERE c.ticket_id IN (%s) AND c.user_id = user_directory.user_id)
+        WHERE user_id IN (SELECT user_id FROM tickets_archive WHERE id IN (%s)
+                          UNION SELECT user_id FROM comments_archive WHERE ticket_id IN (%s))
+    ''' % ((marks,) * 5), ids * 5)
+
+def archive_closed(db, days, batch_size=500, on_batch=None):
+    """Move tickets closed more than `days` ago, with their comments, in one transaction per batch."""
+    tickets = comments = 0
+    last_id = 0
+    while True:
+        ids = archive_candidates(db, days, last_id, batch_size)
+        if not ids:
+            break
+        last_id = ids[-1]
+        comments += archive_batch(db, ids)
+        tickets += len(ids)
+        if on_batch:
+            on_batch(tickets, comments)
+    return tickets, comments
+
+def hot_set_size(db):
+    page_size = db.execute('PRAGMA page_size').fetchone()[0]
+    return {
+        'tickets': db.execute('SELECT COUNT(*) FROM tickets').fetchone()[0],
+        'comments': db.execute('SELECT COUNT(*) FROM comments').fetchone()[0],
+        'free_bytes': db.execute('PRAGMA freelist_count').fetchone()[0] * page_size,
+    }
+
+def shrink(before, after):
+    return 100.0 * (before - after) / before if before else 0.0
+
+# --- flask tickets archive ---
+@tickets_cli.command('archive')
+@click.option('--days', type=int, default=None,
+              help='Archive tickets closed more than this many days ago (default ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', default=500, show_default=True)
+@click.option('--dry-run', is_flag=True, help='Only count what would be archived.')
+def archive_command(days, batch_size, dry_run):
+    """Move long-closed tickets and their comments into the archive tables."""
+    days = current_app.config['ARCHIVE_AFTER_DAYS'] if days is None else days
+    db = get_db()
+    if dry_run:
+        count = db.execute('''
+            SELECT COUNT(*) FROM tickets WHERE status = 'Closed' AND updated_at < datetime('now', ?)
+        ''', ('-%d days' % days,)).fetchone()[0]
+        click.echo('%d tickets closed more than %d days ago would be archived' % (count, days))
+        return
+
+    before = hot_set_size(db)
+    tickets, comments = archive_closed(
+        db, days, batch_size,
+        on_batch=lambda t, c: click.echo('archived %d tickets, %d comments...' % (t, c), err=True))
+    after = hot_set_size(db)
+
+    click.echo('archived %d tickets and %d comments closed more than %d days ago' % (tickets, comments, days))
+    for kind in ('tickets', 'comments'):
+        click.echo('hot %s: %d -> %d (-%.1f%%)' % (
+            kind, before[kind], after[kind], shrink(before[kind], after[kind])))
+    click.echo('%.1f MiB of pages freed for reuse (VACUUM returns them to the filesystem)' % (
+        max(0, after['free_bytes'] - before['free_bytes']) / 1024.0 / 1024.0))
+
+def init_app(app):
+    app.config.setdefault('ARCHIVE_AFTER_DAYS', 90)
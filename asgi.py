@@ -0,0 +1,168 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+import asyncio
+import io
+import sys
+import threading
+
+# --- ASGI serving mode: the same Flask routes under an event loop ---
+# Views, and with them every database call, run on a bounded thread pool, so the number of pooled
+# connections is capped by ASGI_DB_THREADS however many clients are connected. Response bodies that
+# can be awaited (the /events stream) are sent from the loop and hold no thread while they wait.
+class AsgiAdapter:
+    def __init__(self, wsgi_app, max_workers=16):
+        self.wsgi_app = wsgi_app
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'streams': 0, 'open_streams': 0, 'disconnects': 0}
+
+    @property
+    def executor(self):
+        # Created on first use so importing the app (or forking it) starts no threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='asgi-db')
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError('unsupported ASGI scope type %r' % scope['type'])
+
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+
+        self.stats['requests'] += 1
+        loop = asyncio.get_running_loop()
+        status, headers, chunks, stream = await loop.run_in_executor(
+            self.executor, self.run_view, build_environ(scope, bytes(body)))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        if stream is None:
+            await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+        else:
+            await self.send_stream(stream, receive, send)
+
+    def run_view(self, environ):
+        # Runs on a pool thread. Plain bodies are drained here too: a generator may hold this
+        # thread's pooled connection, and sqlite3 connections can't move between threads.
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+            return lambda data: None
+
+        app_iter = self.wsgi_app(environ, start_response)
+        if hasattr(app_iter, '__aiter__'):
+            return response['status'], response['headers'], None, app_iter
+        try:
+            chunks = list(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+        return response['status'], response['headers'], chunks, None
+
+    async def send_stream(self, stream, receive, send):
+        async def pump():
+            async for chunk in stream:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        async def disconnected():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        self.stats['streams'] += 1
+        self.stats['open_streams'] += 1
+        pumping = asyncio.ensure_future(pump())
+        watching = asyncio.ensure_future(disconnected())
+        try:
+            await asyncio.wait([pumping, watching], return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            pumping.cancel()
+            raise
+        finally:
+            self.stats['open_streams'] -= 1
+            watching.cancel()
+        if pumping.done():
+            pumping.result()
+            return
+        # The client went away: stop waiting for events on its behalf
+        self.stats['disconnects'] += 1
+        pumping.cancel()
+        try:
+            await pumping
+        except asyncio.CancelledError:
+            pass
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+def build_environ(scope, body):
+    # WSGI wants native strings that are really latin-1 bytes (PEP 3333)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else 'HTTP_' + name
+        if key in environ:
+            # HTTP/2 clients may split cookies over several headers
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        environ[key] = value
+    return environ
+
+def get_asgi_app(app=None):
+    app = app or current_app
+    return app.extensions['asgi']
+
+def init_app(app):
+    # Pool threads, and so database connections, per ASGI worker process
+    app.config.setdefault('ASGI_DB_THREADS', 16)
+    app.extensions['asgi'] = AsgiAdapter(app, app.config['ASGI_DB_THREADS'])
@@ -0,0 +1,182 @@
+from flask import current_app, request, send_from_directory
+from flask.cli import AppGroup
+import click
+import gzip
+import hashlib
+import mimetypes
+import os
+import tempfile
+import threading
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are built
+    brotli = None
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.map')
+
+# --- Fingerprinted, precompressed static files ---
+def fingerprint(path, digest):
+    base, ext = os.path.splitext(path)
+    return '%s.%s%s' % (base, digest, ext)
+
+def write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+class AssetManifest:
+    # Maps static paths to content-hashed names; precompressed copies live in build_dir under the hashed name
+    def __init__(self, static_folder, build_dir):
+        self.static_folder = static_folder
+        self.build_dir = build_dir
+        self.hashed = {}
+        self.logical = {}
+        self._mtimes = {}
+        self._lock = threading.Lock()
+        self.built = False
+        self._build_lock = threading.Lock()
+
+    def _files(self):
+        for root, _, names in os.walk(self.static_folder):
+            for name in names:
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, self.static_folder).replace(os.sep, '/'), path
+
+    def refresh(self):
+        # Rehash only files whose mtime changed, so this is cheap enough to call per request in debug
+        with self._lock:
+            seen = set()
+            for rel, path in self._files():
+                seen.add(rel)
+                mtime = os.stat(path).st_mtime_ns
+                if self._mtimes.get(rel) == mtime:
+                    continue
+                with open(path, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()[:12]
+                self.logical.pop(self.hashed.get(rel), None)
+                self.hashed[rel] = fingerprint(rel, digest)
+                self.logical[self.hashed[rel]] = rel
+                self._mtimes[rel] = mtime
+            for rel in set(self.hashed) - seen:
+                self.logical.pop(self.hashed.pop(rel), None)
+                self._mtimes.pop(rel, None)
+
+    def build(self, level=9):
+        """Write .gz (and .br when brotli is installed) copies of compressible assets that don't exist yet."""
+        built = []
+        for rel, hashed in sorted(self.hashed.items()):
+            if not rel.endswith(COMPRESSIBLE):
+                continue
+            with open(os.path.join(self.static_folder, rel), 'rb') as f:
+                data = f.read()
+            sizes = {'raw': len(data)}
+            variants = [('gz', lambda d: gzip.compress(d, level, mtime=0))]
+            if brotli is not None:
+                variants.append(('br', lambda d: brotli.compress(d, quality=11)))
+            for suffix, compress in variants:
+                target = os.path.join(self.build_dir, hashed + '.' + suffix)
+                if not os.path.exists(target):
+                    write_atomic(target, compress(data))
+                sizes[suffix] = os.path.getsize(target)
+            built.append((rel, sizes))
+        return built
+
+    def ensure_built(self, level=9):
+        # Once per process; copies already on disk are skipped, so later processes only check for them
+        if self.built:
+            return
+        with self._build_lock:
+            if not self.built:
+                self.build(level)
+                self.built = True
+
+def get_manifest(app=None):
+    app = app or current_app
+    return app.extensions['assets']
+
+def add_fingerprint(endpoint, values):
+    # url_for('static', filename=...) keeps working and now yields the hashed name
+    if endpoint == 'static' and 'filename' in values and current_app.config['ASSET_FINGERPRINT']:
+        values['filename'] = get_manifest().hashed.get(values['filename'], values['filename'])
+
+def serve_static(filename):
+    manifest = get_manifest()
+    logical = manifest.logical.get(filename)
+    if logical is None:
+        # Plain names keep Flask's default behaviour and caching
+        return send_from_directory(manifest.static_folder, filename)
+
+    resp = None
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[encoding] and os.path.exists(os.path.join(manifest.build_dir, filename + suffix)):
+            mimetype = mimetypes.guess_type(logical)[0] or 'application/octet-stream'
+            resp = send_from_directory(manifest.build_dir, filename + suffix, mimetype=mimetype)
+            resp.headers['Content-Encoding'] = encoding
+            break
+    if resp is None:
+        resp = send_from_directory(manifest.static_folder, logical)
+    # The name changes whenever the content does, so clients never need to revalidate
+    resp.headers['Cache-Control'] = IMMUTABLE
+    resp.vary.add('Accept-Encoding')
+    return resp
+
+def reload_in_debug():
+    if current_app.debug:
+        get_manifest().refresh()
+
+def precompress_once():
+    # Deferred from init_app so importing the app (tests, CLI commands, the gunicorn master) writes nothing
+    if current_app.config['ASSET_PRECOMPRESS']:
+        get_manifest().ensure_built(current_app.config['ASSET_COMPRESS_LEVEL'])
+
+# --- Compression of dynamic responses ---
+def compress_response(response):
+    config = current_app.config
+    if (response.mimetype not in config['COMPRESS_MIMETYPES'] or response.direct_passthrough
+            or response.is_streamed or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.status_code != 200 or not request.accept_encodings['gzip']:
+        return response
+    data = response.get_data()
+    if len(data) < config['COMPRESS_MIN_SIZE']:
+        return response
+    response.set_data(gzip.compress(data, config['COMPRESS_LEVEL']))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+# --- flask assets build ---
+assets_cli = AppGroup('assets', help='Static asset fingerprinting and precompression.')
+
+@assets_cli.command('build')
+def build_command():
+    """Hash and precompress static files ahead of deploy."""
+    manifest = get_manifest()
+    manifest.refresh()
+    for rel, sizes in manifest.build(current_app.config['ASSET_COMPRESS_LEVEL']):
+        click.echo('%-28s %-36s %s' % (rel, manifest.hashed[rel], ' '.join(
+            '%s=%d' % (k, v) for k, v in sizes.items())))
+
+def init_app(app):
+    app.config.setdefault('ASSET_FINGERPRINT', True)
+    app.config.setdefault('ASSET_BUILD_DIR', os.path.join(app.instance_path, 'assets'))
+    app.config.setdefault('ASSET_PRECOMPRESS', True)
+    app.config.setdefault('ASSET_COMPRESS_LEVEL', 9)
+    app.config.setdefault('COMPRESS_MIMETYPES', ['text/html'])
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+
+    manifest = AssetManifest(app.static_folder, app.config['ASSET_BUILD_DIR'])
+    manifest.refresh()
+    app.extensions['assets'] = manifest
+
+    app.view_functions['static'] = serve_static
+    app.url_defaults(add_fingerprint)
+    app.before_request(reload_in_debug)
+    app.before_request(precompress_once)
+    app.after_request(compress_response)
+    app.cli.add_command(assets_cli)
@@ -0,0 +1,213 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from collections import OrderedDict, deque
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+import multiprocessing
+import os
+import threading
+import time
+
+from db import get_db
+
+class Overloaded(Exception):
+    """Raised when the hashing queue is full; callers answer 503 with Retry-After."""
+
+# --- Bounded password hashing pool ---
+class HashingPool:
+    # KDFs run in worker processes so a burst of logins can't hold the GIL or every request thread
+    def __init__(self, workers, max_pending, timeout):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.stats = {'submitted': 0, 'rejected': 0, 'pending': 0}
+
+    def _get_executor(self):
+        # Created lazily, and again after fork, so gunicorn workers never share a parent's pool
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # Forking from a threaded server copies held locks and open connections into the
+                # workers; forkserver (spawn where it doesn't exist) starts them from a clean process
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(
+                    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'))
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.stats['rejected'] += 1
+            raise Overloaded()
+        with self._lock:
+            self.stats['submitted'] += 1
+            self.stats['pending'] += 1
+        release = True
+        try:
+            if self.workers == 0:
+                return fn(*args)
+            future = self._get_executor().submit(fn, *args)
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeout:
+                # A hash that is still running keeps its slot until it finishes, so timed-out work
+                # can't pile up past the queue limit; one that never started is simply dropped
+                if not future.cancel():
+                    release = False
+                    future.add_done_callback(self._release)
+                raise Overloaded()
+        finally:
+            if release:
+                self._release()
+
+    def _release(self, future=None):
+        with self._lock:
+            self.stats['pending'] -= 1
+        self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+def get_hashing_pool(app=None):
+    app = app or current_app
+    return app.extensions['hashing_pool']
+
+def hash_password(password):
+    return get_hashing_pool().run(generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+def verify_password(pw_hash, password):
+    return get_hashing_pool().run(check_password_hash, pw_hash, password)
+
+_method_prefixes = {}
+
+def needs_rehash(pw_hash):
+    # Compare against werkzeug's canonical spelling of the configured method (e.g. scrypt:32768:8:1)
+    method = current_app.config['PASSWORD_HASH_METHOD']
+    if method not in _method_prefixes:
+        _method_prefixes[method] = generate_password_hash('', method).split('$', 1)[0]
+    return pw_hash.split('$', 1)[0] != _method_prefixes[method]
+
+# --- Sliding-window attempt throttling ---
+class Throttle:
+    # Keys are kept in order of their latest hit, so expired ones are always at the front and
+    # each hit sweeps them; max_keys caps memory when a spray of addresses is all still in window
+    def __init__(self, limit, window, max_keys=100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self, hits, now):
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+
+    def _sweep(self, now):
+        while self._hits:
+            hits = next(iter(self._hits.values()))
+            if len(self._hits) <= self.max_keys and hits and hits[-1] > now - self.window:
+                break
+            self._hits.popitem(last=False)
+
+    def retry_after(self, key):
+        # Seconds until the key may try again, or 0 if it is under the limit
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.get(key)
+            if not hits:
+                return 0
+            self._prune(hits, now)
+            if len(hits) < self.limit:
+                if not hits:
+                    del self._hits[key]
+                return 0
+            return max(1, int(hits[0] + self.window - now) + 1)
+
+    def hit(self, key):
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.pop(key, None) or deque()
+            self._prune(hits, now)
+            hits.append(now)
+            self._hits[key] = hits
+            self._sweep(now)
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+class DatabaseThrottle:
+    # Same interface as Throttle, but attempts are rows in login_attempts, so the limit holds across
+    # every worker and node sharing the database instead of per process
+    def __init__(self, scope, limit, window):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+
+    def retry_after(self, key):
+        now = time.time()
+        row = get_db().execute('''
+            SELECT COUNT(*), min(attempted_at) FROM login_attempts WHERE scope = ? AND key = ? AND attempted_at > ?
+        ''', (self.scope, key, now - self.window)).fetchone()
+        if row[0] < self.limit:
+            return 0
+        return max(1, int(row[1] + self.window - now) + 1)
+
+    def hit(self, key):
+        now = time.time()
+        db = get_db()
+        with db:
+            db.execute('INSERT INTO login_attempts (scope, key, attempted_at) VALUES (?, ?, ?)',
+                       (self.scope, key, now))
+            # Expired attempts go as new ones arrive; the index makes this a short range delete
+            db.execute('DELETE FROM login_attempts WHERE attempted_at <= ?', (now - self.window,))
+
+    def reset(self, key):
+        db = get_db()
+        with db:
+            db.execute('DELETE FROM login_attempts WHERE scope = ? AND key = ?', (self.scope, key))
+
+def login_retry_after(email, ip):
+    throttles = current_app.extensions['login_throttles']
+    return max(throttles['email'].retry_after(email.lower()), throttles['ip'].retry_after(ip))
+
+def record_login_failure(email, ip):
+    throttles = current_app.extensions['login_throttles']
+    throttles['email'].hit(email.lower())
+    throttles['ip'].hit(ip)
+
+def record_login_success(email):
+    current_app.extensions['login_throttles']['email'].reset(email.lower())
+
+def init_app(app):
+    app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt')
+    app.config.setdefault('HASH_WORKERS', min(4, os.cpu_count() or 1))
+    app.config.setdefault('HASH_QUEUE_DEPTH', 32)
+    app.config.setdefault('HASH_TIMEOUT', 10)
+    app.config.setdefault('LOGIN_EMAIL_LIMIT', 5)
+    app.config.setdefault('LOGIN_IP_LIMIT', 50)
+    app.config.setdefault('LOGIN_WINDOW', 300)
+    # 'database' shares attempt counts between processes; 'memory' keeps them per process
+    app.config.setdefault('LOGIN_THROTTLE_STORE', 'database')
+    # Most keys tracked per in-memory throttle; the least recently hit are forgotten first
+    app.config.setdefault('LOGIN_THROTTLE_MAX_KEYS', 100000)
+
+    app.extensions['hashing_pool'] = HashingPool(
+        app.config['HASH_WORKERS'], app.config['HASH_QUEUE_DEPTH'], app.config['HASH_TIMEOUT'])
+    if app.config['LOGIN_THROTTLE_STORE'] == 'memory':
+        app.extensions['login_throttles'] = {
+            'email': Throttle(app.config['LOGIN_EMAIL_LIMIT'], app.config['LOGIN_WINDOW'],
+                              app.config['LOGIN_THROTTLE_MAX_KEYS']),
+            'ip': Throttle(app.config['LOGIN_IP_LIMIT'], app.config['LOGIN_WINDOW'],
+                           app.config['LOGIN_THROTTLE_MAX_KEYS']),
+        }
+    else:
+        app.extensions['login_throttles'] = {
+            'email': DatabaseThrottle('email', app.config['LOGIN_EMAIL_LIMIT'], app.config['LOGIN_WINDOW']),
+            'ip': DatabaseThrottle('ip', app.config['LOGIN_IP_LIMIT'], app.config['LOGIN_WINDOW']),
+        }
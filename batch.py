@@ -0,0 +1,137 @@
+from collections import Counter
+
+from events import publish_many
+from fragment_cache import invalidate_tickets
+
+# --- Batched admin operations on many tickets at once ---
+# action -> outcome recorded for each ticket it changed
+ACTIONS = {'close': 'closed', 'reopen': 'reopened', 'delete': 'deleted', 'reassign': 'reassigned'}
+MAX_BATCH = 5000
+# Stay well under SQLite's bound-parameter limit per statement
+CHUNK_SIZE = 500
+
+class BatchError(ValueError):
+    """Raised for a request that can't be applied at all; callers answer 400 or flash it."""
+
+def chunked(seq, size=CHUNK_SIZE):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+def parse_ids(values):
+    ids = []
+    for value in values:
+        try:
+            ids.append(int(value))
+        except (TypeError, ValueError):
+            raise BatchError('Ticket ids must be integers.')
+    # Keep the caller's order, drop repeats
+    return list(dict.fromkeys(ids))
+
+def parse_user_id(value, label='user_id'):
+    # JSON callers may send anything; bools are ints to Python but never a user id
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise BatchError('%s must be an integer.' % label)
+    try:
+        return int(value)
+    except ValueError:
+        raise BatchError('%s must be an integer.' % label)
+
+def parse_filter(value):
+    # {"status": ..., "user_id": ...} -> (status, user_id)
+    if not isinstance(value, dict):
+        raise BatchError('filter must be an object.')
+    status = value.get('status')
+    if status is not None and not isinstance(status, str):
+        raise BatchError('filter.status must be a string.')
+    return status, parse_user_id(value.get('user_id'), 'filter.user_id')
+
+def matching_ids(db, status=None, user_id=None, limit=MAX_BATCH):
+    conditions, params = [], []
+    if status:
+        conditions.append('status = ?')
+        params.append(status)
+    if user_id is not None:
+        conditions.append('user_id = ?')
+        params.append(user_id)
+    q = 'SELECT id FROM tickets'
+    if conditions:
+        q += ' WHERE ' + ' AND '.join(conditions)
+    ids = [row[0] for row in db.execute(q + ' ORDER BY id LIMIT ?', params + [limit + 1])]
+    if len(ids) > limit:
+        raise BatchError('More than %d tickets match; narrow the filter.' % limit)
+    return ids
+
+def _apply_chunk(db, action, ids, assignee_id):
+    marks = ','.join('?' * len(ids))
+    if action == 'close':
+        cur = db.execute("UPDATE tickets SET status = 'Closed' WHERE id IN (%s) "
+                         "AND status IS DISTINCT FROM 'Closed' RETURNING id" % marks, ids)
+    elif action == 'reopen':
+        cur = db.execute("UPDATE tickets SET status = 'Open' WHERE id IN (%s) "
+                         "AND status IS DISTINCT FROM 'Open' RETURNING id" % marks, ids)
+    elif action == 'reassign':
+        cur = db.execute('UPDATE tickets SET user_id = ? WHERE id IN (%s) AND user_id IS DISTINCT FROM ? '
+                         'RETURNING id' % marks, [assignee_id] + ids + [assignee_id])
+    else:
+        # Drop the search rows first so the cascaded comment deletes find nothing to rebuild
+        db.execute('DELETE FROM ticket_search WHERE rowid IN (%s)' % marks, ids)
+        cur = db.execute('DELETE FROM tickets WHERE id IN (%s) RETURNING id' % marks, ids)
+    return [row[0] for row in cur.fetchall()]
+
+def batch_event(action, ticket_id, owner_id, ticket, assignee_id):
+    if action == 'close':
+        return 'ticket.closed', ticket_id, owner_id, {'status': 'Closed'}
+    if action == 'reopen':
+        return 'ticket.reopened', ticket_id, owner_id, {'status': 'Open'}
+    if action == 'reassign':
+        # Seen by the old owner and, through user_id, the new one (see events.stream), who gets
+        # enough to add the ticket to their list
+        return 'ticket.reassigned', ticket_id, owner_id, {'user_id': assignee_id, 'title': ticket['title'],
+                                                          'status': ticket['status']}
+    return 'ticket.deleted', ticket_id, owner_id, {}
+
+def apply_batch(db, action, ids, assignee_id=None):
+    """Apply one action to many tickets in a single transaction.
+
+    Returns {ticket_id: outcome}, where outcome is the action's past tense for changed
+    tickets, 'unchanged' for tickets already in the target state and 'not_found'.
+    """
+    if action not in ACTIONS:
+        raise BatchError('Unknown action: %s' % action)
+    if not ids:
+        raise BatchError('No tickets selected.')
+    if len(ids) > MAX_BATCH:
+        raise BatchError('At most %d tickets can be changed at once.' % MAX_BATCH)
+    if action == 'reassign':
+        if assignee_id is None or not db.execute('SELECT 1 FROM users WHERE id = ?', (assignee_id,)).fetchone():
+            raise BatchError('Choose an existing user to reassign the tickets to.')
+
+    owners, tickets = {}, {}
+    for chunk in chunked(ids):
+        marks = ','.join('?' * len(chunk))
+        for row in db.execute('SELECT id, user_id, title, status FROM tickets WHERE id IN (%s)' % marks, chunk):
+            owners[row['id']] = row['user_id']
+            tickets[row['id']] = row
+    found = [i for i in ids if i in owners]
+
+    changed = []
+    with db:
+        for chunk in chunked(found):
+            changed += _apply_chunk(db, action, chunk, assignee_id)
+        # Live clients still get an event per ticket, written in the update's transaction: the nested
+        # commit in publish_many is this block's, so a 5000-ticket batch is one commit, not 5001
+        if changed:
+            publish_many([batch_event(action, ticket_id, owners[ticket_id], tickets[ticket_id], assignee_id)
+                          for ticket_id in changed], db)
+
+    # One cache pass for the whole batch
+    invalidate_tickets(changed)
+
+    changed = set(changed)
+    outcome = ACTIONS[action]
+    return {i: outcome if i in changed else 'unchanged' if i in owners else 'not_found' for i in ids}
+
+def summarise(results):
+    return dict(Counter(results.values()))
@@ -0,0 +1,68 @@
+"""Micro-benchmark: relative-time rendering cost per 1000 ticket rows.
+
+Compares the old per-row path (string timestamp -> strptime -> humanize) with
+timestamps parsed by the SQLite converter and formatted through humantime.
+
+    python benchmarks/bench_naturaltime.py [rows]
+"""
+import os
+import random
+import sqlite3
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import humanize
+import db  # registers the TIMESTAMP converter
+from humantime import naturaltime_many, utcnow
+
+def legacy_naturaltime(value):
+    # The filter as it was: parse and humanize every row, swallowing errors
+    if not value:
+        return ''
+    try:
+        dt = datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+        return humanize.naturaltime(datetime.utcnow() - dt)
+    except Exception:
+        return value
+
+def make_rows(n):
+    conn = sqlite3.connect(':memory:', detect_types=sqlite3.PARSE_DECLTYPES)
+    conn.execute('CREATE TABLE tickets (id INTEGER PRIMARY KEY, created_at TIMESTAMP)')
+    rng = random.Random(1)
+    now = utcnow()
+    conn.executemany('INSERT INTO tickets (created_at) VALUES (?)', [
+        ((now - timedelta(seconds=rng.randint(0, 86400 * 90))).strftime('%Y-%m-%d %H:%M:%S'),)
+        for _ in range(n)
+    ])
+    return conn
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    conn = make_rows(n)
+    as_text = [r[0] for r in conn.execute('SELECT CAST(created_at AS TEXT) FROM tickets')]
+
+    def legacy():
+        return [legacy_naturaltime(v) for v in as_text]
+
+    def current():
+        # Includes the converter cost, paid once per row at fetch time
+        return naturaltime_many([r[0] for r in conn.execute('SELECT created_at FROM tickets')])
+
+    def fetch_only():
+        return [r[0] for r in conn.execute('SELECT CAST(created_at AS TEXT) FROM tickets')]
+
+    repeat = 5
+    base = min(timeit.repeat(fetch_only, number=1, repeat=repeat))
+    old = min(timeit.repeat(legacy, number=1, repeat=repeat)) + base
+    new = min(timeit.repeat(current, number=1, repeat=repeat))
+    per_k = 1000.0 / n * 1000
+    print('rows: %d' % n)
+    print('legacy (fetch + strptime + humanize): %.2f ms / 1000 rows' % (old * per_k))
+    print('converter + bucketed formatter:       %.2f ms / 1000 rows' % (new * per_k))
+    print('speed-up: %.1fx' % (old / new))
+
+if __name__ == '__main__':
+    main()
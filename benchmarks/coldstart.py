@@ -0,0 +1,128 @@
+"""Worker startup: cold-start time and first-request latency per worker.
+
+Each run is a fresh interpreter, so nothing is warm but the OS page cache:
+
+  lazy      import app and serve; templates compile from source on first use (no shared cache)
+  bytecode  the same, with the on-disk bytecode cache already filled by an earlier process
+  preload   create_app() in a parent that then forks the worker, as `gunicorn --preload` does
+
+For every route the worker's first and second response times are reported; the
+gap between them is what a new worker's first users pay.
+
+    python benchmarks/datagen.py --db bench.db --users 20 --tickets 1000 --comments 1000
+    python benchmarks/coldstart.py --db bench.db --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datagen import BENCH_PASSWORD
+
+MODES = ('lazy', 'bytecode', 'preload')
+ROUTES = ('/login', '/dashboard', '/ticket/1', '/search?q=vpn', '/admin/users')
+
+# --- Inside the measured interpreter ---
+def first_requests(app):
+    client = app.test_client()
+    client.get('/')
+    client.post('/login', data={'email': 'bench1@example.com', 'password': BENCH_PASSWORD})
+    timings = {}
+    for path in ROUTES:
+        samples = []
+        for _ in range(2):
+            t0 = time.perf_counter()
+            resp = client.get(path)
+            samples.append((time.perf_counter() - t0) * 1000)
+            if resp.status_code != 200:
+                raise RuntimeError('%s returned %d' % (path, resp.status_code))
+        timings[path] = {'first_ms': samples[0], 'warm_ms': samples[1]}
+    return timings
+
+def child(mode):
+    started = time.perf_counter()
+    import app as module
+    imported = time.perf_counter()
+    if mode != 'preload':
+        return {'import_s': imported - started, 'boot_s': imported - started,
+                'routes': first_requests(module.app)}
+
+    module.create_app()
+    booted = time.perf_counter()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        forked = time.perf_counter()
+        result = {'routes': first_requests(module.app), 'fork_to_ready_ms': (time.perf_counter() - forked) * 1000}
+        with os.fdopen(write_fd, 'w') as f:
+            json.dump(result, f)
+        os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        result = json.load(f)
+    os.waitpid(pid, 0)
+    result.update({'import_s': imported - started, 'boot_s': booted - started})
+    return result
+
+# --- Driver ---
+def run_once(db_path, mode, cache_dir):
+    # Inline hashing: a forked worker leaves with os._exit, which would orphan a hashing process pool
+    env = dict(os.environ, DATABASE=db_path, TEMPLATE_CACHE_DIR=cache_dir, JOB_WORKERS='0', HASH_WORKERS='0')
+    out = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--child', mode], env=env,
+                                  cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+def measure(db_path, modes=MODES, runs=3):
+    results = {}
+    for mode in modes:
+        samples = []
+        for _ in range(runs):
+            with tempfile.TemporaryDirectory() as cache_dir:
+                if mode == 'bytecode':
+                    # An earlier process (another worker, or `flask templates compile`) filled the cache
+                    run_once(db_path, 'preload', cache_dir)
+                samples.append(run_once(db_path, mode, cache_dir))
+        results[mode] = {
+            'import_s': statistics.median(s['import_s'] for s in samples),
+            'boot_s': statistics.median(s['boot_s'] for s in samples),
+            'routes': {path: {key: statistics.median(s['routes'][path][key] for s in samples)
+                              for key in ('first_ms', 'warm_ms')} for path in ROUTES},
+        }
+    return results
+
+def print_report(results):
+    print('%-9s %8s %8s  %s' % ('mode', 'import s', 'boot s', '  '.join('%18s' % path for path in ROUTES)))
+    for mode, r in results.items():
+        cells = ['%8.1f / %7.1f' % (r['routes'][p]['first_ms'], r['routes'][p]['warm_ms']) for p in ROUTES]
+        print('%-9s %8.2f %8.2f  %s' % (mode, r['import_s'], r['boot_s'], '  '.join('%18s' % c for c in cells)))
+    print('(first / warm response in ms for each route)')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='bench.db', help='Database generated by datagen.py')
+    parser.add_argument('--modes', default=','.join(MODES), help='Comma-separated: ' + ', '.join(MODES))
+    parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters per mode (medians are reported)')
+    parser.add_argument('--out', help='Write results JSON here')
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child)))
+        return
+
+    results = measure(os.path.abspath(args.db), args.modes.split(','), args.runs)
+    print_report(results)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
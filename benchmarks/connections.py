@@ -0,0 +1,191 @@
+"""Connection capacity: WSGI (gunicorn gthread) against ASGI (app:asgi_app on uvicorn workers).
+
+Opens many concurrent /events streams against a local gunicorn in each mode and
+reports how many were served, whether one write still reaches all of them, how
+fast /healthz answers while they are open, and the server's resident memory and
+thread count per open connection. The ASGI mode needs `pip install uvicorn`.
+
+    python benchmarks/datagen.py --db bench.db --users 20 --tickets 1000 --comments 1000
+    python benchmarks/connections.py --db bench.db --connections 500 --out benchmarks/results/connections.json
+"""
+import argparse
+import asyncio
+import http.cookiejar
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datagen import BENCH_PASSWORD
+from loadtest import NoRedirect, git_revision, start_gunicorn
+
+MODES = {
+    'wsgi': ('app:app', 'gthread'),
+    'asgi': ('app:asgi_app', 'uvicorn.workers.UvicornWorker'),
+}
+
+# --- Server process accounting (Linux /proc) ---
+def process_tree(pid):
+    pids = [pid]
+    for child in read_proc('/proc/%d/task/%d/children' % (pid, pid)).split():
+        pids.extend(process_tree(int(child)))
+    return pids
+
+def read_proc(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return ''
+
+def footprint(pid):
+    """(resident KiB, threads) summed over the gunicorn master and its workers."""
+    rss = threads = 0
+    for p in process_tree(pid):
+        for line in read_proc('/proc/%d/status' % p).splitlines():
+            if line.startswith('VmRSS:'):
+                rss += int(line.split()[1])
+            elif line.startswith('Threads:'):
+                threads += int(line.split()[1])
+    return rss, threads
+
+# --- Client side ---
+class Client:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.jar = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.jar), NoRedirect())
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        t0 = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                resp.read()
+                status = resp.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except OSError:
+            return None, None
+        return status, (time.perf_counter() - t0) * 1000
+
+    @property
+    def cookie(self):
+        return '; '.join('%s=%s' % (c.name, c.value) for c in self.jar)
+
+async def open_stream(host, port, cookie, timeout):
+    # Raw sockets: one urllib connection per stream would need a thread each on this side too
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    writer.write(('GET /events HTTP/1.1\r\nHost: %s:%d\r\nCookie: %s\r\nAccept: text/event-stream\r\n\r\n'
+                  % (host, port, cookie)).encode())
+    try:
+        await writer.drain()
+        # Served means the first stream bytes arrived, not merely that the kernel accepted the socket
+        await asyncio.wait_for(reader.readuntil(b'retry:'), timeout)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        writer.close()
+        return None
+    return reader, writer
+
+async def await_event(reader, marker, timeout):
+    try:
+        await asyncio.wait_for(reader.readuntil(marker), timeout)
+        return True
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        return False
+
+async def measure(proc, url, connections, timeout):
+    parsed = urllib.parse.urlsplit(url)
+    client = Client(url, timeout)
+    # Bench user 1 is the admin, so every stream is entitled to every event
+    client.request('POST', '/login', {'email': 'bench1@example.com', 'password': BENCH_PASSWORD})
+    idle_rss, idle_threads = footprint(proc.pid)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[open_stream(parsed.hostname, parsed.port, client.cookie, timeout)
+                                     for _ in range(connections)])
+    streams = [s for s in results if s is not None]
+    open_seconds = time.perf_counter() - started
+    held_rss, held_threads = footprint(proc.pid)
+
+    # Can the server still do ordinary work with every stream open?
+    health_status, health_ms = await asyncio.to_thread(client.request, 'GET', '/healthz')
+    marker = ('Capacity probe %d' % time.time_ns()).encode()
+    submit_status, submit_ms = await asyncio.to_thread(
+        client.request, 'POST', '/submit', {'title': marker.decode(), 'description': 'connections.py'})
+    started = time.perf_counter()
+    delivered = sum(await asyncio.gather(*[await_event(reader, marker, timeout) for reader, _ in streams]))
+    fanout_ms = (time.perf_counter() - started) * 1000
+
+    for _, writer in streams:
+        writer.close()
+    opened = len(streams)
+    return {
+        'requested': connections,
+        'opened': opened,
+        'open_seconds': open_seconds,
+        'delivered': delivered,
+        'fanout_ms': fanout_ms if delivered else None,
+        'healthz_ms': health_ms if health_status == 200 else None,
+        'submit_ms': submit_ms if submit_status == 302 else None,
+        'idle_rss_kib': idle_rss,
+        'held_rss_kib': held_rss,
+        'kib_per_connection': (held_rss - idle_rss) / opened if opened else None,
+        'idle_threads': idle_threads,
+        'held_threads': held_threads,
+    }
+
+# --- Reporting ---
+def fmt(value, pattern='%.1f'):
+    return '-' if value is None else pattern % value
+
+def print_report(results):
+    print('%-5s %9s %7s %9s %10s %10s %9s %9s %8s' % (
+        'mode', 'requested', 'opened', 'delivered', 'healthz ms', 'submit ms', 'rss MiB', 'KiB/conn', 'threads'))
+    for mode, r in results.items():
+        print('%-5s %9d %7d %9d %10s %10s %9.1f %9s %8d' % (
+            mode, r['requested'], r['opened'], r['delivered'], fmt(r['healthz_ms']), fmt(r['submit_ms']),
+            r['held_rss_kib'] / 1024.0, fmt(r['kib_per_connection']), r['held_threads']))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='bench.db', help='Database generated by datagen.py')
+    parser.add_argument('--modes', default='wsgi,asgi', help='Comma-separated: wsgi, asgi')
+    parser.add_argument('--connections', type=int, default=200, help='Concurrent /events streams to open')
+    parser.add_argument('--threads', type=int, default=16, help='gthread threads / ASGI_DB_THREADS')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Seconds to wait for each step')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--out', help='Write results JSON here')
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db)
+    results = {}
+    for mode in args.modes.split(','):
+        target, worker_class = MODES[mode]
+        proc, url = start_gunicorn(db_path, args.port, 1, args.threads, target, worker_class)
+        try:
+            results[mode] = asyncio.run(measure(proc, url, args.connections, args.timeout))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    print_report(results)
+    if args.out:
+        results['meta'] = {'revision': git_revision(), 'connections': args.connections, 'threads': args.threads,
+                           'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
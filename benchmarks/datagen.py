@@ -0,0 +1,120 @@
+"""Synthetic help-desk data for benchmarks.
+
+Builds a fresh database with a configurable number of users, tickets and
+comments. Ticket ownership and comment activity follow a Zipf-like skew so
+a few "noisy" users and hot tickets dominate, as they do in production.
+
+    python benchmarks/datagen.py --db bench.db --users 1000 --tickets 100000 --comments 300000
+
+Every generated user has the password BENCH_PASSWORD; user 1 is an admin.
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from werkzeug.security import generate_password_hash
+
+BENCH_PASSWORD = 'BenchPass1!'
+TOPICS = ['VPN drops', 'Printer jam', 'Slow laptop', 'Password reset', 'Email sync', 'Wi-Fi outage',
+          'Software install', 'Access request', 'Disk full', 'Monitor flicker', 'Backup failure']
+WORDS = ('error unable connect restart server client network update login timeout crash '
+         'screen keyboard office remote drive share license upgrade install').split()
+
+def skewed_picker(n, skew, rng):
+    # Zipf-like: item k (1-based) has weight 1 / k**skew; skew 0 is uniform
+    cumulative = list(itertools.accumulate(1.0 / (k ** skew) for k in range(1, n + 1)))
+    total = cumulative[-1]
+    return lambda: bisect.bisect_left(cumulative, rng.random() * total)
+
+def sentence(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+def generate(db_path, users=1000, tickets=100000, comments=300000, skew=1.1, closed_ratio=0.6,
+             days=365, seed=1, batch_size=10000, log=print):
+    os.environ['DATABASE'] = db_path
+    from app import app, init_db
+    from db import get_db
+    from bulk import drop_derived, restore_derived
+    from duplicates import index_missing
+    from humantime import utcnow
+
+    app.config['DATABASE'] = db_path
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    init_db()
+    with app.app_context():
+        db = get_db()
+        saved = drop_derived(db)
+
+        # One hash shared by every user keeps generation fast
+        pw_hash = generate_password_hash(BENCH_PASSWORD)
+        db.executemany(
+            'INSERT INTO users (email, password, first_name, last_name, employee_id, role) VALUES (?, ?, ?, ?, ?, ?)',
+            [('bench%d@example.com' % i, pw_hash, 'Bench', 'User%d' % i, 'EMP%04d' % i,
+              'admin' if i == 1 else 'employee') for i in range(1, users + 1)])
+        db.commit()
+        user_ids = [r[0] for r in db.execute('SELECT id FROM users ORDER BY id')]
+
+        now = utcnow()
+        pick_owner = skewed_picker(len(user_ids), skew, rng)
+
+        def ticket_rows():
+            for _ in range(tickets):
+                created = now - timedelta(seconds=rng.randint(0, days * 86400))
+                yield ('%s: %s' % (rng.choice(TOPICS), sentence(rng, 3)), sentence(rng, 25),
+                       'Closed' if rng.random() < closed_ratio else 'Open',
+                       user_ids[pick_owner()], created.strftime('%Y-%m-%d %H:%M:%S'))
+        insert_batched(db, 'INSERT INTO tickets (title, description, status, user_id, created_at) '
+                           'VALUES (?, ?, ?, ?, ?)', ticket_rows(), batch_size)
+
+        if tickets and comments:
+            max_ticket = db.execute('SELECT max(id) FROM tickets').fetchone()[0]
+            pick_ticket = skewed_picker(min(max_ticket, 100000), skew, rng)
+
+            def comment_rows():
+                for _ in range(comments):
+                    # Hot tickets are the newest ones
+                    yield (max_ticket - pick_ticket(), user_ids[pick_owner()], sentence(rng, 12))
+            insert_batched(db, 'INSERT INTO comments (ticket_id, user_id, content) VALUES (?, ?, ?)',
+                           comment_rows(), batch_size)
+
+        restore_derived(db, saved, 0)
+        # Bulk-inserted tickets bypass the submit path, so give them similarity signatures here
+        index_missing(db, batch_size=batch_size)
+
+    elapsed = time.perf_counter() - started
+    log('generated %d users, %d tickets, %d comments in %.1fs' % (users, tickets, comments, elapsed))
+    return app
+
+def insert_batched(db, sql, rows, batch_size):
+    it = iter(rows)
+    while True:
+        chunk = list(itertools.islice(it, batch_size))
+        if not chunk:
+            return
+        with db:
+            db.executemany(sql, chunk)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='bench.db')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--tickets', type=int, default=100000)
+    parser.add_argument('--comments', type=int, default=300000)
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent for owners and hot tickets (0 = uniform)')
+    parser.add_argument('--closed-ratio', type=float, default=0.6)
+    parser.add_argument('--days', type=int, default=365, help='Spread of created_at into the past')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    generate(os.path.abspath(args.db), args.users, args.tickets, args.comments, args.skew,
+             args.closed_ratio, args.days, args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""Scenario runner: concurrent virtual users against the help desk.
+
+Drives either the in-process Flask test client or a real HTTP server
+(an existing URL, or a local gunicorn started for the run) and reports
+p50/p95/p99 latency and throughput per route. Results are written as JSON
+and can be compared with an earlier run to spot regressions.
+
+    python benchmarks/datagen.py --db bench.db
+    python benchmarks/loadtest.py --db bench.db --users 8 --duration 30 --out results/HEAD.json
+    python benchmarks/loadtest.py --db bench.db --gunicorn --users 32 --compare results/main.json
+"""
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datagen import BENCH_PASSWORD
+
+# --- Scenario: (name, weight, action(ctx, rng) -> (method, path, form data)) ---
+def dashboard(ctx, rng):
+    return 'GET', '/dashboard', None
+
+def dashboard_filtered(ctx, rng):
+    return 'GET', '/dashboard?status=%s' % rng.choice(['Open', 'Closed']), None
+
+def dashboard_deep_page(ctx, rng):
+    return 'GET', '/dashboard?before=%d' % rng.randint(1, ctx['max_ticket']), None
+
+def view_ticket(ctx, rng):
+    # Skew towards the newest (hottest) tickets; employees may only open their own
+    skip = int(rng.paretovariate(1.2)) - 1
+    owned = ctx.get('owned')
+    if owned is None:
+        ticket_id = max(1, ctx['max_ticket'] - skip)
+    elif owned:
+        ticket_id = owned[min(skip, len(owned) - 1)]
+    else:
+        # Nothing of their own to open yet; they look at their (empty) dashboard instead
+        return 'GET', '/dashboard', None
+    return 'GET', '/ticket/%d' % ticket_id, None
+
+def search(ctx, rng):
+    return 'GET', '/search?q=%s' % rng.choice(['vpn', 'printer', 'laptop', 'password', 'timeout']), None
+
+def api_list(ctx, rng):
+    return 'GET', '/api/v1/tickets?limit=50', None
+
+def submit_ticket(ctx, rng):
+    return 'POST', '/submit', {'title': 'Load test %d' % rng.randint(0, 10 ** 9), 'description': 'Generated'}
+
+SCENARIO = [
+    ('dashboard', 30, dashboard),
+    ('dashboard_filtered', 10, dashboard_filtered),
+    ('dashboard_deep_page', 5, dashboard_deep_page),
+    ('view_ticket', 30, view_ticket),
+    ('search', 10, search),
+    ('api_list', 10, api_list),
+    ('submit_ticket', 5, submit_ticket),
+]
+
+# --- Transports ---
+class FlaskClientSession:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        resp = self.client.open(path, method=method, data=data)
+        resp.close()
+        return resp.status_code
+
+class HttpSession:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect())
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(req, timeout=30) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Measure the route itself, not the page it redirects to
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+# --- Runner ---
+def scenario_context(conn):
+    """Dataset facts the scenarios draw on, including each employee's tickets, newest first."""
+    ctx = {'max_ticket': conn.execute('SELECT ifnull(max(id), 1) FROM tickets').fetchone()[0],
+           'users': conn.execute('SELECT COUNT(*) FROM users').fetchone()[0],
+           'owned': {email: [] for email, in conn.execute("SELECT email FROM users WHERE role != 'admin'")}}
+    for email, ticket_id in conn.execute('SELECT u.email, t.id FROM tickets t JOIN users u ON u.id = t.user_id '
+                                         'ORDER BY t.id DESC'):
+        if email in ctx['owned']:
+            ctx['owned'][email].append(ticket_id)
+    return ctx
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank method
+    k = max(0, math.ceil(p / 100.0 * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+def run(make_session, ctx, virtual_users=8, duration=10.0, seed=1, user_pool=100):
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    names = [name for name, _, _ in SCENARIO]
+    weights = [weight for _, weight, _ in SCENARIO]
+    actions = {name: fn for name, _, fn in SCENARIO}
+    start_barrier = threading.Barrier(virtual_users + 1)
+
+    def virtual_user(n):
+        rng = random.Random(seed + n)
+        session = make_session()
+        # Bench user 1 is the admin; everyone else is an employee
+        email = 'bench%d@example.com' % (1 + n % user_pool)
+        session.request('POST', '/login', {'email': email, 'password': BENCH_PASSWORD})
+        # Admins (no entry in 'owned') may open any ticket
+        user_ctx = dict(ctx, owned=ctx.get('owned', {}).get(email))
+        # Logins happen before the clock starts so they don't skew the measured window
+        start_barrier.wait()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            method, path, data = actions[name](user_ctx, rng)
+            t0 = time.perf_counter()
+            try:
+                status = session.request(method, path, data)
+            except Exception:
+                status = 599
+            elapsed = time.perf_counter() - t0
+            with lock:
+                samples[name].append(elapsed)
+                if status >= 400:
+                    errors[name] += 1
+
+    threads = [threading.Thread(target=virtual_user, args=(n,), daemon=True) for n in range(virtual_users)]
+    for t in threads:
+        t.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    return summarise(samples, errors, wall)
+
+def summarise(samples, errors, wall):
+    routes = {}
+    all_samples = []
+    for name, values in sorted(samples.items()):
+        values.sort()
+        all_samples.extend(values)
+        routes[name] = {
+            'requests': len(values),
+            'errors': errors.get(name, 0),
+            'p50_ms': percentile(values, 50) * 1000,
+            'p95_ms': percentile(values, 95) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+            'rps': len(values) / wall if wall else 0.0,
+        }
+    all_samples.sort()
+    total = {
+        'requests': len(all_samples),
+        'errors': sum(errors.values()),
+        'p50_ms': percentile(all_samples, 50) * 1000,
+        'p95_ms': percentile(all_samples, 95) * 1000,
+        'p99_ms': percentile(all_samples, 99) * 1000,
+        'rps': len(all_samples) / wall if wall else 0.0,
+    }
+    return {'routes': routes, 'total': total, 'wall_seconds': wall}
+
+def print_report(result, baseline=None):
+    header = '%-22s %8s %6s %9s %9s %9s %8s' % ('route', 'reqs', 'errs', 'p50 ms', 'p95 ms', 'p99 ms', 'rps')
+    print(header + ('   p95 vs baseline' if baseline else ''))
+    rows = list(result['routes'].items()) + [('TOTAL', result['total'])]
+    for name, r in rows:
+        line = '%-22s %8d %6d %9.2f %9.2f %9.2f %8.1f' % (
+            name, r['requests'], r['errors'], r['p50_ms'], r['p95_ms'], r['p99_ms'], r['rps'])
+        if baseline:
+            base = baseline['total'] if name == 'TOTAL' else baseline['routes'].get(name)
+            if base and base['p95_ms']:
+                line += '   %+6.1f%%' % ((r['p95_ms'] / base['p95_ms'] - 1) * 100)
+        print(line)
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def start_gunicorn(db_path, port, workers, threads, target='app:app', worker_class='gthread'):
+    # ASGI runs views on its own pool; size it like the gthread pool so both modes get as many connections
+    env = dict(os.environ, DATABASE=db_path, ASGI_DB_THREADS=str(threads))
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    proc = subprocess.Popen(['gunicorn', target, '-b', '127.0.0.1:%d' % port, '--workers', str(workers),
+                             '--worker-class', worker_class, '--threads', str(threads)], cwd=root, env=env)
+    url = 'http://127.0.0.1:%d' % port
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(url + '/healthz', timeout=1).read()
+            return proc, url
+        except OSError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError('gunicorn did not come up on %s' % url)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='bench.db', help='Database generated by datagen.py')
+    parser.add_argument('--url', help='Benchmark a running server instead of the in-process test client')
+    parser.add_argument('--gunicorn', action='store_true', help='Start a local gunicorn for the run')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--users', type=int, default=8, help='Concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of measured load')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help='Write results JSON here')
+    parser.add_argument('--compare', help='Earlier results JSON to compare p95 against')
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db)
+    os.environ['DATABASE'] = db_path
+    from app import app
+    from db import connect_db
+    app.config['DATABASE'] = db_path
+    conn = connect_db(app.config)
+    ctx = scenario_context(conn)
+    conn.close()
+
+    proc = None
+    if args.gunicorn:
+        proc, url = start_gunicorn(db_path, args.port, args.workers, args.threads)
+    else:
+        url = args.url
+    try:
+        if url:
+            make_session = lambda: HttpSession(url)
+            target = url
+        else:
+            make_session = lambda: FlaskClientSession(app)
+            target = 'testclient'
+        result = run(make_session, ctx, args.users, args.duration, args.seed, min(ctx['users'], 100))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    result['meta'] = {'revision': git_revision(), 'target': 'gunicorn' if args.gunicorn else target,
+                      'virtual_users': args.users, 'duration': args.duration, 'dataset': ctx,
+                      'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == '__main__':
+    main()
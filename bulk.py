@@ -0,0 +1,345 @@
+from flask.cli import AppGroup
+from datetime import datetime
+from itertools import islice
+import click
+import csv
+import json
+import sys
+import time
+
+from db import get_db
+from storage import INTEGRITY_ERRORS, iter_rows
+from analytics import rebuild_rollups
+from duplicates import index_missing
+from humantime import utcnow
+from tasks import index_comments
+
+# --- flask tickets import/export ---
+tickets_cli = AppGroup('tickets', help='Bulk ticket import and export.')
+
+TICKET_FIELDS = ['id', 'title', 'description', 'status', 'created_at', 'updated_at', 'employee_id', 'email']
+COMMENT_FIELDS = ['id', 'ticket_id', 'content', 'created_at', 'employee_id', 'email']
+
+EXPORT_QUERIES = {
+    'tickets': '''
+        SELECT t.id, t.title, t.description, t.status, t.created_at, t.updated_at, u.employee_id, u.email
+        FROM tickets t LEFT JOIN users u ON t.user_id = u.id
+        ORDER BY t.id
+    ''',
+    'comments': '''
+        SELECT c.id, c.ticket_id, c.content, c.created_at, u.employee_id, u.email
+        FROM comments c LEFT JOIN users u ON c.user_id = u.id
+        ORDER BY c.id
+    ''',
+}
+
+def detect_format(path, fmt):
+    if fmt:
+        return fmt
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+def format_value(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+def normalise_timestamp(value):
+    # Accept ISO 8601 (with or without T / fractional seconds) and store SQLite's own format
+    if not value:
+        return utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    return datetime.fromisoformat(str(value).replace('Z', '')).strftime('%Y-%m-%d %H:%M:%S')
+
+def read_records(stream, fmt, on_error=None):
+    # Yields (row number, record); lines that aren't JSON go to on_error if given, else raise
+    if fmt == 'jsonl':
+        number = 0
+        for line in stream:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                if on_error is None:
+                    raise
+                on_error(number, e)
+                continue
+            yield number, record
+    else:
+        yield from enumerate(csv.DictReader(stream), 1)
+
+def batches(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+class Progress:
+    # Bad rows are counted; the first few are kept to show at the end
+    MAX_ERRORS = 20
+
+    def __init__(self, label):
+        self.label = label
+        self.rows = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def fail(self, number, error):
+        self.failed += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            message = 'missing field %s' % error if isinstance(error, KeyError) else str(error)
+            self.errors.append((number, message))
+
+    @property
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def report(self, final=False):
+        click.echo('%s%s: %d rows, %d skipped%s, %.0f rows/s' % (
+            'done ' if final else '', self.label, self.rows, self.skipped,
+            ', %d failed' % self.failed if self.failed else '', self.rate), err=True)
+        if final:
+            for number, message in self.errors:
+                click.echo('  row %d: %s' % (number, message), err=True)
+            if self.failed > len(self.errors):
+                click.echo('  ... and %d more' % (self.failed - len(self.errors)), err=True)
+
+@tickets_cli.command('export')
+@click.argument('output', default='-')
+@click.option('--kind', type=click.Choice(['tickets', 'comments']), default='tickets')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='Defaults to the output file extension, csv for stdout.')
+def export_command(output, kind, fmt):
+    """Stream tickets or comments to CSV/JSONL in constant memory."""
+    fmt = detect_format(output, fmt)
+    fields = TICKET_FIELDS if kind == 'tickets' else COMMENT_FIELDS
+    out = sys.stdout if output == '-' else open(output, 'w', newline='', encoding='utf-8')
+    progress = Progress('export %s' % kind)
+    try:
+        writer = csv.DictWriter(out, fieldnames=fields) if fmt == 'csv' else None
+        if writer:
+            writer.writeheader()
+        # Server-side cursor on PostgreSQL, fetchmany batches on SQLite
+        for row in iter_rows(get_db(), EXPORT_QUERIES[kind], size=1000):
+            record = {k: format_value(row[k]) for k in fields}
+            if writer:
+                writer.writerow(record)
+            else:
+                out.write(json.dumps(record) + '\n')
+            progress.rows += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    progress.report(final=True)
+
+# --- Import ---
+def load_user_map(db):
+    by_employee, by_email = {}, {}
+    for row in db.execute('SELECT id, employee_id, email FROM users'):
+        if row['employee_id']:
+            by_employee[row['employee_id']] = row['id']
+        by_email[row['email'].lower()] = row['id']
+    return by_employee, by_email
+
+def resolve_user(record, by_employee, by_email):
+    user_id = by_employee.get(record.get('employee_id') or '')
+    if user_id is None and record.get('email'):
+        user_id = by_email.get(record['email'].lower())
+    return user_id
+
+def ticket_row(record, user_id):
+    created_at = normalise_timestamp(record.get('created_at'))
+    updated_at = normalise_timestamp(record.get('updated_at')) if record.get('updated_at') else created_at
+    status = record.get('status') or 'Open'
+    return (
+        int(record['id']) if record.get('id') else None,
+        record['title'],
+        record['description'],
+        status,
+        user_id,
+        created_at,
+        updated_at,
+        # Exports carry no close time; the last update is the best estimate, as in migration 0010
+        updated_at if status == 'Closed' else None,
+    )
+
+def comment_row(record, user_id):
+    return (
+        int(record['id']) if record.get('id') else None,
+        int(record['ticket_id']),
+        user_id,
+        record['content'],
+        normalise_timestamp(record.get('created_at')),
+    )
+
+INSERTS = {
+    'tickets': 'INSERT INTO tickets (id, title, description, status, user_id, created_at, updated_at, closed_at) '
+               'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+    'comments': 'INSERT INTO comments (id, ticket_id, user_id, content, created_at) VALUES (?, ?, ?, ?, ?)',
+}
+
+# Counters cover archived tickets and comments as well as live ones
+ALL_TICKETS = 'SELECT user_id, status, created_at FROM tickets UNION ALL SELECT user_id, status, created_at FROM tickets_archive'
+ALL_COMMENTS = 'SELECT user_id, created_at FROM comments UNION ALL SELECT user_id, created_at FROM comments_archive'
+
+def drop_derived(db):
+    # Remember and drop secondary indexes and triggers on the bulk-loaded tables
+    saved = db.execute('''
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND tbl_name IN ('tickets', 'comments') AND sql IS NOT NULL
+    ''').fetchall()
+    for obj in saved:
+        db.execute('DROP %s IF EXISTS "%s"' % (obj['type'].upper(), obj['name']))
+    db.commit()
+    return saved
+
+def rebuild_derived(db):
+    # One sequential pass per table is far cheaper than per-row trigger work after a bulk load
+    db.execute('DELETE FROM ticket_search')
+    db.execute('''
+        INSERT INTO ticket_search (rowid, title, description, comments)
+        SELECT t.id, t.title, t.description, coalesce(c.body, '')
+        FROM tickets t
+        LEFT JOIN (SELECT ticket_id, group_concat(content, char(10)) AS body FROM comments GROUP BY ticket_id) c
+            ON c.ticket_id = t.id
+    ''')
+
+    db.execute('DELETE FROM ticket_comment_stats')
+    db.execute('''
+        INSERT INTO ticket_comment_stats (ticket_id, comment_count)
+        SELECT t.id, COUNT(c.id) FROM tickets t LEFT JOIN comments c ON c.ticket_id = t.id GROUP BY t.id
+    ''')
+
+    db.execute('DELETE FROM ticket_stats')
+    db.execute('''
+        INSERT INTO ticket_stats (user_id, status, ticket_count)
+        SELECT user_id, ifnull(status, ''), COUNT(*) FROM (%s) WHERE user_id IS NOT NULL GROUP BY 1, 2
+    ''' % ALL_TICKETS)
+    db.execute('''
+        INSERT INTO ticket_stats (user_id, status, ticket_count)
+        SELECT 0, ifnull(status, ''), COUNT(*) FROM (%s) GROUP BY 2
+    ''' % ALL_TICKETS)
+    rebuild_user_directory(db)
+    rebuild_rollups(db)
+
+def rebuild_user_directory(db):
+    db.execute('DELETE FROM user_directory')
+    db.execute('''
+        INSERT INTO user_directory (user_id, first_name, last_name, sort_name, email, employee_id, role,
+                                    open_count, closed_count, comment_count, last_activity)
+        SELECT u.id, ifnull(u.first_name, ''), ifnull(u.last_name, ''),
+               lower(ifnull(u.last_name, '') || ' ' || ifnull(u.first_name, '')),
+               u.email, ifnull(u.employee_id, ''), u.role,
+               ifnull(t.open_count, 0), ifnull(t.closed_count, 0), ifnull(c.comment_count, 0),
+               max(ifnull(t.last_at, ''), ifnull(c.last_at, ''))
+        FROM users u
+        LEFT JOIN (SELECT user_id, SUM(status IS 'Open') AS open_count, SUM(status IS 'Closed') AS closed_count,
+                          max(created_at) AS last_at
+                   FROM (%s) GROUP BY user_id) t ON t.user_id = u.id
+        LEFT JOIN (SELECT user_id, COUNT(*) AS comment_count, max(created_at) AS last_at
+                   FROM (%s) GROUP BY user_id) c ON c.user_id = u.id
+    ''' % (ALL_TICKETS, ALL_COMMENTS))
+
+def record_imported_closes(db, max_ticket_id):
+    # The insert trigger stamps a ticket that arrives Closed as closed at creation; it closed at closed_at.
+    # The close counts and times are then recounted from the stored rows.
+    db.execute('''
+        UPDATE ticket_transitions SET changed_at = (SELECT closed_at FROM tickets t WHERE t.id = ticket_id)
+        WHERE ticket_id > ? AND from_status IS NULL AND to_status = 'Closed'
+            AND ticket_id IN (SELECT id FROM tickets WHERE id > ? AND closed_at IS NOT NULL)
+    ''', (max_ticket_id, max_ticket_id))
+    rebuild_rollups(db)
+
+def restore_derived(db, saved, max_comment_id):
+    for obj in saved:
+        db.execute(obj['sql'])
+    rebuild_derived(db)
+
+    # Tickets that gained comments get a new version so ETags and cached fragments refresh
+    db.execute('''
+        UPDATE tickets SET version = version + 1
+        WHERE id IN (SELECT DISTINCT ticket_id FROM comments WHERE id > ?)
+    ''', (max_comment_id,))
+    db.commit()
+    db.execute('ANALYZE')
+
+@tickets_cli.command('import')
+@click.argument('source')
+@click.option('--kind', type=click.Choice(['tickets', 'comments']), default='tickets')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='Defaults to the source file extension, csv for stdin.')
+@click.option('--batch-size', default=5000, show_default=True)
+@click.option('--defer/--no-defer', default=False, show_default=True,
+              help='Drop indexes and triggers during the load and rebuild afterwards. '
+                   'Faster for large loads, but only use it with the app stopped.')
+def import_command(source, kind, fmt, batch_size, defer):
+    """Stream tickets or comments from CSV/JSONL into the database in batches.
+
+    Owners are matched by employee_id, falling back to email; rows with an
+    unknown owner are skipped. Rows that are malformed or violate a constraint
+    are counted as failed and listed at the end. Import tickets before their comments.
+    """
+    fmt = detect_format(source, fmt)
+    db = get_db()
+    by_employee, by_email = load_user_map(db)
+    make_row = ticket_row if kind == 'tickets' else comment_row
+    max_comment_id = db.execute('SELECT ifnull(max(id), 0) FROM comments').fetchone()[0]
+    max_ticket_id = db.execute('SELECT ifnull(max(id), 0) FROM tickets').fetchone()[0]
+
+    saved = drop_derived(db) if defer else []
+    progress = Progress('import %s' % kind)
+    stream = sys.stdin if source == '-' else open(source, newline='', encoding='utf-8')
+    def insert(rows):
+        db.executemany(INSERTS[kind], rows)
+        if kind == 'comments' and not defer:
+            # The app indexes new comments from a job; do it inline here, once per ticket
+            for ticket_id in {row[1] for row in rows}:
+                index_comments(ticket_id)
+
+    try:
+        for chunk in batches(read_records(stream, fmt, on_error=progress.fail), batch_size):
+            rows = []
+            for number, record in chunk:
+                try:
+                    user_id = resolve_user(record, by_employee, by_email)
+                    if user_id is None:
+                        progress.skipped += 1
+                        continue
+                    rows.append((number, make_row(record, user_id)))
+                except (KeyError, ValueError, TypeError, AttributeError) as e:
+                    progress.fail(number, e)
+            # One transaction per batch keeps the write lock short for other connections
+            try:
+                with db:
+                    insert([row for _, row in rows])
+                progress.rows += len(rows)
+            except INTEGRITY_ERRORS:
+                # Retry the batch a row at a time so only the offending rows are left out
+                for number, row in rows:
+                    try:
+                        with db:
+                            insert([row])
+                        progress.rows += 1
+                    except INTEGRITY_ERRORS as e:
+                        progress.fail(number, e)
+            progress.report()
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if defer:
+            restore_derived(db, saved, max_comment_id)
+    if kind == 'tickets' and not defer:
+        with db:
+            record_imported_closes(db, max_ticket_id)
+    if kind == 'tickets':
+        # Signatures are computed in Python rather than by triggers, so new tickets are indexed afterwards
+        index_missing(db, batch_size)
+    progress.report(final=True)
+
+def init_app(app):
+    app.cli.add_command(tickets_cli)
@@ -0,0 +1,167 @@
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from flask import current_app, g
+from humantime import parse_timestamp
+from profiling import ProfiledConnection, attach_profile, detach_profile
+
+# TIMESTAMP columns are parsed once at fetch time instead of per template row
+sqlite3.register_converter('TIMESTAMP', parse_timestamp)
+
+# --- Connection setup ---
+def connect_db(config=None):
+    config = config or current_app.config
+    # The profiled connection records per-request query counts and timings (see profiling.py)
+    factory = ProfiledConnection if config.get('SQL_PROFILING') else sqlite3.Connection
+    rv = sqlite3.connect(config['DATABASE'], timeout=config['SQLITE_BUSY_TIMEOUT'] / 1000,
+                         detect_types=sqlite3.PARSE_DECLTYPES, factory=factory)
+    rv.row_factory = sqlite3.Row
+
+    # WAL lets readers run alongside a writer; NORMAL sync is safe in WAL mode
+    rv.execute('PRAGMA journal_mode = WAL')
+    rv.execute('PRAGMA synchronous = NORMAL')
+    rv.execute('PRAGMA foreign_keys = ON')
+    rv.execute('PRAGMA busy_timeout = %d' % int(config['SQLITE_BUSY_TIMEOUT']))
+    rv.execute('PRAGMA cache_size = %d' % int(config['SQLITE_CACHE_SIZE']))
+    rv.execute('PRAGMA mmap_size = %d' % int(config['SQLITE_MMAP_SIZE']))
+    rv.execute('PRAGMA temp_store = MEMORY')
+    return rv
+
+# --- Connection pool: one long-lived connection per worker thread ---
+class _Slot:
+    # Only its thread's threading.local holds a slot, so the slot and its connection
+    # are dropped when that thread exits
+    def __init__(self, conn, database, generation):
+        self.conn = conn
+        self.database = database
+        self.generation = generation
+        self.pid = os.getpid()
+        self.last_checked = time.monotonic()
+
+class ConnectionPool:
+    def __init__(self, config, health_check_interval=30):
+        self.config = config
+        self.health_check_interval = health_check_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._slots = weakref.WeakSet()
+        self._generation = 0
+        self.stats = {'opened': 0, 'reused': 0, 'closed': 0, 'health_failures': 0}
+
+    def _open(self):
+        conn = connect_db(self.config)
+        slot = self._local.slot = _Slot(conn, self.config['DATABASE'], self._generation)
+        with self._lock:
+            self._slots.add(slot)
+            self.stats['opened'] += 1
+        return conn
+
+    def _discard(self):
+        # Closes the calling thread's connection; SQLite refuses close() from any other thread
+        slot = getattr(self._local, 'slot', None)
+        self._local.slot = None
+        if slot is None:
+            return False
+        with self._lock:
+            self._slots.discard(slot)
+        # A connection inherited across fork() must never be touched by the child
+        if slot.pid != os.getpid():
+            return False
+        try:
+            slot.conn.close()
+        except sqlite3.Error:
+            return False
+        with self._lock:
+            self.stats['closed'] += 1
+        return True
+
+    def _healthy(self, conn):
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            with self._lock:
+                self.stats['health_failures'] += 1
+            return False
+
+    def acquire(self):
+        slot = getattr(self._local, 'slot', None)
+        if slot is None:
+            return self._open()
+
+        # Reopen after a fork, when the configured database file changes or after close_all()
+        if (slot.pid != os.getpid() or slot.database != self.config['DATABASE']
+                or slot.generation != self._generation):
+            self._discard()
+            return self._open()
+
+        now = time.monotonic()
+        if now - slot.last_checked > self.health_check_interval:
+            slot.last_checked = now
+            if not self._healthy(slot.conn):
+                self._discard()
+                return self._open()
+
+        with self._lock:
+            self.stats['reused'] += 1
+        return slot.conn
+
+    def release(self, conn):
+        # Never hand a half-finished transaction to the next request
+        if conn.in_transaction:
+            conn.rollback()
+
+    def check(self):
+        conn = self.acquire()
+        return self._healthy(conn)
+
+    def size(self):
+        with self._lock:
+            return len(self._slots)
+
+    def close_all(self):
+        """Close this thread's connection and retire every other thread's.
+
+        Other threads close their own on their next acquire(); returns how many
+        connections were actually closed here.
+        """
+        with self._lock:
+            self._generation += 1
+        return int(self._discard())
+
+def dialect(conn):
+    # 'sqlite' for sqlite3 connections; storage.PostgresConnection says 'postgresql'
+    return getattr(conn, 'dialect', 'sqlite')
+
+# --- Per-request access ---
+def get_pool(app=None):
+    app = app or current_app
+    return app.extensions['db_pool']
+
+def get_db():
+    if 'sqlite_db' not in g:
+        if current_app.config['DB_POOL']:
+            g.sqlite_db = get_pool().acquire()
+        else:
+            g.sqlite_db = connect_db()
+        attach_profile(g.sqlite_db)
+    return g.sqlite_db
+
+def close_db(error):
+    db = g.pop('sqlite_db', None)
+    if db:
+        detach_profile(db)
+        if current_app.config['DB_POOL']:
+            get_pool().release(db)
+        else:
+            db.close()
+
+def init_app(app):
+    app.config.setdefault('DB_POOL', True)
+    app.config.setdefault('SQLITE_BUSY_TIMEOUT', 5000)
+    app.config.setdefault('SQLITE_CACHE_SIZE', -16000)
+    app.config.setdefault('SQLITE_MMAP_SIZE', 64 * 1024 * 1024)
+    app.extensions['db_pool'] = ConnectionPool(app.config)
+    app.teardown_appcontext(close_db)
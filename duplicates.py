@@ -0,0 +1,196 @@
+from flask.cli import AppGroup
+import click
+import random
+import re
+import struct
+import time
+import zlib
+
+from db import get_db
+
+try:
+    import numpy as np
+except ImportError:  # optional: without it signatures are computed one permutation at a time
+    np = None
+
+# --- Near-duplicate detection: MinHash signatures with LSH banding ---
+# Changing any of these invalidates stored signatures; run `flask duplicates rebuild` afterwards.
+SHINGLE_SIZE = 4           # characters per shingle of the normalised title + description
+NUM_PERM = 64              # MinHash permutations per signature
+BANDS = 16                 # LSH bands of NUM_PERM // BANDS rows: pairs at ~0.5 Jaccard share a band half the time
+ROWS = NUM_PERM // BANDS
+SEED = 1729
+THRESHOLD = 0.5            # estimated Jaccard similarity to call two tickets near-duplicates
+MAX_CANDIDATES = 200       # bucket hits checked against full signatures, most shared bands first
+MAX_SUGGESTIONS = 5
+
+# Universal hashing h(x) = ((a*x + b) mod 2^64) mod p, truncated to 32 bits; NumPy's uint64 wraps the same way
+PRIME = (1 << 61) - 1
+MASK32 = (1 << 32) - 1
+MASK64 = (1 << 64) - 1
+_rng = random.Random(SEED)
+PERM_A = [_rng.randrange(1, PRIME) for _ in range(NUM_PERM)]
+PERM_B = [_rng.randrange(0, PRIME) for _ in range(NUM_PERM)]
+if np is not None:
+    _A = np.array(PERM_A, dtype=np.uint64)[:, None]
+    _B = np.array(PERM_B, dtype=np.uint64)[:, None]
+
+SIGNATURE_FORMAT = '<%dI' % NUM_PERM
+BAND_FORMAT = '<%dI' % ROWS
+
+def shingles(text):
+    # crc32 rather than hash(): str hashes are salted per process and signatures are persisted
+    normalised = ' '.join(re.findall(r'\w+', (text or '').lower()))
+    if len(normalised) <= SHINGLE_SIZE:
+        return {zlib.crc32(normalised.encode())} if normalised else set()
+    return {zlib.crc32(normalised[i:i + SHINGLE_SIZE].encode())
+            for i in range(len(normalised) - SHINGLE_SIZE + 1)}
+
+def signature(text):
+    """MinHash signature of text as a tuple of NUM_PERM 32-bit ints."""
+    values = shingles(text)
+    if not values:
+        return (MASK32,) * NUM_PERM
+    if np is not None:
+        # One (permutations x shingles) matrix instead of NUM_PERM Python loops
+        x = np.fromiter(values, dtype=np.uint64, count=len(values))[None, :]
+        hashed = (_A * x + _B) % np.uint64(PRIME) & np.uint64(MASK32)
+        return tuple(int(v) for v in hashed.min(axis=1))
+    return tuple(min(((a * x + b) & MASK64) % PRIME & MASK32 for x in values)
+                 for a, b in zip(PERM_A, PERM_B))
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity: the fraction of permutations with the same minimum."""
+    if np is not None:
+        return float(np.mean(np.asarray(sig_a) == np.asarray(sig_b)))
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / float(NUM_PERM)
+
+def band_keys(sig):
+    return [(band, zlib.crc32(struct.pack(BAND_FORMAT, *sig[band * ROWS:(band + 1) * ROWS])))
+            for band in range(BANDS)]
+
+def pack(sig):
+    return struct.pack(SIGNATURE_FORMAT, *sig)
+
+def unpack(blob):
+    return struct.unpack(SIGNATURE_FORMAT, bytes(blob))
+
+def ticket_text(title, description):
+    return '%s %s' % (title or '', description or '')
+
+# --- Lookups ---
+def find_similar(db, sig, user_id=None, exclude=None, limit=MAX_SUGGESTIONS):
+    """Open tickets whose signature is at least THRESHOLD similar, best first.
+
+    Only tickets sharing an LSH band are compared, so the cost follows the bucket sizes, not the table.
+    """
+    keys = band_keys(sig)
+    # Aggregating the bucket hits first makes the planner start from the primary key lookups
+    q = '''
+        SELECT c.ticket_id, c.shared
+        FROM (
+            SELECT ticket_id, COUNT(*) AS shared FROM ticket_lsh_buckets
+            WHERE %s
+            GROUP BY ticket_id
+        ) AS c
+        JOIN tickets t ON t.id = c.ticket_id
+        WHERE t.status = 'Open'
+    ''' % ' OR '.join(['(band = ? AND bucket = ?)'] * len(keys))
+    params = [value for key in keys for value in key]
+    # Same visibility rule as the dashboard: employees only see their own tickets
+    if user_id is not None:
+        q += ' AND t.user_id = ?'
+        params.append(user_id)
+    if exclude is not None:
+        q += ' AND c.ticket_id <> ?'
+        params.append(exclude)
+    q += ' ORDER BY c.shared DESC, c.ticket_id LIMIT ?'
+    params.append(MAX_CANDIDATES)
+    candidates = [row['ticket_id'] for row in db.execute(q, params)]
+    if not candidates:
+        return []
+
+    rows = db.execute('''
+        SELECT t.id, t.title, t.status, t.created_at, s.signature, s.cluster_id
+        FROM ticket_signatures s
+        JOIN tickets t ON t.id = s.ticket_id
+        WHERE s.ticket_id IN (%s)
+    ''' % ','.join('?' * len(candidates)), candidates).fetchall()
+    matches = []
+    for row in rows:
+        score = similarity(sig, unpack(row['signature']))
+        if score >= THRESHOLD:
+            matches.append({'id': row['id'], 'title': row['title'], 'status': row['status'],
+                            'created_at': row['created_at'], 'cluster_id': row['cluster_id'],
+                            'similarity': round(score, 2)})
+    matches.sort(key=lambda m: (-m['similarity'], m['id']))
+    return matches[:limit]
+
+def similar_to_text(db, title, description, user_id=None, limit=MAX_SUGGESTIONS):
+    return find_similar(db, signature(ticket_text(title, description)), user_id, limit=limit)
+
+# --- Maintaining the index ---
+def index_ticket(db, ticket_id, title, description):
+    """(Re)index one ticket and return its cluster id. Callers commit.
+
+    A new ticket joins the cluster of its closest open near-duplicate, or starts its own;
+    a reindexed ticket keeps the cluster it had so edits don't reshuffle groups.
+    """
+    sig = signature(ticket_text(title, description))
+    row = db.execute('SELECT cluster_id FROM ticket_signatures WHERE ticket_id = ?', (ticket_id,)).fetchone()
+    if row is not None:
+        cluster_id = row['cluster_id']
+    else:
+        matches = find_similar(db, sig, exclude=ticket_id, limit=1)
+        cluster_id = matches[0]['cluster_id'] if matches else ticket_id
+    db.execute('''
+        INSERT INTO ticket_signatures (ticket_id, signature, cluster_id) VALUES (?, ?, ?)
+        ON CONFLICT (ticket_id) DO UPDATE SET signature = excluded.signature
+    ''', (ticket_id, pack(sig), cluster_id))
+    db.execute('DELETE FROM ticket_lsh_buckets WHERE ticket_id = ?', (ticket_id,))
+    db.executemany('INSERT INTO ticket_lsh_buckets (band, bucket, ticket_id) VALUES (?, ?, ?)',
+                   [(band, bucket, ticket_id) for band, bucket in band_keys(sig)])
+    return cluster_id
+
+def index_missing(db, batch_size=500, pause=0.0, log=None):
+    """Index tickets that have no signature yet, in id order, one transaction per batch."""
+    log = log or (lambda message: None)
+    last_id = indexed = 0
+    while True:
+        rows = db.execute('''
+            SELECT t.id, t.title, t.description FROM tickets t
+            WHERE t.id > ? AND NOT EXISTS (SELECT 1 FROM ticket_signatures s WHERE s.ticket_id = t.id)
+            ORDER BY t.id LIMIT ?
+        ''', (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        with db:
+            for row in rows:
+                index_ticket(db, row['id'], row['title'], row['description'])
+        indexed += len(rows)
+        last_id = rows[-1]['id']
+        log('  indexed %d tickets' % indexed)
+        if pause:
+            time.sleep(pause)
+    return indexed
+
+def rebuild_index(db, batch_size=500, log=None):
+    with db:
+        db.execute('DELETE FROM ticket_lsh_buckets')
+        db.execute('DELETE FROM ticket_signatures')
+    return index_missing(db, batch_size, log=log)
+
+# --- flask duplicates rebuild ---
+duplicates_cli = AppGroup('duplicates', help='Near-duplicate ticket index.')
+
+@duplicates_cli.command('rebuild')
+@click.option('--batch-size', default=500, show_default=True)
+def rebuild_command(batch_size):
+    """Recompute every signature and regroup open tickets from scratch."""
+    started = time.perf_counter()
+    count = rebuild_index(get_db(), batch_size, log=lambda message: click.echo(message, err=True))
+    click.echo('indexed %d tickets in %.1fs (%s)' % (
+        count, time.perf_counter() - started, 'numpy' if np is not None else 'pure python'))
+
+def init_app(app):
+    app.cli.add_command(duplicates_cli)
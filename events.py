@@ -0,0 +1,276 @@
+from flask import Blueprint, Response, current_app, has_app_context, request, session, redirect, url_for
+from collections import deque
+from contextlib import contextmanager
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+from db import dialect, get_db
+
+log = logging.getLogger('helpdesk.events')
+
+# Old rows are trimmed once every this many events rather than on each insert
+TRIM_EVERY = 100
+
+# --- Change log, shared through the database ---
+class ChangeLog:
+    # Events are rows in change_log, so every worker (and node) on the database shares one id
+    # sequence. Each process caches the newest maxlen of them; while a stream is waiting, one poller
+    # thread reads rows other processes wrote. Writes made in this process wake streams at once.
+    def __init__(self, app, maxlen=1000, poll_interval=1.0):
+        self.app = app
+        self.maxlen = maxlen
+        self.poll_interval = poll_interval
+        self._events = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self._refresh_lock = threading.Lock()
+        self._last_id = None        # unknown until the table is first read
+        self._refreshed = 0.0
+        # Wake-up callbacks for streams waiting on an event loop instead of the condition
+        self._listeners = set()
+        self._waiting = 0
+        self._poller = None
+        self._pid = None
+
+    @contextmanager
+    def _connection(self, db=None):
+        if db is not None:
+            yield db
+        elif has_app_context() and current_app._get_current_object() is self.app:
+            yield get_db()
+        else:
+            with self.app.app_context():
+                yield get_db()
+
+    @property
+    def last_id(self):
+        if self._last_id is None or time.monotonic() - self._refreshed > self.poll_interval:
+            self.refresh()
+        return self._last_id
+
+    def append(self, event_type, ticket_id, owner_id, data=None, db=None):
+        return self.append_many([(event_type, ticket_id, owner_id, data or {})], db)[0]
+
+    def append_many(self, events, db=None):
+        """Write (type, ticket_id, owner_id, data) events in one transaction, then wake local streams.
+
+        Called on a connection that is already in a transaction, the rows commit with it.
+        """
+        with self._connection(db) as db:
+            with db:
+                if dialect(db) == 'postgresql':
+                    # Serialise writers so ids commit in order: a reader that has seen id n never
+                    # later finds a smaller one appear
+                    db.execute('LOCK TABLE change_log IN EXCLUSIVE MODE')
+                written = []
+                for event_type, ticket_id, owner_id, data in events:
+                    event_id = db.execute('''
+                        INSERT INTO change_log (type, ticket_id, owner_id, data, created_at) VALUES (?, ?, ?, ?, ?)
+                        RETURNING id
+                    ''', (event_type, ticket_id, owner_id, json.dumps(data), time.time())).fetchone()[0]
+                    written.append({'id': event_id, 'type': event_type, 'ticket_id': ticket_id,
+                                    'owner_id': owner_id, 'data': data})
+                if written and written[-1]['id'] // TRIM_EVERY != (written[0]['id'] - 1) // TRIM_EVERY:
+                    db.execute('DELETE FROM change_log WHERE id <= ?', (written[-1]['id'] - self.maxlen,))
+            self.refresh(db)
+        return written
+
+    def refresh(self, db=None):
+        """Cache events written since the newest one seen here, then wake waiting streams."""
+        with self._refresh_lock, self._connection(db) as db:
+            after = self._last_id or 0
+            rows = db.execute('''
+                SELECT id, type, ticket_id, owner_id, data FROM change_log WHERE id > ? ORDER BY id DESC LIMIT ?
+            ''', (after, self.maxlen)).fetchall()
+            self._refreshed = time.monotonic()
+            with self._cond:
+                if len(rows) == self.maxlen and rows[-1]['id'] > after + 1:
+                    # Fell further behind than the cache holds; older resume points can't be served
+                    self._events.clear()
+                for row in reversed(rows):
+                    self._events.append({'id': row['id'], 'type': row['type'], 'ticket_id': row['ticket_id'],
+                                         'owner_id': row['owner_id'], 'data': json.loads(row['data'])})
+                self._last_id = rows[0]['id'] if rows else after
+                if not rows:
+                    return
+                self._cond.notify_all()
+                listeners = list(self._listeners)
+        for wake in listeners:
+            wake()
+
+    def clear(self):
+        # For a database that was just recreated: ids start again from 1
+        with self._refresh_lock, self._cond:
+            self._events.clear()
+            self._last_id = None
+
+    def since(self, last_id):
+        # Returns (events, complete); complete is False when the resume point can't be honoured,
+        # either because it already fell out of the buffer or because the log restarted
+        if self._last_id is None or last_id > self._last_id:
+            # A client that reconnected to another worker may have seen ids this one hasn't read yet
+            self.refresh()
+        with self._cond:
+            if last_id > self._last_id:
+                return [], False
+            oldest = self._events[0]['id'] if self._events else self._last_id + 1
+            return [e for e in self._events if e['id'] > last_id], last_id >= oldest - 1
+
+    # --- Waiting for new events ---
+    def _ensure_poller(self):
+        # Started by the first waiting stream, and again after fork
+        with self._cond:
+            if self._poller is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._poller = threading.Thread(target=self._poll, name='change-log-poller', daemon=True)
+                self._poller.start()
+
+    def _poll(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.poll_interval)
+            if not (self._waiting or self._listeners) or time.monotonic() - self._refreshed < self.poll_interval:
+                continue
+            try:
+                self.refresh()
+            except Exception:
+                log.exception('change log poll failed')
+
+    def wait(self, last_id, timeout):
+        self._ensure_poller()
+        with self._cond:
+            self._waiting += 1
+            try:
+                return self._cond.wait_for(lambda: self._last_id > last_id, timeout)
+            finally:
+                self._waiting -= 1
+
+    async def wait_async(self, last_id, timeout):
+        # Like wait(), but parks a coroutine rather than a thread
+        self._ensure_poller()
+        loop = asyncio.get_running_loop()
+        woken = asyncio.Event()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(woken.set)
+            except RuntimeError:  # the loop has already shut down
+                pass
+
+        with self._cond:
+            if self._last_id > last_id:
+                return True
+            self._listeners.add(wake)
+        try:
+            await asyncio.wait_for(woken.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._listeners.discard(wake)
+        return self._last_id > last_id
+
+def get_change_log(app=None):
+    app = app or current_app
+    return app.extensions['change_log']
+
+def publish(event_type, ticket_id, owner_id, **data):
+    return get_change_log().append(event_type, ticket_id, owner_id, data, db=get_db())
+
+def publish_many(events, db=None):
+    # [(type, ticket_id, owner_id, data)], written in one transaction
+    return get_change_log().append_many(events, db=db or get_db())
+
+def ticket_owner(db, ticket_id):
+    row = db.execute('SELECT user_id FROM tickets WHERE id = ?', (ticket_id,)).fetchone()
+    return row['user_id'] if row else None
+
+# --- Server-sent events endpoint ---
+events = Blueprint('events', __name__)
+
+def format_event(event):
+    payload = {k: event[k] for k in ('type', 'ticket_id')}
+    payload.update(event['data'])
+    return 'id: %d\nevent: %s\ndata: %s\n\n' % (event['id'], event['type'], json.dumps(payload))
+
+@events.route('/events')
+def stream():
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+
+    # Capture visibility up front: the stream outlives the request context
+    user_id = session['user_id']
+    is_admin = session.get('role') == 'admin'
+    log = get_change_log()
+    heartbeat = current_app.config['SSE_HEARTBEAT']
+    max_duration = current_app.config['SSE_MAX_DURATION']
+    last_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id', log.last_id), type=int)
+
+    def visible(event):
+        if is_admin or event['owner_id'] == user_id:
+            return True
+        # A reassigned ticket's new owner hears about it as well as the old one
+        return event['type'] == 'ticket.reassigned' and event['data'].get('user_id') == user_id
+
+    # direct_passthrough hands the stream object itself to the server: WSGI servers iterate it,
+    # the ASGI adapter (asgi.py) awaits it so an open stream holds no thread
+    resp = Response(EventStream(log, last_id, visible, heartbeat, max_duration), mimetype='text/event-stream',
+                    direct_passthrough=True)
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+class EventStream:
+    def __init__(self, log, last_id, visible, heartbeat, max_duration):
+        self.log = log
+        self.last_id = last_id
+        self.visible = visible
+        self.heartbeat = heartbeat
+        self.max_duration = max_duration
+
+    def _pending(self):
+        batch, complete = self.log.since(self.last_id)
+        if not complete:
+            # Resume point is gone; the client reloads its list and we carry on from here
+            self.last_id, batch = self.log.last_id, []
+            yield 'id: %d\nevent: reset\ndata: {}\n\n' % self.last_id
+        for event in batch:
+            self.last_id = event['id']
+            if self.visible(event):
+                yield format_event(event)
+
+    def __iter__(self):
+        yield b'retry: 3000\n\n'
+        deadline = time.monotonic() + self.max_duration
+        while True:
+            for chunk in self._pending():
+                yield chunk.encode()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not self.log.wait(self.last_id, min(self.heartbeat, remaining)):
+                yield b': keep-alive\n\n'
+
+    async def __aiter__(self):
+        yield b'retry: 3000\n\n'
+        deadline = time.monotonic() + self.max_duration
+        while True:
+            for chunk in self._pending():
+                yield chunk.encode()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not await self.log.wait_async(self.last_id, min(self.heartbeat, remaining)):
+                yield b': keep-alive\n\n'
+
+def init_app(app):
+    app.config.setdefault('SSE_HEARTBEAT', 15)
+    app.config.setdefault('SSE_MAX_DURATION', 300)
+    app.config.setdefault('CHANGE_LOG_SIZE', 1000)
+    # How often a process with waiting streams looks for events written by other processes
+    app.config.setdefault('SSE_POLL_INTERVAL', 1.0)
+    app.extensions['change_log'] = ChangeLog(app, app.config['CHANGE_LOG_SIZE'], app.config['SSE_POLL_INTERVAL'])
+    app.register_blueprint(events)
@@ -0,0 +1,202 @@
+from collections import OrderedDict
+from flask import current_app
+import glob
+import os
+import tempfile
+import threading
+
+# --- Backends: both store rendered HTML keyed by (namespace, object id, version) ---
+class MemoryBackend:
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        # Returns the number of entries evicted to make room
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, namespace, obj_id):
+        with self._lock:
+            stale = [k for k in self._entries if k[0] == namespace and k[1] == obj_id]
+            for k in stale:
+                del self._entries[k]
+            return len(stale)
+
+    def delete_many(self, namespace, obj_ids):
+        # One pass over the entries however many objects are dropped
+        obj_ids = set(obj_ids)
+        with self._lock:
+            stale = [k for k in self._entries if k[0] == namespace and k[1] in obj_ids]
+            for k in stale:
+                del self._entries[k]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class DiskBackend:
+    # Files in a shared directory, so every gunicorn worker on the host sees the same entries
+    def __init__(self, directory, maxsize=10000):
+        self.directory = directory
+        self.maxsize = maxsize
+        self._writes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        namespace, obj_id, version = key
+        return os.path.join(self.directory, '%s-%d-v%d.html' % (namespace, obj_id, version))
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                value = f.read()
+        except OSError:
+            return None
+        # Touch on read so eviction approximates LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(value)
+        os.replace(tmp, self._path(key))
+
+        # Only scan the directory every so often, it's the expensive part
+        self._writes += 1
+        if self._writes % 64:
+            return 0
+        return self._evict()
+
+    def _evict(self):
+        paths = glob.glob(os.path.join(self.directory, '*.html'))
+        excess = len(paths) - self.maxsize
+        if excess <= 0:
+            return 0
+        paths.sort(key=lambda p: os.stat(p).st_mtime if os.path.exists(p) else 0)
+        evicted = 0
+        for path in paths[:excess]:
+            try:
+                os.remove(path)
+                evicted += 1
+            except OSError:
+                pass
+        return evicted
+
+    def delete(self, namespace, obj_id):
+        removed = 0
+        for path in glob.glob(os.path.join(self.directory, '%s-%d-v*.html' % (namespace, obj_id))):
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def delete_many(self, namespace, obj_ids):
+        # One directory listing instead of a glob per object
+        obj_ids = set(obj_ids)
+        prefix = namespace + '-'
+        removed = 0
+        for name in os.listdir(self.directory):
+            if not name.startswith(prefix) or not name.endswith('.html'):
+                continue
+            obj_id = name[len(prefix):].split('-v', 1)[0]
+            if obj_id.isdigit() and int(obj_id) in obj_ids:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.directory, '*.html')):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+# --- Cache front end with hit/miss/eviction counters ---
+class FragmentCache:
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def get_or_render(self, namespace, obj_id, version, render):
+        if self.backend is None:
+            return render()
+        key = (namespace, obj_id, version)
+        value = self.backend.get(key)
+        if value is not None:
+            self._count('hits')
+            return value
+        self._count('misses')
+        value = render()
+        self._count('evictions', self.backend.set(key, value))
+        return value
+
+    def invalidate(self, namespace, obj_id):
+        if self.backend is not None:
+            self._count('invalidations', self.backend.delete(namespace, obj_id))
+
+    def invalidate_many(self, namespace, obj_ids):
+        if self.backend is not None and obj_ids:
+            self._count('invalidations', self.backend.delete_many(namespace, obj_ids))
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+def get_fragment_cache(app=None):
+    app = app or current_app
+    return app.extensions['fragment_cache']
+
+def invalidate_ticket(ticket_id):
+    cache = get_fragment_cache()
+    cache.invalidate('ticket', ticket_id)
+    cache.invalidate('comments', ticket_id)
+
+def invalidate_tickets(ticket_ids):
+    cache = get_fragment_cache()
+    cache.invalidate_many('ticket', ticket_ids)
+    cache.invalidate_many('comments', ticket_ids)
+
+def init_app(app):
+    app.config.setdefault('FRAGMENT_CACHE', 'memory')
+    app.config.setdefault('FRAGMENT_CACHE_SIZE', 1024)
+    app.config.setdefault('FRAGMENT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'helpdesk-fragments'))
+
+    kind = app.config['FRAGMENT_CACHE']
+    if kind == 'memory':
+        backend = MemoryBackend(app.config['FRAGMENT_CACHE_SIZE'])
+    elif kind == 'disk':
+        backend = DiskBackend(app.config['FRAGMENT_CACHE_DIR'], app.config['FRAGMENT_CACHE_SIZE'])
+    else:
+        backend = None
+    app.extensions['fragment_cache'] = FragmentCache(backend)
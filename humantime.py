@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from flask import g, has_app_context
+import humanize
+
+# --- SQLite converter: TIMESTAMP columns arrive as datetimes (see db.connect_db) ---
+def parse_timestamp(value):
+    text = value.decode() if isinstance(value, bytes) else value
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def request_now():
+    # One "now" per request so every row on a page is measured against the same instant
+    if not has_app_context():
+        return utcnow()
+    if 'naturaltime_now' not in g:
+        g.naturaltime_now = utcnow()
+    return g.naturaltime_now
+
+def to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    raise TypeError(value)
+
+# --- Relative time formatting, memoised per bucket ---
+def _bucket(seconds):
+    # humanize prints seconds under a minute, rounded minutes under an hour, rounded hours under a day
+    # and whole days (or months and years made of them) beyond. Flooring to a step inside those units
+    # keeps the text unless the floor lands on a rounding point: hours round half to even, so the
+    # minute starting at each half hour keeps its seconds.
+    magnitude = abs(seconds)
+    if magnitude < 3600:
+        step = 1
+    elif magnitude < 86400:
+        step = 1 if (magnitude - 1800) % 3600 < 60 else 60
+    else:
+        step = 3600
+    bucketed = magnitude // step * step
+    return bucketed if seconds >= 0 else -bucketed
+
+@lru_cache(maxsize=8192)
+def _describe(bucket):
+    return humanize.naturaltime(timedelta(seconds=bucket))
+
+def naturaltime(value, now=None):
+    if not value:
+        return ''
+    try:
+        dt = to_datetime(value)
+    except (TypeError, ValueError):
+        return value
+    now = now or request_now()
+    return _describe(_bucket(int((now - dt).total_seconds())))
+
+def naturaltime_many(values, now=None):
+    now = now or request_now()
+    return [naturaltime(v, now) for v in values]
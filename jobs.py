@@ -0,0 +1,274 @@
+from flask import current_app, g
+from flask.cli import with_appcontext
+import click
+import json
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+import traceback
+
+from db import dialect, get_db
+from storage import INTEGRITY_ERRORS
+
+log = logging.getLogger('helpdesk.jobs')
+
+# --- Task registry ---
+TASKS = {}
+
+def task(name):
+    def register(fn):
+        TASKS[name] = fn
+        return fn
+    return register
+
+# --- Producer side ---
+def enqueue(name, payload=None, delay=0, key=None, max_attempts=None, db=None):
+    """Queue a job on the caller's connection; it becomes visible when the caller commits.
+
+    Jobs with a key are coalesced: while one is still queued, enqueueing the same key is a no-op.
+    """
+    if name not in TASKS:
+        raise KeyError('Unknown task: %s' % name)
+    db = db or get_db()
+    now = time.time()
+    db.execute('''
+        INSERT INTO jobs (task, payload, key, run_at, max_attempts, created_at) VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (key) WHERE status = 'queued' DO NOTHING
+    ''', (name, json.dumps(payload or {}), key, now + delay,
+          max_attempts or current_app.config['JOB_MAX_ATTEMPTS'], now))
+    # Wake in-process workers once the request (and its commit) is done
+    g.jobs_enqueued = True
+
+def backoff(attempts, base, cap):
+    # Exponential with jitter so a failing dependency isn't hit by every retry at once
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay * (0.5 + random.random() / 2)
+
+# --- Consumer side ---
+def claim(db, owner, lease):
+    # For running jobs run_at holds the lease expiry, so a crashed worker's jobs become claimable again
+    now = time.time()
+    postgres = dialect(db) == 'postgresql'
+    if not postgres:
+        # SQLite has one writer: take the lock up front so two workers can't pick the same row
+        db.execute('BEGIN IMMEDIATE')
+    try:
+        # On PostgreSQL workers on every node claim concurrently; SKIP LOCKED passes over rows a peer holds
+        job = db.execute('''
+            UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?, run_at = ?
+            WHERE id = (
+                SELECT id FROM jobs WHERE status IN ('queued', 'running') AND run_at <= ?
+                ORDER BY run_at LIMIT 1%s
+            )
+            RETURNING id, task, payload, attempts, max_attempts, created_at
+        ''' % (' FOR UPDATE SKIP LOCKED' if postgres else ''), (owner, now + lease, now)).fetchone()
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    return job
+
+def run_one(owner=None, stats=None):
+    """Claim and run one ready job in the current app context. Returns False if none was ready."""
+    config = current_app.config
+    owner = owner or worker_name()
+    stats = stats if stats is not None else current_app.extensions['jobs'].stats
+    db = get_db()
+    job = claim(db, owner, config['JOB_LEASE_SECONDS'])
+    if job is None:
+        return False
+
+    started = time.time()
+    if job['attempts'] == 1:
+        stats.add('wait_seconds', started - job['created_at'])
+    try:
+        fn = TASKS[job['task']]
+        fn(**json.loads(job['payload']))
+        if db.in_transaction:
+            db.commit()
+    except Exception:
+        db.rollback()
+        error = traceback.format_exc(limit=5)
+        if job['attempts'] >= job['max_attempts']:
+            log.error('job %d (%s) failed permanently after %d attempts\n%s',
+                      job['id'], job['task'], job['attempts'], error)
+            db.execute("UPDATE jobs SET status = 'failed', lease_owner = NULL, last_error = ? "
+                       "WHERE id = ? AND lease_owner = ?", (error, job['id'], owner))
+            stats.add('failed')
+        else:
+            delay = backoff(job['attempts'], config['JOB_BACKOFF_BASE'], config['JOB_BACKOFF_MAX'])
+            log.warning('job %d (%s) attempt %d failed, retrying in %.1fs',
+                        job['id'], job['task'], job['attempts'], delay)
+            # A savepoint, because a failed statement aborts the whole transaction on PostgreSQL
+            db.execute('SAVEPOINT requeue')
+            try:
+                db.execute("UPDATE jobs SET status = 'queued', lease_owner = NULL, last_error = ?, run_at = ? "
+                           "WHERE id = ? AND lease_owner = ?", (error, time.time() + delay, job['id'], owner))
+                db.execute('RELEASE requeue')
+            except INTEGRITY_ERRORS:
+                # A newer job with the same key is already queued and will redo this work
+                db.execute('ROLLBACK TO requeue')
+                db.execute('DELETE FROM jobs WHERE id = ? AND lease_owner = ?', (job['id'], owner))
+            stats.add('retried')
+        db.commit()
+        return True
+    finally:
+        stats.add('run_seconds', time.time() - started)
+
+    # Finished jobs are removed; only failures are kept for inspection
+    db.execute('DELETE FROM jobs WHERE id = ? AND lease_owner = ?', (job['id'], owner))
+    db.commit()
+    stats.add('processed')
+    return True
+
+def run_pending(app=None, limit=None):
+    """Drain every ready job synchronously (flask worker --burst, and tests)."""
+    app = app or current_app._get_current_object()
+    done = 0
+    while limit is None or done < limit:
+        with app.app_context():
+            if not run_one():
+                break
+        done += 1
+    return done
+
+def worker_name():
+    return '%s:%d:%d' % (socket.gethostname(), os.getpid(), threading.get_ident())
+
+class JobStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {'processed': 0, 'retried': 0, 'failed': 0, 'wait_seconds': 0.0, 'run_seconds': 0.0}
+
+    def add(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counters)
+
+def queue_stats(db):
+    now = time.time()
+    rows = db.execute('SELECT status, COUNT(*) AS n, min(created_at) AS oldest FROM jobs GROUP BY status').fetchall()
+    by_status = {row['status']: row for row in rows}
+    queued = by_status.get('queued')
+    return {
+        'queued': queued['n'] if queued else 0,
+        'running': by_status['running']['n'] if 'running' in by_status else 0,
+        'dead': by_status['failed']['n'] if 'failed' in by_status else 0,
+        'oldest_queued_seconds': now - queued['oldest'] if queued else 0.0,
+    }
+
+# --- In-process worker threads ---
+class JobWorkers:
+    def __init__(self, app, workers, poll_interval):
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stats = JobStats()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+
+    def start(self):
+        # Started lazily, and again after fork, so a preloading master never owns the threads
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid() or self.workers <= 0:
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._threads = [threading.Thread(target=self._loop, name='job-worker-%d' % n, daemon=True)
+                             for n in range(self.workers)]
+            for t in self._threads:
+                t.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        with self._lock:
+            self._threads = []
+            self._pid = None
+
+    def _loop(self):
+        owner = worker_name()
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    ran = run_one(owner, self.stats)
+            except Exception:
+                log.exception('job worker error')
+                ran = False
+            if not ran:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def snapshot(self, db=None):
+        return {**queue_stats(db or get_db()), **self.stats.snapshot()}
+
+def get_job_workers(app=None):
+    app = app or current_app
+    return app.extensions['jobs']
+
+def start_workers():
+    # Each process starts its threads on its first request, so jobs left queued by a restart
+    # are picked up without waiting for something new to be enqueued
+    if not current_app.testing:
+        get_job_workers().start()
+
+def wake_workers(error=None):
+    if g.pop('jobs_enqueued', False):
+        workers = get_job_workers()
+        # Under test jobs stay queued until the test drains them with run_pending()
+        if not current_app.testing:
+            workers.start()
+        workers.wake()
+
+# --- flask worker ---
+@click.command('worker')
+@click.option('--concurrency', default=2, show_default=True, help='Worker threads.')
+@click.option('--burst', is_flag=True, help='Run every ready job, then exit.')
+@with_appcontext
+def worker_command(concurrency, burst):
+    """Work the background job queue outside the web process."""
+    app = current_app._get_current_object()
+    if burst:
+        click.echo('ran %d jobs' % run_pending(app), err=True)
+        return
+    workers = JobWorkers(app, concurrency, app.config['JOB_POLL_INTERVAL'])
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    workers.start()
+    click.echo('worker started with %d threads' % concurrency, err=True)
+    try:
+        while not stopping.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+    # Let jobs in flight finish; anything cut short is re-claimed when its lease runs out
+    workers.stop(timeout=app.config['JOB_LEASE_SECONDS'])
+
+def init_app(app):
+    app.config.setdefault('JOB_WORKERS', 2)
+    app.config.setdefault('JOB_POLL_INTERVAL', 1.0)
+    app.config.setdefault('JOB_LEASE_SECONDS', 60)
+    app.config.setdefault('JOB_MAX_ATTEMPTS', 5)
+    app.config.setdefault('JOB_BACKOFF_BASE', 2.0)
+    app.config.setdefault('JOB_BACKOFF_MAX', 300.0)
+    app.extensions['jobs'] = JobWorkers(app, app.config['JOB_WORKERS'], app.config['JOB_POLL_INTERVAL'])
+    app.before_request(start_workers)
+    app.teardown_request(wake_workers)
+    app.cli.add_command(worker_command)
@@ -0,0 +1,269 @@
+from flask import current_app
+from flask.cli import AppGroup
+import click
+import importlib.util
+import os
+import re
+import time
+
+from db import dialect, get_db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+# 0002_add_sla_rollups.sql / 0003_backfill_vectors.py
+FILENAME = re.compile(r'^(\d{4})_(\w+)\.(sql|py)$')
+# A database with these tables but no schema_version predates migrations. 0001_initial.sql is the
+# pre-migrations schema.sql without its DROP TABLE prelude, so stamping it as version 1 is accurate;
+# add later schema as new files.
+BASELINE_VERSION = 1
+BASELINE_TABLE = 'users'
+
+class MigrationError(RuntimeError):
+    """Raised for a broken migrations directory or a migration that fails to apply."""
+
+# --- Discovery ---
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    @property
+    def kind(self):
+        return os.path.splitext(self.path)[1][1:]
+
+    def __repr__(self):
+        return '<Migration %04d_%s>' % (self.version, self.name)
+
+def discover(directory=MIGRATIONS_DIR):
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = FILENAME.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError('Two migrations share version %04d: %s and %s'
+                                 % (version, os.path.basename(migrations[version].path), filename))
+        migrations[version] = Migration(version, match.group(2), os.path.join(directory, filename))
+    return [migrations[v] for v in sorted(migrations)]
+
+# --- Version bookkeeping ---
+def ensure_version_table(db):
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            duration_ms REAL
+        )
+    ''')
+    # Stamp databases created from the old schema.sql so their data is kept
+    if dialect(db) == 'sqlite' and not db.execute('SELECT 1 FROM schema_version').fetchone() and db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (BASELINE_TABLE,)).fetchone():
+        db.execute("INSERT INTO schema_version (version, name) VALUES (?, 'baseline')", (BASELINE_VERSION,))
+    db.commit()
+
+def applied_versions(db):
+    ensure_version_table(db)
+    return {row['version']: row for row in db.execute(
+        'SELECT version, name, applied_at, duration_ms FROM schema_version ORDER BY version')}
+
+def current_version(db):
+    return max(applied_versions(db), default=0)
+
+def pending(db, migrations):
+    applied = applied_versions(db)
+    return [m for m in migrations if m.version not in applied]
+
+def record(db, migration, duration):
+    with db:
+        db.execute('INSERT INTO schema_version (version, name, duration_ms) VALUES (?, ?, ?)',
+                   (migration.version, migration.name, duration * 1000))
+
+# --- Helpers for Python migrations ---
+class Context:
+    """Passed to upgrade(ctx) in .py migrations.
+
+    Long work is split into short transactions so the app's writers only ever wait
+    for one batch. Python migrations are not atomic, so every step must be safe to rerun.
+    """
+
+    def __init__(self, db, batch_size=1000, pause=0.05, log=None):
+        self.db = db
+        self.batch_size = batch_size
+        self.pause = pause
+        self.log = log or (lambda message: None)
+
+    def execute(self, sql, params=()):
+        with self.db:
+            return self.db.execute(sql, params)
+
+    def script(self, sql):
+        # Several DDL statements (tables, triggers) in one short transaction
+        run_script(self.db, sql)
+
+    def batches(self, table, key=None, batch_size=None):
+        """Yield (first, last) key ranges covering table, pausing after each; do each range in one transaction.
+
+        key defaults to rowid on SQLite and id on PostgreSQL. The ranges are fixed when iteration
+        starts, so rows added later are left to the triggers.
+        """
+        batch_size = batch_size or self.batch_size
+        key = key or ('rowid' if dialect(self.db) == 'sqlite' else 'id')
+        low, high = self.db.execute('SELECT min(%s), max(%s) FROM %s' % (key, key, table)).fetchone()
+        if low is None:
+            return
+        for start in range(low, high + 1, batch_size):
+            yield start, start + batch_size - 1
+            if self.pause:
+                time.sleep(self.pause)
+
+    def create_index(self, name, table, columns, where=None, unique=False):
+        # SQLite builds an index in one statement; running it alone keeps the write lock to the sort itself
+        # and readers carry on under WAL. PostgreSQL builds CONCURRENTLY, which never blocks writers.
+        postgres = dialect(self.db) == 'postgresql'
+        sql = 'CREATE %sINDEX %sIF NOT EXISTS %s ON %s(%s)' % (
+            'UNIQUE ' if unique else '', 'CONCURRENTLY ' if postgres else '', name, table, columns)
+        if where:
+            sql += ' WHERE ' + where
+        started = time.perf_counter()
+        if postgres:
+            self.db.execute_outside_transaction(sql)
+        else:
+            self.execute(sql)
+        self.log('  index %s on %s built in %.2fs' % (name, table, time.perf_counter() - started))
+
+    def backfill(self, table, assignments, where=None, params=(), batch_size=None, key=None):
+        """UPDATE table SET assignments in key ranges, one transaction per batch; returns rows changed.
+
+        key defaults to rowid on SQLite and id on PostgreSQL.
+        """
+        key = key or ('rowid' if dialect(self.db) == 'sqlite' else 'id')
+        sql = 'UPDATE %s SET %s WHERE %s BETWEEN ? AND ?' % (table, assignments, key)
+        if where:
+            sql += ' AND (%s)' % where
+        changed = 0
+        for first, last in self.batches(table, key, batch_size):
+            with self.db:
+                changed += self.db.execute(sql, tuple(params) + (first, last)).rowcount
+        self.log('  backfilled %d rows of %s' % (changed, table))
+        return changed
+
+# --- Applying ---
+def run_script(db, script):
+    # executescript commits first, so the explicit BEGIN/COMMIT makes the whole script one transaction
+    try:
+        db.executescript('BEGIN;\n%s\n;COMMIT;' % script)
+    except Exception:
+        if db.in_transaction:
+            db.rollback()
+        raise
+
+def apply_sql(db, migration):
+    with open(migration.path, encoding='utf-8') as f:
+        run_script(db, f.read())
+
+def apply_py(migration, ctx):
+    spec = importlib.util.spec_from_file_location('migration_%04d' % migration.version, migration.path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.upgrade(ctx)
+
+def optimize(db):
+    # Fresh statistics so the planner picks up new indexes; analysis_limit keeps ANALYZE bounded on big tables
+    if dialect(db) == 'postgresql':
+        db.execute('ANALYZE')
+        db.commit()
+        return
+    db.execute('PRAGMA analysis_limit = 1000')
+    db.execute('ANALYZE')
+    db.execute('PRAGMA optimize')
+    db.commit()
+
+def directory_for(db, directory):
+    # PostgreSQL has its own schema history under migrations/postgresql
+    if dialect(db) == 'postgresql' and os.path.abspath(directory) == MIGRATIONS_DIR:
+        return os.path.join(MIGRATIONS_DIR, 'postgresql')
+    return directory
+
+def upgrade(db, target=None, directory=MIGRATIONS_DIR, batch_size=1000, pause=0.05, log=None):
+    """Apply pending migrations up to target (default: all). Returns the migrations applied."""
+    log = log or (lambda message: None)
+    todo = [m for m in pending(db, discover(directory_for(db, directory))) if target is None or m.version <= target]
+    ctx = Context(db, batch_size, pause, log)
+    for migration in todo:
+        log('applying %04d_%s' % (migration.version, migration.name))
+        started = time.perf_counter()
+        try:
+            if migration.kind == 'sql':
+                apply_sql(db, migration)
+            else:
+                apply_py(migration, ctx)
+        except Exception as e:
+            raise MigrationError('%04d_%s failed: %s' % (migration.version, migration.name, e)) from e
+        record(db, migration, time.perf_counter() - started)
+    if todo:
+        optimize(db)
+    return todo
+
+def reset(db):
+    """Drop every table, then the database is as empty as a new file. Used by init_db and tests."""
+    db.commit()
+    if dialect(db) == 'postgresql':
+        db.execute('DROP SCHEMA public CASCADE')
+        db.execute('CREATE SCHEMA public')
+        db.commit()
+        return
+    db.execute('PRAGMA foreign_keys = OFF')
+    try:
+        # Virtual tables first: dropping one also drops its shadow tables
+        for virtual_only in (True, False):
+            rows = db.execute('''
+                SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+            ''').fetchall()
+            for row in rows:
+                if not virtual_only or (row['sql'] or '').upper().startswith('CREATE VIRTUAL'):
+                    db.execute('DROP TABLE IF EXISTS "%s"' % row['name'])
+        # AUTOINCREMENT counters outlive their tables
+        if db.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+            db.execute('DELETE FROM sqlite_sequence')
+        db.commit()
+    finally:
+        db.execute('PRAGMA foreign_keys = ON')
+
+# --- flask db upgrade / status ---
+db_cli = AppGroup('db', help='Schema migrations.')
+
+@db_cli.command('upgrade')
+@click.option('--to', 'target', type=int, default=None, help='Stop after this version.')
+@click.option('--batch-size', type=int, default=None, help='Rows per backfill transaction.')
+@click.option('--pause', type=float, default=None, help='Seconds to sleep between batches.')
+def upgrade_command(target, batch_size, pause):
+    """Apply pending migrations, then refresh planner statistics."""
+    config = current_app.config
+    db = get_db()
+    applied = upgrade(db, target, config['MIGRATIONS_DIR'],
+                      batch_size or config['MIGRATION_BATCH_SIZE'],
+                      config['MIGRATION_BATCH_PAUSE'] if pause is None else pause, log=click.echo)
+    if applied:
+        click.echo('upgraded to version %d (%d applied, statistics refreshed)' % (current_version(db), len(applied)))
+    else:
+        click.echo('already at version %d' % current_version(db))
+
+@db_cli.command('status')
+def status_command():
+    """Show applied and pending migrations."""
+    db = get_db()
+    migrations = discover(directory_for(db, current_app.config['MIGRATIONS_DIR']))
+    applied = applied_versions(db)
+    click.echo('current version: %d' % max(applied, default=0))
+    for version, row in applied.items():
+        click.echo('  applied  %04d_%s  %s' % (version, row['name'], row['applied_at']))
+    for migration in pending(db, migrations):
+        click.echo('  pending  %04d_%s' % (migration.version, migration.name))
+
+def init_app(app):
+    app.config.setdefault('MIGRATIONS_DIR', MIGRATIONS_DIR)
+    app.config.setdefault('MIGRATION_BATCH_SIZE', 1000)
+    app.config.setdefault('MIGRATION_BATCH_PAUSE', 0.05)
+    app.cli.add_command(db_cli)
@@ -1,7 +1,3 @@
-DROP TABLE IF EXISTS users;
-DROP TABLE IF EXISTS tickets;
-DROP TABLE IF EXISTS comments;
-
 CREATE TABLE IF NOT EXISTS users (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   email TEXT NOT NULL UNIQUE,
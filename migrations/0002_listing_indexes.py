@@ -0,0 +1,12 @@
+def upgrade(ctx):
+    # Composite indexes backing keyset pagination (ORDER BY id DESC with an id cursor)
+    ctx.create_index('idx_tickets_user_id', 'tickets', 'user_id, id')
+    ctx.create_index('idx_tickets_status_id', 'tickets', 'status, id')
+    ctx.create_index('idx_tickets_user_status_id', 'tickets', 'user_id, status, id')
+
+    # Registration checks and bulk reassign look users up by employee ID; the directory filters by role
+    ctx.create_index('idx_users_employee_id', 'users', 'employee_id')
+    ctx.create_index('idx_users_role', 'users', 'role')
+
+    # Comment threads page newest-first by keyset on (created_at, id) within a ticket
+    ctx.create_index('idx_comments_ticket_created', 'comments', 'ticket_id, created_at, id')
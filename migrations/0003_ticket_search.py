@@ -0,0 +1,54 @@
+# Full-text index: one row per ticket (rowid = tickets.id) with its comments folded into one column
+SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS ticket_search USING fts5(
+    title,
+    description,
+    comments,
+    tokenize = 'porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS tickets_search_ai AFTER INSERT ON tickets BEGIN
+    INSERT INTO ticket_search (rowid, title, description, comments)
+    VALUES (new.id, new.title, new.description, '');
+END;
+
+CREATE TRIGGER IF NOT EXISTS tickets_search_au AFTER UPDATE OF title, description ON tickets BEGIN
+    UPDATE ticket_search SET title = new.title, description = new.description
+    WHERE rowid = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tickets_search_ad AFTER DELETE ON tickets BEGIN
+    DELETE FROM ticket_search WHERE rowid = old.id;
+END;
+
+-- New comments are indexed by the search.index_comments job (see jobs.py) rather than a trigger,
+-- since rewriting a busy ticket's FTS row on every comment is the slow part of posting one.
+-- Edits and deletes rebuild the ticket's comment column
+CREATE TRIGGER IF NOT EXISTS comments_search_au AFTER UPDATE OF content ON comments BEGIN
+    UPDATE ticket_search
+    SET comments = coalesce((SELECT group_concat(content, char(10)) FROM comments WHERE ticket_id = new.ticket_id), '')
+    WHERE rowid = new.ticket_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS comments_search_ad AFTER DELETE ON comments BEGIN
+    UPDATE ticket_search
+    SET comments = coalesce((SELECT group_concat(content, char(10)) FROM comments WHERE ticket_id = old.ticket_id), '')
+    WHERE rowid = old.ticket_id;
+END;
+'''
+
+def upgrade(ctx):
+    ctx.script(SCHEMA)
+    # Index what is already there, a range of tickets per transaction. The triggers cover tickets
+    # written meanwhile, and rows indexed by an earlier, interrupted run are skipped.
+    indexed = 0
+    for first, last in ctx.batches('tickets', 'id'):
+        with ctx.db:
+            indexed += ctx.db.execute('''
+                INSERT INTO ticket_search (rowid, title, description, comments)
+                SELECT t.id, t.title, t.description,
+                    coalesce((SELECT group_concat(content, char(10)) FROM comments c WHERE c.ticket_id = t.id), '')
+                FROM tickets t
+                WHERE t.id BETWEEN ? AND ? AND NOT EXISTS (SELECT 1 FROM ticket_search s WHERE s.rowid = t.id)
+            ''', (first, last)).rowcount
+    ctx.log('  indexed %d tickets for search' % indexed)
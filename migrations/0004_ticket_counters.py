@@ -0,0 +1,86 @@
+SCHEMA = '''
+-- Denormalized counters: tickets per (user, status), user_id 0 holds the global totals
+CREATE TABLE IF NOT EXISTS ticket_stats (
+    user_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    ticket_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, status)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS ticket_comment_stats (
+    ticket_id INTEGER PRIMARY KEY,
+    comment_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS tickets_stats_ai AFTER INSERT ON tickets BEGIN
+    INSERT INTO ticket_stats (user_id, status, ticket_count) VALUES (0, ifnull(new.status, ''), 1)
+        ON CONFLICT (user_id, status) DO UPDATE SET ticket_count = ticket_count + 1;
+    INSERT INTO ticket_stats (user_id, status, ticket_count) VALUES (ifnull(new.user_id, 0), ifnull(new.status, ''), 1)
+        ON CONFLICT (user_id, status) DO UPDATE SET ticket_count = ticket_count + 1;
+    INSERT INTO ticket_comment_stats (ticket_id, comment_count) VALUES (new.id, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tickets_stats_au AFTER UPDATE OF status, user_id ON tickets BEGIN
+    UPDATE ticket_stats SET ticket_count = ticket_count - 1
+    WHERE user_id IN (0, ifnull(old.user_id, 0)) AND status = ifnull(old.status, '');
+    INSERT INTO ticket_stats (user_id, status, ticket_count) VALUES (0, ifnull(new.status, ''), 1)
+        ON CONFLICT (user_id, status) DO UPDATE SET ticket_count = ticket_count + 1;
+    INSERT INTO ticket_stats (user_id, status, ticket_count) VALUES (ifnull(new.user_id, 0), ifnull(new.status, ''), 1)
+        ON CONFLICT (user_id, status) DO UPDATE SET ticket_count = ticket_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tickets_stats_ad AFTER DELETE ON tickets BEGIN
+    UPDATE ticket_stats SET ticket_count = ticket_count - 1
+    WHERE user_id IN (0, ifnull(old.user_id, 0)) AND status = ifnull(old.status, '');
+    DELETE FROM ticket_comment_stats WHERE ticket_id = old.id;
+END;
+
+-- Decrements only ever UPDATE, so cascaded comment deletes can't resurrect a deleted ticket's row
+CREATE TRIGGER IF NOT EXISTS comments_stats_ai AFTER INSERT ON comments BEGIN
+    INSERT INTO ticket_comment_stats (ticket_id, comment_count) VALUES (new.ticket_id, 1)
+        ON CONFLICT (ticket_id) DO UPDATE SET comment_count = comment_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS comments_stats_ad AFTER DELETE ON comments BEGIN
+    UPDATE ticket_comment_stats SET comment_count = comment_count - 1 WHERE ticket_id = old.ticket_id;
+END;
+'''
+
+def upgrade(ctx):
+    ctx.script(SCHEMA)
+    # Existing rows are counted a range per transaction. The triggers are already counting writes, so each
+    # batch overwrites its rows with exact counts and the triggers carry on from there.
+    for first, last in ctx.batches('tickets', 'id'):
+        with ctx.db:
+            ctx.db.execute('''
+                INSERT INTO ticket_comment_stats (ticket_id, comment_count)
+                SELECT t.id, (SELECT COUNT(*) FROM comments c WHERE c.ticket_id = t.id)
+                FROM tickets t WHERE t.id BETWEEN ? AND ?
+                ON CONFLICT (ticket_id) DO UPDATE SET comment_count = excluded.comment_count
+            ''', (first, last))
+
+    # Per-owner counts by ranges of owner ids, read through idx_tickets_user_id
+    for first, last in ctx.batches('tickets', 'user_id'):
+        with ctx.db:
+            ctx.db.execute('UPDATE ticket_stats SET ticket_count = 0 WHERE user_id BETWEEN ? AND ? AND user_id != 0',
+                           (first, last))
+            ctx.db.execute('''
+                INSERT INTO ticket_stats (user_id, status, ticket_count)
+                SELECT user_id, ifnull(status, ''), COUNT(*) FROM tickets
+                WHERE user_id BETWEEN ? AND ? AND user_id != 0
+                GROUP BY 1, 2
+                ON CONFLICT (user_id, status) DO UPDATE SET ticket_count = excluded.ticket_count
+            ''', (first, last))
+
+    # The global row (user_id 0) is the sum of the owners' rows plus unowned tickets
+    with ctx.db:
+        ctx.db.execute('DELETE FROM ticket_stats WHERE user_id = 0')
+        ctx.db.execute('''
+            INSERT INTO ticket_stats (user_id, status, ticket_count)
+            SELECT 0, status, sum(ticket_count) FROM (
+                SELECT status, ticket_count FROM ticket_stats WHERE user_id != 0
+                UNION ALL
+                SELECT ifnull(status, ''), 1 FROM tickets WHERE user_id IS NULL
+            ) GROUP BY status
+        ''')
+    ctx.log('  ticket counters filled')
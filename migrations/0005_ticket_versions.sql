@@ -0,0 +1,14 @@
+-- Row versioning for ETags: edits bump updated_at and version, comment changes bump version
+ALTER TABLE tickets ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+
+CREATE TRIGGER tickets_version_au AFTER UPDATE OF title, description, status, user_id ON tickets BEGIN
+    UPDATE tickets SET updated_at = CURRENT_TIMESTAMP, version = version + 1 WHERE id = new.id;
+END;
+
+CREATE TRIGGER comments_version_ai AFTER INSERT ON comments BEGIN
+    UPDATE tickets SET version = version + 1 WHERE id = new.ticket_id;
+END;
+
+CREATE TRIGGER comments_version_ad AFTER DELETE ON comments BEGIN
+    UPDATE tickets SET version = version + 1 WHERE id = old.ticket_id;
+END;
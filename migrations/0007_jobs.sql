@@ -0,0 +1,19 @@
+-- Durable background jobs. For queued jobs run_at is when they may start; for running jobs it is
+-- the lease expiry, after which another worker may claim them. Finished jobs are deleted.
+CREATE TABLE jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    key TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_at REAL NOT NULL,
+    lease_owner TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status_run_at ON jobs(status, run_at);
+-- At most one queued job per key, so bursts of the same work coalesce
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_queued_key ON jobs(key) WHERE status = 'queued';
@@ -0,0 +1,39 @@
+SCHEMA = '''
+-- Cold storage for tickets closed long ago (see archive.py). Ids are never reused because
+-- tickets uses AUTOINCREMENT, so a ticket keeps its id and URL when it moves here.
+CREATE TABLE IF NOT EXISTS tickets_archive (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    status TEXT,
+    user_id INTEGER,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    version INTEGER NOT NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS comments_archive (
+    id INTEGER PRIMARY KEY,
+    ticket_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP,
+    FOREIGN KEY (ticket_id) REFERENCES tickets_archive(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Archived tickets are only searched on request, so they get their own full-text index
+CREATE VIRTUAL TABLE IF NOT EXISTS ticket_archive_search USING fts5(
+    title,
+    description,
+    comments,
+    tokenize = 'porter unicode61'
+);
+'''
+
+def upgrade(ctx):
+    ctx.script(SCHEMA)
+    ctx.create_index('idx_tickets_archive_user_id', 'tickets_archive', 'user_id, id')
+    ctx.create_index('idx_comments_archive_ticket_created', 'comments_archive', 'ticket_id, created_at, id')
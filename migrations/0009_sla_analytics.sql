@@ -0,0 +1,96 @@
+-- SLA analytics (see analytics.py): status transitions are recorded as they happen and
+-- rolled up into hourly and daily buckets, so reports never scan tickets or comments.
+
+ALTER TABLE tickets ADD COLUMN closed_at TIMESTAMP;
+ALTER TABLE tickets_archive ADD COLUMN closed_at TIMESTAMP;
+
+-- Every status change, with when it happened. Rows go with their ticket; the rollups keep the history.
+CREATE TABLE ticket_transitions (
+    id INTEGER PRIMARY KEY,
+    ticket_id INTEGER NOT NULL,
+    from_status TEXT,
+    to_status TEXT,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (ticket_id) REFERENCES tickets(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_ticket_transitions_ticket ON ticket_transitions(ticket_id, changed_at);
+
+-- Event counts per UTC bucket: grain 'hour' buckets are 'YYYY-MM-DD HH:00:00', 'day' buckets 'YYYY-MM-DD'.
+-- close_seconds sums time-to-close over the bucket's closes, for the mean.
+CREATE TABLE ticket_rollups (
+    grain TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    opened INTEGER NOT NULL DEFAULT 0,
+    closed INTEGER NOT NULL DEFAULT 0,
+    reopened INTEGER NOT NULL DEFAULT 0,
+    comments INTEGER NOT NULL DEFAULT 0,
+    close_seconds REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (grain, bucket)
+) WITHOUT ROWID;
+
+-- Time-to-close percentiles come from a per-day histogram over fixed bins: bin 0 is under a minute,
+-- each later bin is 25% wider than the one before, and the last one catches everything beyond a year.
+CREATE TABLE sla_bins (
+    bin INTEGER PRIMARY KEY,
+    lower_seconds REAL NOT NULL,
+    upper_seconds REAL NOT NULL
+);
+
+WITH RECURSIVE b(bin, lower_seconds, upper_seconds) AS (
+    SELECT 0, 0.0, 60.0
+    UNION ALL
+    SELECT bin + 1, upper_seconds, upper_seconds * 1.25 FROM b WHERE upper_seconds < 366 * 86400
+)
+INSERT INTO sla_bins (bin, lower_seconds, upper_seconds) SELECT bin, lower_seconds, upper_seconds FROM b;
+
+INSERT INTO sla_bins (bin, lower_seconds, upper_seconds)
+SELECT max(bin) + 1, max(upper_seconds), 1e18 FROM sla_bins;
+
+CREATE TABLE close_time_histogram (
+    day TEXT NOT NULL,
+    bin INTEGER NOT NULL,
+    closed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, bin)
+) WITHOUT ROWID;
+
+CREATE TRIGGER tickets_analytics_ai AFTER INSERT ON tickets BEGIN
+    INSERT INTO ticket_transitions (ticket_id, from_status, to_status, changed_at)
+    VALUES (new.id, NULL, new.status, ifnull(new.created_at, CURRENT_TIMESTAMP));
+    INSERT INTO ticket_rollups (grain, bucket, opened) VALUES
+        ('hour', strftime('%Y-%m-%d %H:00:00', ifnull(new.created_at, CURRENT_TIMESTAMP)), 1),
+        ('day', date(ifnull(new.created_at, CURRENT_TIMESTAMP)), 1)
+        ON CONFLICT (grain, bucket) DO UPDATE SET opened = opened + 1;
+END;
+
+CREATE TRIGGER tickets_analytics_au AFTER UPDATE OF status ON tickets WHEN old.status IS NOT new.status BEGIN
+    INSERT INTO ticket_transitions (ticket_id, from_status, to_status) VALUES (new.id, old.status, new.status);
+    UPDATE tickets SET closed_at = CASE WHEN new.status IS 'Closed' THEN CURRENT_TIMESTAMP END WHERE id = new.id;
+    INSERT INTO ticket_rollups (grain, bucket, reopened)
+        SELECT 'hour', strftime('%Y-%m-%d %H:00:00', 'now'), 1 WHERE old.status IS 'Closed'
+        UNION ALL
+        SELECT 'day', date('now'), 1 WHERE old.status IS 'Closed'
+        ON CONFLICT (grain, bucket) DO UPDATE SET reopened = reopened + 1;
+END;
+
+-- A close counts once per close; time-to-close runs from creation, also after a reopen
+CREATE TRIGGER tickets_analytics_closed_au AFTER UPDATE OF status ON tickets
+WHEN new.status IS 'Closed' AND old.status IS NOT 'Closed' BEGIN
+    INSERT INTO ticket_rollups (grain, bucket, closed, close_seconds) VALUES
+        ('hour', strftime('%Y-%m-%d %H:00:00', 'now'), 1,
+            max(0, (julianday('now') - julianday(ifnull(new.created_at, 'now'))) * 86400)),
+        ('day', date('now'), 1, max(0, (julianday('now') - julianday(ifnull(new.created_at, 'now'))) * 86400))
+        ON CONFLICT (grain, bucket) DO UPDATE SET
+            closed = closed + 1, close_seconds = close_seconds + excluded.close_seconds;
+    INSERT INTO close_time_histogram (day, bin, closed)
+        SELECT date('now'), min(bin), 1 FROM sla_bins
+        WHERE upper_seconds > (julianday('now') - julianday(ifnull(new.created_at, 'now'))) * 86400
+        ON CONFLICT (day, bin) DO UPDATE SET closed = closed + 1;
+END;
+
+CREATE TRIGGER comments_analytics_ai AFTER INSERT ON comments BEGIN
+    INSERT INTO ticket_rollups (grain, bucket, comments) VALUES
+        ('hour', strftime('%Y-%m-%d %H:00:00', ifnull(new.created_at, CURRENT_TIMESTAMP)), 1),
+        ('day', date(ifnull(new.created_at, CURRENT_TIMESTAMP)), 1)
+        ON CONFLICT (grain, bucket) DO UPDATE SET comments = comments + 1;
+END;
@@ -0,0 +1,21 @@
+-- Near-duplicate index (see duplicates.py): one MinHash signature per ticket plus its LSH band buckets.
+-- cluster_id groups near-duplicates under the first open ticket of the group.
+CREATE TABLE ticket_signatures (
+    ticket_id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL,
+    cluster_id INTEGER NOT NULL,
+    FOREIGN KEY (ticket_id) REFERENCES tickets(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_ticket_signatures_cluster ON ticket_signatures(cluster_id, ticket_id);
+
+-- Tickets sharing any (band, bucket) are candidate duplicates; the primary key is the lookup index
+CREATE TABLE ticket_lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    ticket_id INTEGER NOT NULL,
+    PRIMARY KEY (band, bucket, ticket_id),
+    FOREIGN KEY (ticket_id) REFERENCES tickets(id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_ticket_lsh_buckets_ticket ON ticket_lsh_buckets(ticket_id);
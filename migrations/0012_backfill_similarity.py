@@ -0,0 +1,5 @@
+from duplicates import index_missing
+
+def upgrade(ctx):
+    # Signatures are computed in Python, a batch per transaction; safe to rerun, indexed tickets are skipped
+    index_missing(ctx.db, ctx.batch_size, ctx.pause, ctx.log)
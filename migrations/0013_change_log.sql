@@ -0,0 +1,10 @@
+-- Live-update events (see events.py). Every process publishes here and streams read by id, so all
+-- workers share one sequence. AUTOINCREMENT keeps ids from being reused once old rows are trimmed.
+CREATE TABLE change_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    ticket_id INTEGER,
+    owner_id INTEGER,
+    data TEXT NOT NULL DEFAULT '{}',
+    created_at REAL NOT NULL
+);
@@ -0,0 +1,9 @@
+-- Failed logins for the sliding-window throttles (see auth.py), shared by every worker and node
+CREATE TABLE login_attempts (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    attempted_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_login_attempts_key ON login_attempts(scope, key, attempted_at);
+CREATE INDEX IF NOT EXISTS idx_login_attempts_at ON login_attempts(attempted_at);
@@ -0,0 +1,306 @@
+-- Baseline schema for PostgreSQL (DATABASE_URL=postgresql://...), mirroring ../0001_initial.sql through ../0008_ticket_archive.py.
+-- FTS5 becomes a tsvector column with a GIN index and the SQLite triggers become PL/pgSQL functions.
+-- Timestamps are UTC without a time zone, like SQLite's CURRENT_TIMESTAMP.
+
+-- SQLite's group_concat(value, separator), so shared queries run unchanged
+CREATE FUNCTION group_concat_step(acc TEXT, value TEXT, sep TEXT) RETURNS TEXT
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE WHEN value IS NULL THEN acc WHEN acc IS NULL THEN value ELSE acc || sep || value END
+$$;
+
+CREATE AGGREGATE group_concat(TEXT, TEXT) (SFUNC = group_concat_step, STYPE = TEXT);
+
+CREATE TABLE users (
+    id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL,
+    first_name TEXT,
+    last_name TEXT,
+    employee_id TEXT,
+    role TEXT CHECK(role IN ('admin', 'employee')) NOT NULL
+);
+
+CREATE TABLE tickets (
+    id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    status TEXT DEFAULT 'Open',
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc'),
+    updated_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc'),
+    version INTEGER NOT NULL DEFAULT 1
+);
+
+CREATE TABLE comments (
+    id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    ticket_id INTEGER NOT NULL REFERENCES tickets(id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+CREATE INDEX idx_tickets_user_id ON tickets(user_id, id);
+CREATE INDEX idx_tickets_status_id ON tickets(status, id);
+CREATE INDEX idx_tickets_user_status_id ON tickets(user_id, status, id);
+CREATE INDEX idx_users_employee_id ON users(employee_id);
+CREATE INDEX idx_users_role ON users(role);
+CREATE INDEX idx_comments_ticket_created ON comments(ticket_id, created_at, id);
+
+-- Full-text index: one row per ticket (rowid = tickets.id), weighted like bm25(10, 4, 1) on SQLite
+CREATE TABLE ticket_search (
+    rowid INTEGER PRIMARY KEY,
+    title TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    comments TEXT NOT NULL DEFAULT '',
+    document TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', title), 'A') ||
+        setweight(to_tsvector('english', description), 'B') ||
+        setweight(to_tsvector('english', comments), 'D')
+    ) STORED
+);
+
+CREATE INDEX idx_ticket_search_document ON ticket_search USING GIN (document);
+
+CREATE FUNCTION tickets_search() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO ticket_search (rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description);
+    ELSIF TG_OP = 'UPDATE' THEN
+        UPDATE ticket_search SET title = NEW.title, description = NEW.description WHERE rowid = NEW.id;
+    ELSE
+        DELETE FROM ticket_search WHERE rowid = OLD.id;
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE TRIGGER tickets_search_ai AFTER INSERT ON tickets FOR EACH ROW EXECUTE FUNCTION tickets_search();
+CREATE TRIGGER tickets_search_au AFTER UPDATE OF title, description ON tickets
+    FOR EACH ROW EXECUTE FUNCTION tickets_search();
+CREATE TRIGGER tickets_search_ad AFTER DELETE ON tickets FOR EACH ROW EXECUTE FUNCTION tickets_search();
+
+-- New comments are indexed by the search.index_comments job; edits and deletes rebuild the column
+CREATE FUNCTION comments_search() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    target INTEGER := CASE WHEN TG_OP = 'DELETE' THEN OLD.ticket_id ELSE NEW.ticket_id END;
+BEGIN
+    UPDATE ticket_search
+    SET comments = coalesce((SELECT group_concat(content, chr(10)) FROM comments WHERE ticket_id = target), '')
+    WHERE rowid = target;
+    RETURN NULL;
+END $$;
+
+CREATE TRIGGER comments_search_au AFTER UPDATE OF content ON comments
+    FOR EACH ROW EXECUTE FUNCTION comments_search();
+CREATE TRIGGER comments_search_ad AFTER DELETE ON comments FOR EACH ROW EXECUTE FUNCTION comments_search();
+
+-- Denormalized counters: tickets per (user, status), user_id 0 holds the global totals
+CREATE TABLE ticket_stats (
+    user_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    ticket_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, status)
+);
+
+CREATE TABLE ticket_comment_stats (
+    ticket_id INTEGER PRIMARY KEY,
+    comment_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE FUNCTION tickets_stats() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE ticket_stats SET ticket_count = ticket_count - 1
+        WHERE user_id IN (0, coalesce(OLD.user_id, 0)) AND status = coalesce(OLD.status, '');
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO ticket_stats (user_id, status, ticket_count) VALUES (0, coalesce(NEW.status, ''), 1)
+            ON CONFLICT (user_id, status) DO UPDATE SET ticket_count = ticket_stats.ticket_count + 1;
+        INSERT INTO ticket_stats (user_id, status, ticket_count)
+            VALUES (coalesce(NEW.user_id, 0), coalesce(NEW.status, ''), 1)
+            ON CONFLICT (user_id, status) DO UPDATE SET ticket_count = ticket_stats.ticket_count + 1;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO ticket_comment_stats (ticket_id, comment_count) VALUES (NEW.id, 0);
+    ELSIF TG_OP = 'DELETE' THEN
+        DELETE FROM ticket_comment_stats WHERE ticket_id = OLD.id;
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE TRIGGER tickets_stats_ai AFTER INSERT ON tickets FOR EACH ROW EXECUTE FUNCTION tickets_stats();
+CREATE TRIGGER tickets_stats_au AFTER UPDATE OF status, user_id ON tickets
+    FOR EACH ROW EXECUTE FUNCTION tickets_stats();
+CREATE TRIGGER tickets_stats_ad AFTER DELETE ON tickets FOR EACH ROW EXECUTE FUNCTION tickets_stats();
+
+-- Decrements only ever UPDATE, so cascaded comment deletes can't resurrect a deleted ticket's row
+CREATE FUNCTION comments_stats() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO ticket_comment_stats (ticket_id, comment_count) VALUES (NEW.ticket_id, 1)
+            ON CONFLICT (ticket_id) DO UPDATE SET comment_count = ticket_comment_stats.comment_count + 1;
+        UPDATE tickets SET version = version + 1 WHERE id = NEW.ticket_id;
+    ELSE
+        UPDATE ticket_comment_stats SET comment_count = comment_count - 1 WHERE ticket_id = OLD.ticket_id;
+        UPDATE tickets SET version = version + 1 WHERE id = OLD.ticket_id;
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE TRIGGER comments_stats_ai AFTER INSERT ON comments FOR EACH ROW EXECUTE FUNCTION comments_stats();
+CREATE TRIGGER comments_stats_ad AFTER DELETE ON comments FOR EACH ROW EXECUTE FUNCTION comments_stats();
+
+-- Row versioning for ETags: a BEFORE trigger stamps the row itself instead of updating it again
+CREATE FUNCTION tickets_version() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.updated_at := now() AT TIME ZONE 'utc';
+    NEW.version := OLD.version + 1;
+    RETURN NEW;
+END $$;
+
+CREATE TRIGGER tickets_version_bu BEFORE UPDATE OF title, description, status, user_id ON tickets
+    FOR EACH ROW EXECUTE FUNCTION tickets_version();
+
+-- Read model for the admin user directory. last_activity is text ('' when unknown) so the
+-- (sort key, user_id) keyset cursors compare the same way they do on SQLite.
+CREATE TABLE user_directory (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    first_name TEXT NOT NULL DEFAULT '',
+    last_name TEXT NOT NULL DEFAULT '',
+    sort_name TEXT NOT NULL DEFAULT '',
+    email TEXT NOT NULL,
+    employee_id TEXT NOT NULL DEFAULT '',
+    role TEXT NOT NULL,
+    open_count INTEGER NOT NULL DEFAULT 0,
+    closed_count INTEGER NOT NULL DEFAULT 0,
+    comment_count INTEGER NOT NULL DEFAULT 0,
+    last_activity TEXT NOT NULL DEFAULT ''
+);
+
+CREATE INDEX idx_user_directory_name ON user_directory(sort_name, user_id);
+CREATE INDEX idx_user_directory_employee_id ON user_directory(employee_id, user_id);
+CREATE INDEX idx_user_directory_open ON user_directory(open_count, user_id);
+CREATE INDEX idx_user_directory_closed ON user_directory(closed_count, user_id);
+CREATE INDEX idx_user_directory_comments ON user_directory(comment_count, user_id);
+CREATE INDEX idx_user_directory_activity ON user_directory(last_activity, user_id);
+CREATE INDEX idx_comments_user_created ON comments(user_id, created_at);
+
+CREATE FUNCTION users_directory() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO user_directory (user_id, first_name, last_name, sort_name, email, employee_id, role)
+    VALUES (NEW.id, coalesce(NEW.first_name, ''), coalesce(NEW.last_name, ''),
+            lower(coalesce(NEW.last_name, '') || ' ' || coalesce(NEW.first_name, '')),
+            NEW.email, coalesce(NEW.employee_id, ''), NEW.role)
+    ON CONFLICT (user_id) DO UPDATE SET
+        first_name = excluded.first_name,
+        last_name = excluded.last_name,
+        sort_name = excluded.sort_name,
+        email = excluded.email,
+        employee_id = excluded.employee_id,
+        role = excluded.role;
+    RETURN NULL;
+END $$;
+
+CREATE TRIGGER users_directory_ai AFTER INSERT ON users FOR EACH ROW EXECUTE FUNCTION users_directory();
+CREATE TRIGGER users_directory_au AFTER UPDATE OF first_name, last_name, email, employee_id, role ON users
+    FOR EACH ROW EXECUTE FUNCTION users_directory();
+
+-- Raising a ticket or commenting counts as activity; status changes by admins only move the counts
+CREATE FUNCTION tickets_directory() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE user_directory SET
+            open_count = open_count - (OLD.status IS NOT DISTINCT FROM 'Open')::int,
+            closed_count = closed_count - (OLD.status IS NOT DISTINCT FROM 'Closed')::int
+        WHERE user_id = OLD.user_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE user_directory SET
+            open_count = open_count + (NEW.status IS NOT DISTINCT FROM 'Open')::int,
+            closed_count = closed_count + (NEW.status IS NOT DISTINCT FROM 'Closed')::int
+        WHERE user_id = NEW.user_id;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        UPDATE user_directory SET last_activity = greatest(last_activity, to_char(
+            coalesce(NEW.created_at, now() AT TIME ZONE 'utc'), 'YYYY-MM-DD HH24:MI:SS'))
+        WHERE user_id = NEW.user_id;
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE TRIGGER tickets_directory_ai AFTER INSERT ON tickets FOR EACH ROW EXECUTE FUNCTION tickets_directory();
+CREATE TRIGGER tickets_directory_au AFTER UPDATE OF status, user_id ON tickets
+    FOR EACH ROW EXECUTE FUNCTION tickets_directory();
+CREATE TRIGGER tickets_directory_ad AFTER DELETE ON tickets FOR EACH ROW EXECUTE FUNCTION tickets_directory();
+
+CREATE FUNCTION comments_directory() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE user_directory SET
+            comment_count = comment_count + 1,
+            last_activity = greatest(last_activity, to_char(
+                coalesce(NEW.created_at, now() AT TIME ZONE 'utc'), 'YYYY-MM-DD HH24:MI:SS'))
+        WHERE user_id = NEW.user_id;
+    ELSE
+        UPDATE user_directory SET comment_count = comment_count - 1 WHERE user_id = OLD.user_id;
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE TRIGGER comments_directory_ai AFTER INSERT ON comments FOR EACH ROW EXECUTE FUNCTION comments_directory();
+CREATE TRIGGER comments_directory_ad AFTER DELETE ON comments FOR EACH ROW EXECUTE FUNCTION comments_directory();
+
+-- Durable background jobs (see jobs.py); workers claim with FOR UPDATE SKIP LOCKED
+CREATE TABLE jobs (
+    id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    task TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    key TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_at DOUBLE PRECISION NOT NULL,
+    lease_owner TEXT,
+    last_error TEXT,
+    created_at DOUBLE PRECISION NOT NULL
+);
+
+CREATE INDEX idx_jobs_status_run_at ON jobs(status, run_at);
+CREATE UNIQUE INDEX idx_jobs_queued_key ON jobs(key) WHERE status = 'queued';
+
+-- Cold storage for tickets closed long ago (see archive.py)
+CREATE TABLE tickets_archive (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    status TEXT,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    version INTEGER NOT NULL,
+    archived_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+CREATE TABLE comments_archive (
+    id INTEGER PRIMARY KEY,
+    ticket_id INTEGER NOT NULL REFERENCES tickets_archive(id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP
+);
+
+CREATE INDEX idx_tickets_archive_user_id ON tickets_archive(user_id, id);
+CREATE INDEX idx_comments_archive_ticket_created ON comments_archive(ticket_id, created_at, id);
+
+CREATE TABLE ticket_archive_search (
+    rowid INTEGER PRIMARY KEY,
+    title TEXT NOT NULL DEFAULT '',
+    description TEXT NOT NULL DEFAULT '',
+    comments TEXT NOT NULL DEFAULT '',
+    document TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', title), 'A') ||
+        setweight(to_tsvector('english', description), 'B') ||
+        setweight(to_tsvector('english', comments), 'D')
+    ) STORED
+);
+
+CREATE INDEX idx_ticket_archive_search_document ON ticket_archive_search USING GIN (document);
@@ -0,0 +1,116 @@
+-- SLA analytics, mirroring ../0009_sla_analytics.sql: transitions plus hourly/daily rollups.
+
+ALTER TABLE tickets ADD COLUMN closed_at TIMESTAMP;
+ALTER TABLE tickets_archive ADD COLUMN closed_at TIMESTAMP;
+
+CREATE TABLE ticket_transitions (
+    id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    ticket_id INTEGER NOT NULL REFERENCES tickets(id) ON DELETE CASCADE,
+    from_status TEXT,
+    to_status TEXT,
+    changed_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+CREATE INDEX idx_ticket_transitions_ticket ON ticket_transitions(ticket_id, changed_at);
+
+CREATE TABLE ticket_rollups (
+    grain TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    opened INTEGER NOT NULL DEFAULT 0,
+    closed INTEGER NOT NULL DEFAULT 0,
+    reopened INTEGER NOT NULL DEFAULT 0,
+    comments INTEGER NOT NULL DEFAULT 0,
+    close_seconds DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (grain, bucket)
+);
+
+CREATE TABLE sla_bins (
+    bin INTEGER PRIMARY KEY,
+    lower_seconds DOUBLE PRECISION NOT NULL,
+    upper_seconds DOUBLE PRECISION NOT NULL
+);
+
+WITH RECURSIVE b(bin, lower_seconds, upper_seconds) AS (
+    SELECT 0, 0.0::double precision, 60.0::double precision
+    UNION ALL
+    SELECT bin + 1, upper_seconds, upper_seconds * 1.25 FROM b WHERE upper_seconds < 366 * 86400
+)
+INSERT INTO sla_bins (bin, lower_seconds, upper_seconds) SELECT bin, lower_seconds, upper_seconds FROM b;
+
+INSERT INTO sla_bins (bin, lower_seconds, upper_seconds)
+SELECT max(bin) + 1, max(upper_seconds), 1e18 FROM sla_bins;
+
+CREATE TABLE close_time_histogram (
+    day TEXT NOT NULL,
+    bin INTEGER NOT NULL,
+    closed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, bin)
+);
+
+-- Adds one event to the hourly and daily buckets containing `at`
+CREATE FUNCTION bump_rollups(at TIMESTAMP, opened INTEGER, closed INTEGER, reopened INTEGER, comments INTEGER,
+                             close_seconds DOUBLE PRECISION) RETURNS void LANGUAGE sql AS $$
+    INSERT INTO ticket_rollups AS r (grain, bucket, opened, closed, reopened, comments, close_seconds) VALUES
+        ('hour', to_char(at, 'YYYY-MM-DD HH24:00:00'), opened, closed, reopened, comments, close_seconds),
+        ('day', to_char(at, 'YYYY-MM-DD'), opened, closed, reopened, comments, close_seconds)
+    ON CONFLICT (grain, bucket) DO UPDATE SET
+        opened = r.opened + excluded.opened,
+        closed = r.closed + excluded.closed,
+        reopened = r.reopened + excluded.reopened,
+        comments = r.comments + excluded.comments,
+        close_seconds = r.close_seconds + excluded.close_seconds;
+$$;
+
+-- closed_at is stamped on the row itself before it is written
+CREATE FUNCTION tickets_closed_at() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF NEW.status IS DISTINCT FROM OLD.status THEN
+        NEW.closed_at := CASE WHEN NEW.status = 'Closed' THEN now() AT TIME ZONE 'utc' END;
+    END IF;
+    RETURN NEW;
+END $$;
+
+CREATE TRIGGER tickets_closed_at_bu BEFORE UPDATE OF status ON tickets
+    FOR EACH ROW EXECUTE FUNCTION tickets_closed_at();
+
+CREATE FUNCTION tickets_analytics() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    at TIMESTAMP := now() AT TIME ZONE 'utc';
+    seconds DOUBLE PRECISION;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        at := coalesce(NEW.created_at, at);
+        INSERT INTO ticket_transitions (ticket_id, from_status, to_status, changed_at)
+        VALUES (NEW.id, NULL, NEW.status, at);
+        PERFORM bump_rollups(at, 1, 0, 0, 0, 0);
+        RETURN NULL;
+    END IF;
+    IF NEW.status IS NOT DISTINCT FROM OLD.status THEN
+        RETURN NULL;
+    END IF;
+    INSERT INTO ticket_transitions (ticket_id, from_status, to_status, changed_at)
+    VALUES (NEW.id, OLD.status, NEW.status, at);
+    IF OLD.status = 'Closed' THEN
+        PERFORM bump_rollups(at, 0, 0, 1, 0, 0);
+    ELSIF NEW.status = 'Closed' THEN
+        -- A close counts once per close; time-to-close runs from creation, also after a reopen
+        seconds := greatest(0, extract(epoch FROM at - coalesce(NEW.created_at, at)));
+        PERFORM bump_rollups(at, 0, 1, 0, 0, seconds);
+        INSERT INTO close_time_histogram AS h (day, bin, closed)
+        SELECT to_char(at, 'YYYY-MM-DD'), min(bin), 1 FROM sla_bins WHERE upper_seconds > seconds
+        ON CONFLICT (day, bin) DO UPDATE SET closed = h.closed + 1;
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE TRIGGER tickets_analytics_ai AFTER INSERT ON tickets FOR EACH ROW EXECUTE FUNCTION tickets_analytics();
+CREATE TRIGGER tickets_analytics_au AFTER UPDATE OF status ON tickets
+    FOR EACH ROW EXECUTE FUNCTION tickets_analytics();
+
+CREATE FUNCTION comments_analytics() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM bump_rollups(coalesce(NEW.created_at, now() AT TIME ZONE 'utc'), 0, 0, 0, 1, 0);
+    RETURN NULL;
+END $$;
+
+CREATE TRIGGER comments_analytics_ai AFTER INSERT ON comments FOR EACH ROW EXECUTE FUNCTION comments_analytics();
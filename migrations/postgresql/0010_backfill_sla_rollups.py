@@ -0,0 +1,10 @@
+from analytics import rebuild_rollups
+
+def upgrade(ctx):
+    # Tickets closed before transitions were recorded: the last status change is the best estimate
+    ctx.backfill('tickets', 'closed_at = updated_at', where="status = 'Closed' AND closed_at IS NULL")
+    ctx.backfill('tickets_archive', 'closed_at = updated_at', where="status = 'Closed' AND closed_at IS NULL")
+    # One short transaction; the triggers from 0009 keep the rollups current from here on
+    with ctx.db:
+        rebuild_rollups(ctx.db)
+    ctx.log('  rollups rebuilt')
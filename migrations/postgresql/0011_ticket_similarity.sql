@@ -0,0 +1,18 @@
+-- Near-duplicate index, mirroring ../0011_ticket_similarity.sql
+CREATE TABLE ticket_signatures (
+    ticket_id INTEGER PRIMARY KEY REFERENCES tickets(id) ON DELETE CASCADE,
+    signature BYTEA NOT NULL,
+    cluster_id INTEGER NOT NULL
+);
+
+CREATE INDEX idx_ticket_signatures_cluster ON ticket_signatures(cluster_id, ticket_id);
+
+-- Bucket keys are unsigned 32-bit CRCs, hence BIGINT
+CREATE TABLE ticket_lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket BIGINT NOT NULL,
+    ticket_id INTEGER NOT NULL REFERENCES tickets(id) ON DELETE CASCADE,
+    PRIMARY KEY (band, bucket, ticket_id)
+);
+
+CREATE INDEX idx_ticket_lsh_buckets_ticket ON ticket_lsh_buckets(ticket_id);
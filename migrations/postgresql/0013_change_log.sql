@@ -0,0 +1,10 @@
+-- Live-update events, mirroring ../0013_change_log.sql. Writers take a table lock before inserting
+-- (see events.py) so ids become visible in order and a stream polling by id never skips one.
+CREATE TABLE change_log (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    type TEXT NOT NULL,
+    ticket_id INTEGER,
+    owner_id INTEGER,
+    data TEXT NOT NULL DEFAULT '{}',
+    created_at DOUBLE PRECISION NOT NULL
+);
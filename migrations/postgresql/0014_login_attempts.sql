@@ -0,0 +1,9 @@
+-- Failed logins for the sliding-window throttles, mirroring ../0014_login_attempts.sql
+CREATE TABLE login_attempts (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    attempted_at DOUBLE PRECISION NOT NULL
+);
+
+CREATE INDEX idx_login_attempts_key ON login_attempts(scope, key, attempted_at);
+CREATE INDEX idx_login_attempts_at ON login_attempts(attempted_at);
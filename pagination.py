@@ -0,0 +1,115 @@
+from flask import request
+
+# --- Keyset pagination ---
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+COMMENT_PAGE_SIZE = 50
+
+def get_page_args(default=DEFAULT_PAGE_SIZE):
+    before = request.args.get('before', type=int)
+    after = request.args.get('after', type=int)
+    limit = request.args.get('limit', default, type=int)
+    return before, after, max(1, min(limit, MAX_PAGE_SIZE))
+
+def fetch_ticket_page(db, q, conditions, params, before=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    # Pages are cut on t.id so every filter combination stays a bounded index range scan
+    conditions = list(conditions)
+    params = list(params)
+    if after is not None:
+        conditions.append('t.id > ?')
+        params.append(after)
+    elif before is not None:
+        conditions.append('t.id < ?')
+        params.append(before)
+    if conditions:
+        q += ' WHERE ' + ' AND '.join(conditions)
+    q += ' ORDER BY t.id ' + ('ASC' if after is not None else 'DESC') + ' LIMIT ?'
+    params.append(limit + 1)
+
+    rows = db.execute(q, params).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after is not None:
+        rows.reverse()
+
+    # Older rows exist past the last item, newer rows exist before the first one
+    if after is None:
+        has_older, has_newer = has_more, before is not None
+    else:
+        has_older, has_newer = True, has_more
+    return {
+        'items': rows,
+        'limit': limit,
+        'next_before': rows[-1]['id'] if rows and has_older else None,
+        'prev_after': rows[0]['id'] if rows and has_newer else None,
+    }
+
+def fetch_comment_page(db, ticket_id, before=None, after=None, limit=COMMENT_PAGE_SIZE, table='comments'):
+    # Newest page first on (created_at, id); before pages back from the oldest comment already shown,
+    # after fetches what was posted since the newest one
+    q = '''
+        SELECT c.id, c.content, c.created_at, c.user_id, u.first_name || ' ' || u.last_name AS author
+        FROM %s c
+        JOIN users u ON c.user_id = u.id
+        WHERE c.ticket_id = ?
+    ''' % table
+    params = [ticket_id]
+    cursor = after if after is not None else before
+    if cursor is not None:
+        q += ' AND (c.created_at, c.id) %s (SELECT created_at, id FROM %s WHERE id = ? AND ticket_id = ?)' % (
+            '>' if after is not None else '<', table)
+        params += [cursor, ticket_id]
+    q += ' ORDER BY c.created_at %s, c.id %s LIMIT ?' % (('ASC', 'ASC') if after is not None else ('DESC', 'DESC'))
+    params.append(limit + 1)
+
+    rows = db.execute(q, params).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    # Shown oldest-first within the page, like a conversation
+    if after is None:
+        rows.reverse()
+        has_older, has_newer = has_more, before is not None
+    else:
+        has_older, has_newer = True, has_more
+    return {
+        'items': rows,
+        'limit': limit,
+        'next_before': rows[0]['id'] if rows and has_older else None,
+        'prev_after': rows[-1]['id'] if rows and has_newer else None,
+    }
+
+def fetch_sorted_page(db, q, table, sort, descending=False, conditions=(), params=(),
+                      before=None, after=None, limit=DEFAULT_PAGE_SIZE, key='id'):
+    # Keyset on (sort, key) in display order; cursors stay plain ids and the sort value is looked up
+    # from the cursor row, so any column with a (sort, key) index pages as a bounded range scan
+    conditions = list(conditions)
+    params = list(params)
+    forward = before is None
+    cursor = after if forward else before
+    ascending = forward != descending
+    if cursor is not None:
+        conditions.append('(%s, %s) %s ((SELECT %s FROM %s WHERE %s = ?), ?)'
+                          % (sort, key, '>' if ascending else '<', sort, table, key))
+        params += [cursor, cursor]
+    if conditions:
+        q += ' WHERE ' + ' AND '.join(conditions)
+    order = 'ASC' if ascending else 'DESC'
+    q += ' ORDER BY %s %s, %s %s LIMIT ?' % (sort, order, key, order)
+    params.append(limit + 1)
+
+    rows = db.execute(q, params).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not forward:
+        rows.reverse()
+
+    if forward:
+        has_next, has_prev = has_more, after is not None
+    else:
+        has_next, has_prev = True, has_more
+    return {
+        'items': rows,
+        'limit': limit,
+        'next_after': rows[-1][key] if rows and has_next else None,
+        'prev_before': rows[0][key] if rows and has_prev else None,
+    }
@@ -0,0 +1,293 @@
+from flask import Blueprint, Response, current_app, g, request, session
+from collections import OrderedDict, defaultdict
+import hmac
+import logging
+import sqlite3
+import threading
+import time
+
+slow_log = logging.getLogger('helpdesk.slow')
+
+# --- Per-request profile ---
+class RequestProfile:
+    MAX_ENTRIES = 500
+
+    def __init__(self):
+        self.queries = 0
+        self.statements = 0
+        self.db_time = 0.0
+        self.vm_steps = 0
+        self.entries = []
+
+    def add(self, sql, params):
+        self.queries += 1
+        entry = [0.0, sql, params]
+        if len(self.entries) < self.MAX_ENTRIES:
+            self.entries.append(entry)
+        return entry
+
+    def spend(self, entry, seconds):
+        entry[0] += seconds
+        self.db_time += seconds
+
+    def slowest(self, n):
+        return sorted(self.entries, key=lambda e: e[0], reverse=True)[:n]
+
+# --- Instrumented connection: times execute and every fetch against the current profile ---
+class ProfiledCursor(sqlite3.Cursor):
+    entry = None
+    profile = None
+
+    def _timed(self, fn, *args):
+        if self.profile is None or self.entry is None:
+            return fn(*args)
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.profile.spend(self.entry, time.perf_counter() - t0)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+    def __next__(self):
+        return self._timed(super().__next__)
+
+class ProfiledConnection(sqlite3.Connection):
+    profile = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Trace sees every statement, including trigger bodies; the progress handler counts VM work
+        self.set_trace_callback(self._trace)
+        self.set_progress_handler(self._progress, 1000)
+
+    def _trace(self, statement):
+        if self.profile is not None:
+            self.profile.statements += 1
+
+    def _progress(self):
+        if self.profile is not None:
+            self.profile.vm_steps += 1000
+        return 0
+
+    def _run(self, method, sql, params):
+        cur = self.cursor(ProfiledCursor)
+        if self.profile is None:
+            return getattr(cur, method)(sql, params)
+        cur.profile = self.profile
+        cur.entry = self.profile.add(sql, params if method == 'execute' else None)
+        return cur._timed(getattr(sqlite3.Cursor, method).__get__(cur), sql, params)
+
+    def execute(self, sql, params=()):
+        return self._run('execute', sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._run('executemany', sql, seq_of_params)
+
+def attach_profile(conn):
+    if isinstance(conn, ProfiledConnection):
+        if 'sql_profile' not in g:
+            g.sql_profile = RequestProfile()
+        conn.profile = g.sql_profile
+
+def detach_profile(conn):
+    if isinstance(conn, ProfiledConnection):
+        conn.profile = None
+
+# --- Query plans and full-scan detection ---
+# Statements with IN (?, ?, ...) lists differ by length, so the cache is an LRU of bounded size
+PLAN_CACHE_SIZE = 512
+_plan_cache = OrderedDict()
+_plan_lock = threading.Lock()
+
+def explain(conn, sql, params):
+    rows = sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, params or ()).fetchall()
+    return [row[3] for row in rows]
+
+def full_scans(plan):
+    # "SCAN t" without an index is a full table scan; virtual tables (FTS) and CTE steps are fine
+    return [d for d in plan if d.startswith('SCAN ') and ' USING ' not in d and 'VIRTUAL TABLE' not in d]
+
+def check_scans(conn, profile):
+    flagged = []
+    for _, sql, params in profile.entries:
+        if not sql.lstrip().upper().startswith('SELECT'):
+            continue
+        with _plan_lock:
+            scans = _plan_cache.get(sql)
+            if scans is not None:
+                _plan_cache.move_to_end(sql)
+        if scans is None:
+            try:
+                scans = full_scans(explain(conn, sql, params))
+            except sqlite3.Error:
+                scans = []
+            with _plan_lock:
+                _plan_cache[sql] = scans
+                while len(_plan_cache) > PLAN_CACHE_SIZE:
+                    _plan_cache.popitem(last=False)
+        if scans:
+            flagged.append((' '.join(sql.split()), scans))
+    return flagged
+
+# --- Metrics registry (Prometheus text format) ---
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Metrics:
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.histograms = defaultdict(lambda: [0] * (len(self.buckets) + 1))
+        self.sums = defaultdict(float)
+        self.counters = defaultdict(float)
+
+    def observe(self, route, method, seconds):
+        key = (route, method)
+        with self._lock:
+            counts = self.histograms[key]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self.sums[key] += seconds
+
+    def inc(self, name, labels=(), value=1):
+        with self._lock:
+            self.counters[(name, labels)] += value
+
+    def render(self, gauges=(), counters=()):
+        lines = ['# TYPE helpdesk_request_duration_seconds histogram']
+        with self._lock:
+            for (route, method), counts in sorted(self.histograms.items()):
+                labels = 'route="%s",method="%s"' % (route, method)
+                for bound, count in zip(self.buckets, counts):
+                    lines.append('helpdesk_request_duration_seconds_bucket{%s,le="%g"} %d' % (labels, bound, count))
+                lines.append('helpdesk_request_duration_seconds_bucket{%s,le="+Inf"} %d' % (labels, counts[-1]))
+                lines.append('helpdesk_request_duration_seconds_sum{%s} %f' % (labels, self.sums[(route, method)]))
+                lines.append('helpdesk_request_duration_seconds_count{%s} %d' % (labels, counts[-1]))
+            names_seen = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in names_seen:
+                    lines.append('# TYPE %s counter' % name)
+                    names_seen.add(name)
+                label_text = ','.join('%s="%s"' % kv for kv in labels)
+                lines.append('%s%s %s' % (name, '{%s}' % label_text if label_text else '', _num(value)))
+        for kind, values in (('counter', counters), ('gauge', gauges)):
+            for name, value in values:
+                lines.append('# TYPE %s %s' % (name, kind))
+                lines.append('%s %s' % (name, _num(value)))
+        return '\n'.join(lines) + '\n'
+
+def _num(value):
+    return '%d' % value if float(value).is_integer() else '%f' % value
+
+def get_metrics(app=None):
+    app = app or current_app
+    return app.extensions['metrics']
+
+# --- Request hooks ---
+def start_timer():
+    g.request_started = time.perf_counter()
+
+def record_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    config = current_app.config
+    route = request.endpoint or 'unmatched'
+    metrics = get_metrics()
+    metrics.observe(route, request.method, elapsed)
+    metrics.inc('helpdesk_requests_total', (('route', route), ('status', str(response.status_code))))
+
+    profile = g.get('sql_profile')
+    if profile is None:
+        return response
+    metrics.inc('helpdesk_db_queries_total', (('route', route),), profile.queries)
+    metrics.inc('helpdesk_db_time_seconds_total', (('route', route),), profile.db_time)
+    # Query counts describe the schema and workload, so they are only sent when debugging
+    if config['SQL_PROFILE_HEADERS'] or current_app.debug:
+        response.headers['X-DB-Queries'] = str(profile.queries)
+        response.headers['X-DB-Time-Ms'] = '%.2f' % (profile.db_time * 1000)
+
+    conn = g.get('sqlite_db')
+    if config['SQL_FLAG_SCANS'] and conn is not None:
+        flagged = check_scans(conn, profile)
+        if flagged:
+            metrics.inc('helpdesk_full_scans_total', (('route', route),), len(flagged))
+            response.headers['X-SQL-Full-Scans'] = str(len(flagged))
+            for sql, scans in flagged:
+                slow_log.warning('full table scan in %s: %s [%s]', route, sql, '; '.join(scans))
+
+    if elapsed * 1000 >= config['SLOW_REQUEST_MS']:
+        metrics.inc('helpdesk_slow_requests_total', (('route', route),))
+        report = ['slow request %s %s: %.1f ms total, %d queries (%d statements), %.1f ms in db, %d vm steps' % (
+            request.method, request.full_path.rstrip('?'), elapsed * 1000, profile.queries,
+            profile.statements, profile.db_time * 1000, profile.vm_steps)]
+        for duration, sql, params in profile.slowest(config['SLOW_QUERY_TOP']):
+            report.append('  %.2f ms  %s' % (duration * 1000, ' '.join(sql.split())))
+            if conn is not None and params is not None and sql.lstrip().upper().startswith('SELECT'):
+                try:
+                    report.extend('      plan: %s' % d for d in explain(conn, sql, params))
+                except sqlite3.Error:
+                    pass
+        slow_log.warning('\n'.join(report))
+    return response
+
+# --- /admin/metrics ---
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/admin/metrics')
+def metrics_endpoint():
+    # Admin session, or a bearer token for scrapers
+    token = current_app.config.get('METRICS_TOKEN')
+    authorised = session.get('role') == 'admin' or (token and hmac.compare_digest(
+        request.headers.get('Authorization', '').encode(), ('Bearer %s' % token).encode()))
+    if not authorised:
+        return Response('forbidden\n', status=403, mimetype='text/plain')
+
+    # Totals that only grow are counters, so rate() works on them; levels are gauges
+    gauges, counters = [], []
+    extensions = current_app.extensions
+    pool = extensions.get('db_pool')
+    if pool is not None:
+        gauges.append(('helpdesk_db_connections', pool.size()))
+    cache = extensions.get('fragment_cache')
+    if cache is not None:
+        counters += [('helpdesk_fragment_cache_%s' % k, v) for k, v in sorted(cache.stats.items())]
+    hashing = extensions.get('hashing_pool')
+    if hashing is not None:
+        for k, v in sorted(hashing.stats.items()):
+            (gauges if k == 'pending' else counters).append(('helpdesk_hashing_%s' % k, v))
+    jobs = extensions.get('jobs')
+    if jobs is not None:
+        totals = jobs.stats.snapshot()
+        counters += [('helpdesk_jobs_%s' % k, v) for k, v in sorted(totals.items())]
+        gauges += [('helpdesk_jobs_%s' % k, v) for k, v in sorted(jobs.snapshot().items()) if k not in totals]
+    startup = extensions.get('startup')
+    if startup is not None:
+        startup = startup.current()
+        if startup.boot_seconds is not None:
+            gauges.append(('helpdesk_startup_boot_seconds', startup.boot_seconds))
+        if startup.first_request is not None:
+            gauges.append(('helpdesk_startup_first_request_seconds', startup.first_request['ms'] / 1000))
+    return Response(get_metrics().render(gauges, counters), mimetype='text/plain; version=0.0.4')
+
+def init_app(app):
+    app.config.setdefault('SQL_PROFILING', True)
+    app.config.setdefault('SQL_FLAG_SCANS', False)
+    app.config.setdefault('SQL_PROFILE_HEADERS', False)
+    app.config.setdefault('SLOW_REQUEST_MS', 500)
+    app.config.setdefault('SLOW_QUERY_TOP', 5)
+    app.config.setdefault('METRICS_TOKEN', None)
+    app.extensions['metrics'] = Metrics()
+    app.before_request(start_timer)
+    app.after_request(record_request)
+    app.register_blueprint(metrics_bp)
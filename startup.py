@@ -0,0 +1,133 @@
+from flask import current_app, g, request
+from flask.cli import AppGroup
+from jinja2 import FileSystemBytecodeCache
+import click
+import gc
+import os
+import threading
+import time
+
+import migrate
+from db import get_db, get_pool
+
+# --- Startup timings, kept per process ---
+class StartupTimes:
+    def __init__(self, started):
+        self.started = started      # perf_counter() when app.py began importing
+        self.pid = os.getpid()
+        self.boot_seconds = None    # import through prepare(): the cold start of the loading process
+        self.templates = 0
+        self.template_seconds = 0.0
+        self.forked = False
+        self.first_request = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        # A forked worker inherits the parent's boot work but times its own first request
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.forked = True
+            self.first_request = None
+        return self
+
+    def record_first_request(self, endpoint, seconds):
+        with self._lock:
+            if self.first_request is None:
+                self.first_request = {'endpoint': endpoint, 'ms': round(seconds * 1000, 2)}
+
+    def snapshot(self):
+        return {'pid': self.pid, 'preloaded': self.forked,
+                'boot_seconds': None if self.boot_seconds is None else round(self.boot_seconds, 3),
+                'templates': self.templates, 'template_seconds': round(self.template_seconds, 3),
+                'first_request': self.first_request}
+
+def get_startup(app=None):
+    app = app or current_app
+    return app.extensions['startup'].current()
+
+# --- One-time work before serving ---
+def use_bytecode_cache(app):
+    """Point Jinja at TEMPLATE_CACHE_DIR, creating it; an empty setting turns the cache off.
+
+    Only the server entry point and `flask templates compile` call this, so importing the app
+    (tests, other CLI commands) writes nothing to disk.
+    """
+    cache_dir = app.config['TEMPLATE_CACHE_DIR']
+    if not cache_dir:
+        app.jinja_env.bytecode_cache = None
+        return None
+    cache = app.jinja_env.bytecode_cache
+    if cache is None or cache.directory != cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache = app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    return cache
+
+def precompile_templates(app):
+    """Compile every template into the environment's cache (and the bytecode cache on disk)."""
+    started = time.perf_counter()
+    names = [name for name in app.jinja_env.list_templates() if name.endswith('.html')]
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names), time.perf_counter() - started
+
+def check_schema(app):
+    with app.app_context():
+        db = get_db()
+        todo = migrate.pending(db, migrate.discover(migrate.directory_for(db, app.config['MIGRATIONS_DIR'])))
+    if todo:
+        raise migrate.MigrationError('%d migration(s) pending, first %04d_%s; run `flask db upgrade`'
+                                     % (len(todo), todo[0].version, todo[0].name))
+
+def prepare(app):
+    """Run startup work once in the loading process, before any worker forks.
+
+    With `gunicorn --preload` this is the master: workers inherit compiled templates and
+    loaded state copy-on-write instead of each building them on their first requests.
+    """
+    times = get_startup(app)
+    if times.boot_seconds is not None:
+        return times
+    if app.config['STARTUP_CHECK_SCHEMA']:
+        check_schema(app)
+    # SQLite connections must not cross fork(); workers open their own
+    get_pool(app).close_all()
+    use_bytecode_cache(app)
+    times.templates, times.template_seconds = precompile_templates(app)
+    # Objects that exist now are moved out of the collector's reach, so a worker's GC passes
+    # don't write to (and so copy) the pages it shares with the master
+    gc.collect()
+    gc.freeze()
+    times.boot_seconds = time.perf_counter() - times.started
+    return times
+
+# --- First request per process ---
+def start_first_request():
+    if get_startup().first_request is None:
+        g.first_request_started = time.perf_counter()
+
+def record_first_request(response):
+    started = g.pop('first_request_started', None)
+    if started is not None:
+        get_startup().record_first_request(request.endpoint or 'unmatched', time.perf_counter() - started)
+    return response
+
+# --- flask templates compile ---
+templates_cli = AppGroup('templates', help='Jinja template cache.')
+
+@templates_cli.command('compile')
+def compile_command():
+    """Fill the on-disk bytecode cache ahead of deploy."""
+    use_bytecode_cache(current_app)
+    count, seconds = precompile_templates(current_app)
+    click.echo('compiled %d templates in %.2fs into %s' % (
+        count, seconds, current_app.config['TEMPLATE_CACHE_DIR'] or '(no bytecode cache)'))
+
+def init_app(app, started=None):
+    # Shared by every worker on the host; empty disables it
+    app.config.setdefault('TEMPLATE_CACHE_DIR', os.path.join(app.instance_path, 'jinja'))
+    app.config.setdefault('STARTUP_CHECK_SCHEMA', True)
+
+    app.extensions['startup'] = StartupTimes(time.perf_counter() if started is None else started)
+    app.before_request(start_first_request)
+    app.after_request(record_first_request)
+    app.cli.add_command(templates_cli)
@@ -0,0 +1,37 @@
+document.addEventListener('DOMContentLoaded', function () {
+  const form = document.getElementById('bulk-form');
+  if (!form) {
+    return;
+  }
+
+  const action = document.getElementById('bulk-action');
+  const assignee = document.getElementById('bulk-assignee');
+  const allMatching = document.getElementById('bulk-all-matching');
+  const boxes = () => document.querySelectorAll('.bulk-select');
+
+  document.getElementById('bulk-select-all').addEventListener('change', function () {
+    boxes().forEach((box) => { box.checked = this.checked; });
+  });
+
+  // The employee ID field only matters when reassigning
+  const toggleAssignee = () => {
+    const reassign = action.value === 'reassign';
+    assignee.classList.toggle('d-none', !reassign);
+    assignee.querySelector('input').required = reassign;
+  };
+  action.addEventListener('change', toggleAssignee);
+  toggleAssignee();
+
+  form.addEventListener('submit', function (e) {
+    const selected = Array.from(boxes()).filter((box) => box.checked).length;
+    if (!allMatching.checked && selected === 0) {
+      e.preventDefault();
+      alert('Tick at least one ticket first.');
+      return;
+    }
+    const what = allMatching.checked ? 'every matching ticket' : `${selected} ticket(s)`;
+    if (action.value === 'delete' && !confirm(`Delete ${what}? This cannot be undone.`)) {
+      e.preventDefault();
+    }
+  });
+});
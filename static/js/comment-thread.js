@@ -0,0 +1,26 @@
+document.addEventListener('DOMContentLoaded', function () {
+  const list = document.getElementById('comment-list');
+  if (!list) {
+    return;
+  }
+
+  // Swap the "load older" row for the previous page, which brings its own "load older" row
+  list.addEventListener('click', function (e) {
+    const link = e.target.closest('[data-load-older]');
+    if (!link) return;
+    e.preventDefault();
+    link.classList.add('disabled');
+
+    fetch(link.href, { credentials: 'same-origin' })
+      .then((resp) => {
+        if (!resp.ok) throw new Error(resp.status);
+        return resp.text();
+      })
+      .then((html) => {
+        const row = link.closest('.comment-older');
+        row.insertAdjacentHTML('afterend', html);
+        row.remove();
+      })
+      .catch(() => link.classList.remove('disabled'));
+  });
+});
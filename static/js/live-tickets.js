@@ -0,0 +1,93 @@
+document.addEventListener('DOMContentLoaded', function () {
+  // Ticket list to keep up to date, skip if the browser has no EventSource
+  const list = document.getElementById('ticket-list');
+  if (!list || !window.EventSource) {
+    return;
+  }
+
+  const source = new EventSource(list.dataset.eventsUrl);
+  const findItem = (id) => list.querySelector(`[data-ticket-id="${id}"]`);
+
+  // Swap the status badge text and colour
+  const setStatus = (item, status) => {
+    const badge = item.querySelector('.ticket-status');
+    if (!badge) return;
+    badge.textContent = status;
+    badge.classList.toggle('bg-danger', status === 'Closed');
+    badge.classList.toggle('bg-success', status !== 'Closed');
+  };
+
+  // New tickets (and ones reassigned to this viewer) only belong at the top of the first page
+  const addItem = function (data) {
+    const filter = list.dataset.statusFilter;
+    if (list.dataset.firstPage !== '1' || (filter && filter !== data.status) || findItem(data.ticket_id)) {
+      return;
+    }
+    const item = document.createElement('a');
+    item.href = list.dataset.ticketUrl.replace(/0$/, data.ticket_id);
+    item.className = 'list-group-item list-group-item-action shadow-sm mb-2 border-primary';
+    item.dataset.ticketId = data.ticket_id;
+    const title = document.createElement('h5');
+    title.className = 'mb-1';
+    title.textContent = data.title;  // textContent keeps user input inert
+    item.appendChild(title);
+    const meta = document.createElement('small');
+    meta.className = 'text-muted';
+    meta.textContent = 'Status: ';
+    const badge = document.createElement('span');
+    badge.className = 'badge ticket-status';
+    meta.appendChild(badge);
+    item.appendChild(meta);
+    setStatus(item, data.status);
+    const empty = list.querySelector('.alert');
+    if (empty) empty.remove();
+    list.prepend(item);
+  };
+
+  source.addEventListener('ticket.created', function (e) {
+    addItem(JSON.parse(e.data));
+  });
+
+  source.addEventListener('ticket.updated', function (e) {
+    const data = JSON.parse(e.data);
+    const item = findItem(data.ticket_id);
+    // Only the title text, so an admin's bulk-select checkbox survives
+    const title = item && (item.querySelector('.ticket-title') || item.querySelector('h5'));
+    if (title) title.textContent = data.title;
+  });
+
+  const updateStatus = function (e) {
+    const data = JSON.parse(e.data);
+    const item = findItem(data.ticket_id);
+    if (item) setStatus(item, data.status);
+  };
+  source.addEventListener('ticket.closed', updateStatus);
+  source.addEventListener('ticket.reopened', updateStatus);
+
+  // Employees lose tickets reassigned to someone else and gain ones reassigned to them;
+  // admins keep seeing them all
+  source.addEventListener('ticket.reassigned', function (e) {
+    const data = JSON.parse(e.data);
+    const item = findItem(data.ticket_id);
+    const viewer = list.dataset.viewerId;
+    if (!viewer) return;
+    if (String(data.user_id) === viewer) addItem(data);
+    else if (item) item.remove();
+  });
+
+  source.addEventListener('ticket.deleted', function (e) {
+    const item = findItem(JSON.parse(e.data).ticket_id);
+    if (item) item.remove();
+  });
+
+  source.addEventListener('comment.created', function (e) {
+    const item = findItem(JSON.parse(e.data).ticket_id);
+    const count = item && item.querySelector('.comment-count');
+    if (count) count.textContent = parseInt(count.textContent, 10) + 1;
+  });
+
+  // The server lost our place in the change log, fall back to a full reload
+  source.addEventListener('reset', function () {
+    window.location.reload();
+  });
+});
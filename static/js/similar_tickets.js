@@ -0,0 +1,43 @@
+document.addEventListener('DOMContentLoaded', function () {
+  const box = document.getElementById('similar-tickets');
+  const title = document.getElementById('title');
+  const desc = document.getElementById('description');
+  if (!box || !title || !desc) {
+    return;
+  }
+  const list = box.querySelector('ul');
+  let timer = null;
+  let latest = 0;
+
+  const render = (tickets) => {
+    list.replaceChildren(...tickets.map((ticket) => {
+      const item = document.createElement('li');
+      const link = document.createElement('a');
+      link.href = ticket.url;
+      link.target = '_blank';
+      link.textContent = `#${ticket.id} ${ticket.title}`;
+      item.append(link, ` (${Math.round(ticket.similarity * 100)}% similar, ${ticket.created_ago})`);
+      return item;
+    }));
+    box.classList.toggle('d-none', tickets.length === 0);
+  };
+
+  // Ask once typing pauses; only the newest answer is shown
+  const lookup = () => {
+    const request = ++latest;
+    const params = new URLSearchParams({ title: title.value, description: desc.value });
+    fetch(`${box.dataset.url}?${params}`, { credentials: 'same-origin' })
+      .then((resp) => (resp.ok ? resp.json() : { similar: [] }))
+      .then((data) => {
+        if (request === latest) {
+          render(data.similar);
+        }
+      })
+      .catch(() => {});
+  };
+
+  [title, desc].forEach((field) => field.addEventListener('input', () => {
+    clearTimeout(timer);
+    timer = setTimeout(lookup, 400);
+  }));
+});
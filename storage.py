@@ -0,0 +1,313 @@
+from flask import current_app, g
+from urllib.parse import urlsplit
+import os
+import re
+import sqlite3
+import threading
+
+from db import get_db
+
+try:
+    import psycopg
+    from psycopg_pool import ConnectionPool as PsycopgPool
+except ImportError:  # optional: only needed when DATABASE_URL points at PostgreSQL
+    psycopg = None
+
+# Errors the routes catch, whichever backend raised them
+INTEGRITY_ERRORS = (sqlite3.IntegrityError,) + ((psycopg.IntegrityError,) if psycopg else ())
+DATABASE_ERRORS = (sqlite3.Error,) + ((psycopg.Error,) if psycopg else ())
+
+class StorageError(RuntimeError):
+    """Raised for a DATABASE_URL this install can't serve."""
+
+# --- DATABASE_URL ---
+def parse_database_url(url):
+    """Returns (dialect, target): a file path for sqlite, the URL itself for PostgreSQL."""
+    if not url:
+        return 'sqlite', None
+    parts = urlsplit(url)
+    if parts.scheme == 'sqlite':
+        # sqlite:///relative.db and sqlite:////absolute/path.db, as in SQLAlchemy
+        return 'sqlite', url[len('sqlite:///'):]
+    if parts.scheme in ('postgres', 'postgresql'):
+        return 'postgresql', url
+    raise StorageError('Unsupported DATABASE_URL scheme: %s' % parts.scheme)
+
+# --- PostgreSQL ---
+_PLACEHOLDER = re.compile(r"('(?:[^']|'')*')|\?")
+
+def to_format_style(sql):
+    # The app writes qmark SQL for sqlite3; psycopg wants %s, and a literal % has to be doubled
+    return _PLACEHOLDER.sub(lambda m: m.group(1) or '%s', sql.replace('%', '%%'))
+
+class Row(tuple):
+    """Index and name access like sqlite3.Row, so routes and templates don't care which backend they got."""
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._names[key])
+        return tuple.__getitem__(self, key)
+
+    def keys(self):
+        return list(self._names)
+
+def row_factory(cursor):
+    names = {column.name: i for i, column in enumerate(cursor.description or ())}
+
+    def make_row(values):
+        row = Row(values)
+        row._names = names
+        return row
+    return make_row
+
+class PostgresConnection:
+    """The slice of the sqlite3.Connection API the app uses, on top of a pooled psycopg connection."""
+    dialect = 'postgresql'
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    def execute(self, sql, params=()):
+        cur = self.raw.cursor(row_factory=row_factory)
+        if params:
+            cur.execute(to_format_style(sql), params)
+        else:
+            cur.execute(sql)
+        return cur
+
+    def executemany(self, sql, seq_of_params):
+        cur = self.raw.cursor(row_factory=row_factory)
+        cur.executemany(to_format_style(sql), seq_of_params)
+        return cur
+
+    def executescript(self, script):
+        # Without parameters psycopg sends the script as-is, several statements included
+        self.commit()
+        self.raw.execute(script)
+        self.commit()
+
+    def execute_outside_transaction(self, sql):
+        # For statements PostgreSQL refuses inside a transaction block, like CREATE INDEX CONCURRENTLY
+        self.commit()
+        self.raw.autocommit = True
+        try:
+            self.raw.execute(sql)
+        finally:
+            self.raw.autocommit = False
+
+    def stream(self, sql, params=(), size=1000):
+        # A named cursor is a server-side cursor: rows arrive size at a time instead of all at once
+        with self.raw.cursor(name='stream_%d' % id(self), row_factory=row_factory) as cur:
+            cur.itersize = size
+            cur.execute(to_format_style(sql) if params else sql, params or None)
+            yield from cur
+
+    @property
+    def in_transaction(self):
+        return self.raw.info.transaction_status != psycopg.pq.TransactionStatus.IDLE
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        self.raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+class PostgresPool:
+    """Same interface as db.ConnectionPool, backed by psycopg_pool and shared by the process's threads."""
+
+    def __init__(self, config):
+        if psycopg is None:
+            raise StorageError('DATABASE_URL points at PostgreSQL but psycopg is not installed '
+                               '(pip install "psycopg[binary,pool]")')
+        self.config = config
+        self.stats = {'opened': 0, 'reused': 0, 'health_failures': 0}
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        # Opened lazily, and again after fork(), so preloaded gunicorn workers never share sockets
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = PsycopgPool(self.config['DATABASE_URL'], min_size=self.config['PG_POOL_MIN'],
+                                         max_size=self.config['PG_POOL_MAX'], open=True)
+                self._pid = os.getpid()
+                self.stats['opened'] += 1
+            return self._pool
+
+    def acquire(self):
+        raw = self._get_pool().getconn(timeout=self.config['PG_POOL_TIMEOUT'])
+        with self._lock:
+            self.stats['reused'] += 1
+        return PostgresConnection(raw)
+
+    def release(self, conn):
+        # Never hand a half-finished transaction to the next request
+        if conn.in_transaction:
+            conn.rollback()
+        self._get_pool().putconn(conn.raw)
+
+    def check(self):
+        conn = self.acquire()
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except psycopg.Error:
+            with self._lock:
+                self.stats['health_failures'] += 1
+            return False
+        finally:
+            self.release(conn)
+
+    def size(self):
+        return self._pool.get_stats().get('pool_size', 0) if self._pool is not None else 0
+
+    def close_all(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+            self._pool = None
+
+# --- Streaming large listings ---
+def iter_rows(db, sql, params=(), size=1000):
+    """Yield rows without materialising the result: server-side cursor on PostgreSQL, fetchmany on SQLite."""
+    if hasattr(db, 'stream'):
+        yield from db.stream(sql, params, size)
+        return
+    cursor = db.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield from rows
+
+# --- Queries shared by the HTML routes and the JSON API ---
+TICKET_COLUMNS = '''
+    t.id, t.title, t.description, t.status, t.user_id, t.created_at, t.updated_at, t.version,
+    u.first_name || ' ' || u.last_name AS creator_name
+'''
+COMMENT_COLUMNS = '''
+    c.id, c.content, c.created_at, c.user_id, u.first_name || ' ' || u.last_name AS author
+'''
+
+class Store:
+    """Portable SQL for the per-route reads and writes. New ids come back via RETURNING, which
+    both SQLite and PostgreSQL support, rather than cursor.lastrowid. Callers commit."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def commit(self):
+        self.db.commit()
+
+    # Users
+    def user_by_email(self, email):
+        return self.db.execute('''
+            SELECT id, email, password, first_name, last_name, employee_id, role FROM users WHERE email = ?
+        ''', (email,)).fetchone()
+
+    def user_summary(self, user_id):
+        return self.db.execute('SELECT id, first_name, last_name, employee_id FROM users WHERE id = ?',
+                               (user_id,)).fetchone()
+
+    def user_id_for_employee(self, employee_id):
+        row = self.db.execute('SELECT id FROM users WHERE employee_id = ?', (employee_id,)).fetchone()
+        return row['id'] if row else None
+
+    def create_user(self, email, password, first_name, last_name, employee_id, role):
+        return self.db.execute('''
+            INSERT INTO users (email, password, first_name, last_name, employee_id, role)
+            VALUES (?, ?, ?, ?, ?, ?) RETURNING id
+        ''', (email, password, first_name, last_name, employee_id, role)).fetchone()[0]
+
+    def set_password(self, user_id, password_hash):
+        self.db.execute('UPDATE users SET password = ? WHERE id = ?', (password_hash, user_id))
+
+    # Tickets
+    def ticket(self, ticket_id):
+        return self.db.execute(
+            'SELECT ' + TICKET_COLUMNS + ' FROM tickets t JOIN users u ON t.user_id = u.id WHERE t.id = ?',
+            (ticket_id,)).fetchone()
+
+    def ticket_detail(self, ticket_id, tickets_table='tickets'):
+        return self.db.execute('''
+            SELECT t.*, u.employee_id, u.first_name || ' ' || u.last_name AS creator_name
+            FROM %s t
+            JOIN users u ON t.user_id = u.id
+            WHERE t.id = ?
+        ''' % tickets_table, (ticket_id,)).fetchone()
+
+    def create_ticket(self, title, description, user_id):
+        return self.db.execute('INSERT INTO tickets (title, description, user_id) VALUES (?, ?, ?) RETURNING id',
+                               (title, description, user_id)).fetchone()[0]
+
+    def update_ticket(self, ticket_id, title, description):
+        self.db.execute('UPDATE tickets SET title = ?, description = ? WHERE id = ?', (title, description, ticket_id))
+
+    def close_ticket(self, ticket_id):
+        self.db.execute('UPDATE tickets SET status = ? WHERE id = ?', ('Closed', ticket_id))
+
+    def delete_ticket(self, ticket_id):
+        self.db.execute('DELETE FROM tickets WHERE id = ?', (ticket_id,))
+
+    # Comments
+    def comments(self, ticket_id):
+        return self.db.execute('SELECT ' + COMMENT_COLUMNS + '''
+            FROM comments c
+            JOIN users u ON c.user_id = u.id
+            WHERE c.ticket_id = ?
+            ORDER BY c.created_at, c.id
+        ''', (ticket_id,)).fetchall()
+
+    def comment(self, comment_id):
+        return self.db.execute('SELECT ' + COMMENT_COLUMNS + '''
+            FROM comments c
+            JOIN users u ON c.user_id = u.id
+            WHERE c.id = ?
+        ''', (comment_id,)).fetchone()
+
+    def add_comment(self, ticket_id, user_id, content):
+        return self.db.execute('INSERT INTO comments (user_id, content, ticket_id) VALUES (?, ?, ?) RETURNING id',
+                               (user_id, content, ticket_id)).fetchone()[0]
+
+    def comment_total(self, ticket_id, archived=False):
+        if archived:
+            return self.db.execute('SELECT COUNT(*) FROM comments_archive WHERE ticket_id = ?',
+                                   (ticket_id,)).fetchone()[0]
+        # Live threads have a trigger-maintained counter
+        row = self.db.execute('SELECT comment_count FROM ticket_comment_stats WHERE ticket_id = ?',
+                              (ticket_id,)).fetchone()
+        return row['comment_count'] if row else 0
+
+def get_store():
+    if 'store' not in g:
+        g.store = Store(get_db())
+    return g.store
+
+def init_app(app):
+    app.config.setdefault('DATABASE_URL', None)
+    app.config.setdefault('PG_POOL_MIN', 1)
+    app.config.setdefault('PG_POOL_MAX', 10)
+    app.config.setdefault('PG_POOL_TIMEOUT', 10.0)
+
+    dialect, target = parse_database_url(app.config['DATABASE_URL'])
+    if dialect == 'postgresql':
+        # Every connection comes from the shared pool; nothing opens SQLite files
+        app.config['DB_POOL'] = True
+        app.extensions['db_pool'] = PostgresPool(app.config)
+    elif target:
+        app.config['DATABASE'] = target
+    app.extensions['storage'] = dialect
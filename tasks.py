@@ -0,0 +1,15 @@
+from db import get_db
+from jobs import task, enqueue
+
+# --- Search indexing ---
+@task('search.index_comments')
+def index_comments(ticket_id):
+    # Rebuild the ticket's comment column in one pass, however many comments arrived since the last run
+    get_db().execute('''
+        UPDATE ticket_search
+        SET comments = coalesce((SELECT group_concat(content, ?) FROM comments WHERE ticket_id = ?), '')
+        WHERE rowid = ?
+    ''', ('\n', ticket_id, ticket_id))
+
+def index_comments_later(ticket_id, db=None):
+    enqueue('search.index_comments', {'ticket_id': ticket_id}, key='search.index_comments:%d' % ticket_id, db=db)
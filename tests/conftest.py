@@ -0,0 +1,68 @@
+import pytest
+import tempfile
+import sys
+import os
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, init_db
+
+PASSWORD = 'ValidPass1!'
+
+# ---------- Test Setup ----------
+@pytest.fixture
+def app_config():
+    """Settings a test module needs on top of the defaults; modules override this fixture"""
+    return {}
+
+@pytest.fixture
+def database(monkeypatch, tmp_path, app_config):
+    """A temporary database with every migration applied; app_config is set first and undone afterwards"""
+    db_fd, db_path = tempfile.mkstemp()
+    app.config['DATABASE'] = db_path
+    app.config['TESTING'] = True
+    app.config['WTF_CSRF_ENABLED'] = False
+    # create_app() installs the template bytecode cache; keep it out of the instance folder
+    monkeypatch.setitem(app.config, 'TEMPLATE_CACHE_DIR', str(tmp_path / 'jinja'))
+    monkeypatch.setattr(app.jinja_env, 'bytecode_cache', None)
+    for key, value in app_config.items():
+        monkeypatch.setitem(app.config, key, value)
+
+    with app.app_context():
+        init_db()
+    yield db_path
+
+    os.close(db_fd)
+    os.unlink(db_path)
+
+@pytest.fixture
+def client(database):
+    """Creates a test client with a temporary database"""
+    with app.test_client() as client:
+        yield client
+
+# ---------- Helper Functions ----------
+def register_user(client, email, emp_id, role='employee', follow_redirects=True):
+    """Registers a user with the given details"""
+    return client.post('/register', data={
+        'email': email,
+        'password': PASSWORD,
+        'confirm_password': PASSWORD,
+        'first_name': 'Test',
+        'last_name': 'User',
+        'employee_id': emp_id,
+        'role': role
+    }, follow_redirects=follow_redirects)
+
+def login_user(client, email, password=PASSWORD, follow_redirects=True):
+    """Logs in the user"""
+    return client.post('/login', data={
+        'email': email,
+        'password': password
+    }, follow_redirects=follow_redirects)
+
+def register_and_login(client, email, emp_id, role='employee'):
+    """Registers a user and logs them in, without following the redirects"""
+    register_user(client, email, emp_id, role, follow_redirects=False)
+    login_user(client, email, follow_redirects=False)
@@ -0,0 +1,137 @@
+import pytest
+import sys
+import os
+from datetime import date
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, get_db
+from analytics import ReportError, parse_report_args, percentiles, rebuild_rollups, sla_report
+from humantime import utcnow
+from conftest import register_and_login
+
+# ---------- Test Setup ----------
+@pytest.fixture
+def client(client):
+    """The shared test client, logged in as an admin"""
+    register_and_login(client, 'analyst@example.com', 'EMP8201', 'admin')
+    return client
+
+# ---------- Helper Functions ----------
+def rollup_rows(db):
+    """Both rollup tables, for comparing incremental maintenance with a rebuild"""
+    return ([tuple(r) for r in db.execute('SELECT * FROM ticket_rollups ORDER BY grain, bucket')],
+            [tuple(r) for r in db.execute('SELECT * FROM close_time_histogram ORDER BY day, bin')])
+
+def today_report(db, grain='day'):
+    today = utcnow().date()
+    return sla_report(db, today, today, grain)
+
+# ---------- Tests ----------
+
+def test_transitions_and_rollups_follow_writes(client):
+    """Opening, commenting, closing and reopening are recorded and counted as they happen"""
+    client.post('/submit', data={'title': 'VPN down', 'description': 'Cannot connect'})
+    client.post('/ticket/1/comment', data={'content': 'Restarted the client'})
+    client.post('/ticket/1/close')
+    with app.app_context():
+        db = get_db()
+        assert db.execute('SELECT closed_at FROM tickets WHERE id = 1').fetchone()[0] is not None
+    client.post('/tickets/bulk', data={'action': 'reopen', 'ids': ['1']})
+
+    with app.app_context():
+        db = get_db()
+        transitions = [tuple(r) for r in db.execute(
+            'SELECT from_status, to_status FROM ticket_transitions WHERE ticket_id = 1 ORDER BY id')]
+        assert transitions == [(None, 'Open'), ('Open', 'Closed'), ('Closed', 'Open')]
+        assert db.execute('SELECT closed_at FROM tickets WHERE id = 1').fetchone()[0] is None
+
+        report = today_report(db)
+        assert report['totals'] == {'opened': 1, 'closed': 1, 'reopened': 1, 'comments': 1}
+        assert report['time_to_close']['count'] == 1
+        assert today_report(db, 'hour')['totals'] == report['totals']
+
+def test_time_to_close_percentiles(client):
+    """Percentiles over the range come from the histogram, within a bin's width of the real value"""
+    for i in range(10):
+        client.post('/submit', data={'title': 'Ticket %d' % i, 'description': 'Desc'})
+    with app.app_context():
+        db = get_db()
+        # Ticket n was raised n hours before it is closed
+        for ticket_id in range(1, 11):
+            db.execute("UPDATE tickets SET created_at = datetime('now', ?) WHERE id = ?",
+                       ('-%d hours' % ticket_id, ticket_id))
+        db.commit()
+    for ticket_id in range(1, 11):
+        client.post('/ticket/%d/close' % ticket_id)
+
+    with app.app_context():
+        ttc = today_report(get_db())['time_to_close']
+        assert ttc['count'] == 10
+        assert ttc['mean'] == pytest.approx(5.5 * 3600, rel=0.01)
+        assert ttc['p50'] == pytest.approx(5 * 3600, rel=0.25)
+        assert ttc['p90'] == pytest.approx(9 * 3600, rel=0.25)
+        assert ttc['p50'] <= ttc['p90'] <= ttc['p99']
+
+def test_rebuild_matches_incremental_rollups(client):
+    """Recounting from stored rows gives the same rollups the triggers maintained"""
+    client.post('/submit', data={'title': 'Printer jam', 'description': 'Third floor'})
+    client.post('/submit', data={'title': 'Monitor flicker', 'description': 'Desk 12'})
+    client.post('/ticket/1/comment', data={'content': 'On it'})
+    client.post('/ticket/1/close')
+    client.post('/tickets/bulk', data={'action': 'reopen', 'ids': ['1']})
+    client.post('/ticket/1/close')
+    with app.app_context():
+        db = get_db()
+        incremental = rollup_rows(db)
+        with db:
+            rebuild_rollups(db)
+        rebuilt = rollup_rows(db)
+        assert rebuilt[1] == incremental[1]
+        # close_seconds differ by float rounding only
+        assert [r[:-1] for r in rebuilt[0]] == [r[:-1] for r in incremental[0]]
+
+def test_report_args_and_weeks(client):
+    """Ranges default to the last 30 days, bad input is rejected and weeks start on Monday"""
+    start, end, grain = parse_report_args({}, today=date(2026, 3, 31))
+    assert (start, end, grain) == (date(2026, 3, 2), date(2026, 3, 31), 'day')
+    with pytest.raises(ReportError):
+        parse_report_args({'start': '2026-03-31', 'end': '2026-03-01'})
+    with pytest.raises(ReportError):
+        parse_report_args({'start': '2026-01-01', 'end': '2026-03-01', 'grain': 'hour'})
+
+    with app.app_context():
+        db = get_db()
+        db.executemany("INSERT INTO ticket_rollups (grain, bucket, opened) VALUES ('day', ?, ?)",
+                       [('2026-03-01', 1), ('2026-03-02', 2), ('2026-03-08', 3), ('2026-03-09', 4)])
+        db.commit()
+        report = sla_report(db, date(2026, 3, 1), date(2026, 3, 9), 'week')
+        assert [(b['bucket'], b['opened']) for b in report['buckets']] == [
+            ('2026-02-23', 1), ('2026-03-02', 5), ('2026-03-09', 4)]
+
+def test_percentiles_interpolate_within_bins():
+    """Ranks land proportionally inside a bin; the open-ended last bin reports its lower bound"""
+    result = percentiles([(0, 60, 0), (60, 120, 10), (120, 1e18, 10)], wanted=(25, 50, 99))
+    assert result == {'p25': 90.0, 'p50': 120.0, 'p99': 120}
+    assert percentiles([])['p50'] is None
+
+def test_reports_page_and_json(client):
+    """Admins get the page and the JSON; employees and bad ranges are refused"""
+    client.post('/submit', data={'title': 'Badge reader', 'description': 'Door 3'})
+    resp = client.get('/admin/reports')
+    assert resp.status_code == 200
+    assert b'SLA Reports' in resp.data
+
+    data = client.get('/api/v1/reports/sla?grain=hour&start=%s' % utcnow().date().isoformat()).get_json()
+    assert data['grain'] == 'hour' and data['totals']['opened'] == 1
+    assert set(data['time_to_close']) >= {'count', 'mean', 'p50', 'p90', 'p95'}
+    assert client.get('/api/v1/reports/sla?grain=month').status_code == 400
+
+    client.get('/logout')
+    client.post('/register', data={
+        'email': 'staff@example.com', 'password': 'ValidPass1!', 'confirm_password': 'ValidPass1!',
+        'first_name': 'Staff', 'last_name': 'Member', 'employee_id': 'EMP8202', 'role': 'employee'})
+    client.post('/login', data={'email': 'staff@example.com', 'password': 'ValidPass1!'})
+    assert client.get('/api/v1/reports/sla').status_code == 403
+    assert client.get('/admin/reports').status_code == 302
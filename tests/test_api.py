@@ -0,0 +1,129 @@
+import pytest
+import sys
+import os
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conftest import register_and_login
+
+# ---------- Helper Functions ----------
+def create_ticket(client, title='API Ticket'):
+    resp = client.post('/api/v1/tickets', json={'title': title, 'description': 'Desc'})
+    assert resp.status_code == 201
+    return resp.get_json()
+
+# ---------- Tests ----------
+
+def test_api_requires_login(client):
+    """Anonymous requests get a JSON 401"""
+    resp = client.get('/api/v1/tickets')
+    assert resp.status_code == 401
+    assert resp.get_json()['error']
+
+def test_api_ticket_etag_and_conditional_get(client):
+    """Unchanged tickets answer If-None-Match with an empty 304"""
+    register_and_login(client, 'api@example.com', 'EMP3001')
+    ticket = create_ticket(client)
+
+    resp = client.get(ticket['url'])
+    etag = resp.headers['ETag']
+    assert resp.status_code == 200 and not etag.startswith('W/')
+
+    resp = client.get(ticket['url'], headers={'If-None-Match': etag})
+    assert resp.status_code == 304 and resp.data == b''
+
+    client.patch(ticket['url'], json={'title': 'Renamed'})
+    resp = client.get(ticket['url'], headers={'If-None-Match': etag})
+    assert resp.status_code == 200
+    assert resp.get_json()['title'] == 'Renamed'
+    assert resp.get_json()['version'] == 2
+
+def test_api_list_pagination_and_etag(client):
+    """Listing pages by cursor and changes its ETag when a ticket changes"""
+    register_and_login(client, 'apilist@example.com', 'EMP3002')
+    for i in range(3):
+        create_ticket(client, f'List {i}')
+
+    resp = client.get('/api/v1/tickets?limit=2')
+    body = resp.get_json()
+    assert [t['title'] for t in body['tickets']] == ['List 2', 'List 1']
+    etag = resp.headers['ETag']
+
+    resp = client.get(f"/api/v1/tickets?limit=2&before={body['next_before']}")
+    assert [t['title'] for t in resp.get_json()['tickets']] == ['List 0']
+
+    assert client.get('/api/v1/tickets?limit=2', headers={'If-None-Match': etag}).status_code == 304
+    client.post(f"/api/v1/tickets/{body['tickets'][0]['id']}/comments", json={'content': 'Bump'})
+    assert client.get('/api/v1/tickets?limit=2', headers={'If-None-Match': etag}).status_code == 200
+
+def test_api_if_match_rejects_stale_edit(client):
+    """Edits carrying an outdated If-Match fail with 412"""
+    register_and_login(client, 'apimatch@example.com', 'EMP3003')
+    ticket = create_ticket(client)
+    etag = client.get(ticket['url']).headers['ETag']
+    client.patch(ticket['url'], json={'description': 'First edit'})
+    resp = client.patch(ticket['url'], json={'description': 'Second edit'}, headers={'If-Match': etag})
+    assert resp.status_code == 412
+
+def test_api_role_rules(client):
+    """Employees can't see others' tickets, close or delete; admins can"""
+    register_and_login(client, 'apiowner@example.com', 'EMP3004')
+    ticket = create_ticket(client)
+
+    register_and_login(client, 'apiother@example.com', 'EMP3005')
+    assert client.get(ticket['url']).status_code == 403
+    assert client.post(f"{ticket['url']}/close").status_code == 403
+    assert client.delete(ticket['url']).status_code == 403
+
+    register_and_login(client, 'apiadmin@example.com', 'EMP3006', role='admin')
+    resp = client.post(f"{ticket['url']}/close")
+    assert resp.get_json()['status'] == 'Closed'
+    assert client.post(f"{ticket['url']}/comments", json={'content': 'Late'}).status_code == 409
+    assert client.delete(ticket['url']).status_code == 204
+    assert client.get(ticket['url']).status_code == 404
+
+def test_api_comments(client):
+    """Comments can be added and listed with a conditional GET"""
+    register_and_login(client, 'apicomment@example.com', 'EMP3007')
+    ticket = create_ticket(client)
+    resp = client.post(f"{ticket['url']}/comments", json={'content': 'Hello'})
+    assert resp.status_code == 201
+
+    resp = client.get(f"{ticket['url']}/comments")
+    assert [c['content'] for c in resp.get_json()['comments']] == ['Hello']
+    resp = client.get(f"{ticket['url']}/comments", headers={'If-None-Match': resp.headers['ETag']})
+    assert resp.status_code == 304
+
+def test_api_comments_are_paged(client):
+    """The comment list pages back with before and forward with after, like the HTML thread"""
+    register_and_login(client, 'apipages@example.com', 'EMP3017')
+    ticket = create_ticket(client)
+    for n in range(5):
+        client.post(f"{ticket['url']}/comments", json={'content': 'Comment %d' % n})
+
+    latest = client.get(f"{ticket['url']}/comments?limit=2").get_json()
+    assert [c['content'] for c in latest['comments']] == ['Comment 3', 'Comment 4']
+    assert latest['prev_after'] is None and latest['limit'] == 2
+
+    older = client.get(f"{ticket['url']}/comments?limit=2&before={latest['next_before']}").get_json()
+    assert [c['content'] for c in older['comments']] == ['Comment 1', 'Comment 2']
+    oldest = client.get(f"{ticket['url']}/comments?limit=2&before={older['next_before']}").get_json()
+    assert [c['content'] for c in oldest['comments']] == ['Comment 0']
+    assert oldest['next_before'] is None
+
+    newer = client.get(f"{ticket['url']}/comments?limit=2&after={oldest['prev_after']}").get_json()
+    assert [c['content'] for c in newer['comments']] == ['Comment 1', 'Comment 2']
+    assert newer['prev_after'] == newer['comments'][-1]['id']
+    # Each page has its own ETag
+    first = client.get(f"{ticket['url']}/comments?limit=2").headers['ETag']
+    resp = client.get(f"{ticket['url']}/comments?limit=2&before={latest['next_before']}",
+                      headers={'If-None-Match': first})
+    assert resp.status_code == 200
+
+def test_api_timestamps_iso_and_relative(client):
+    """Timestamps are ISO 8601 with a precomputed relative form alongside"""
+    register_and_login(client, 'apitime@example.com', 'EMP3008')
+    ticket = create_ticket(client)
+    assert 'T' in ticket['created_at']
+    assert ticket['created_ago'].endswith('ago') or ticket['created_ago'] == 'now'
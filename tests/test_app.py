@@ -1,49 +1,15 @@
 import pytest
-import tempfile
 import sys
 import os
 
 # Allow importing app from parent directory
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app import app, init_db, get_db
-
-# ---------- Test Setup ----------
-@pytest.fixture
-def client():
-    """Creates a test client with a temporary database"""
-    db_fd, db_path = tempfile.mkstemp()
-    app.config['DATABASE'] = db_path
-    app.config['TESTING'] = True
-    app.config['WTF_CSRF_ENABLED'] = False
-
-    with app.test_client() as client:
-        with app.app_context():
-            init_db()
-        yield client
-
-    os.close(db_fd)
-    os.unlink(db_path)
-
-# ---------- Helper Functions ----------
-def register_user(client, email, emp_id, role='employee'):
-    """Registers a user with the given details"""
-    return client.post('/register', data={
-        'email': email,
-        'password': 'ValidPass1!',
-        'confirm_password': 'ValidPass1!',
-        'first_name': 'Test',
-        'last_name': 'User',
-        'employee_id': emp_id,
-        'role': role
-    }, follow_redirects=True)
-
-def login_user(client, email):
-    """Logs in the user"""
-    return client.post('/login', data={
-        'email': email,
-        'password': 'ValidPass1!'
-    }, follow_redirects=True)
+from app import app, get_db, get_ticket_stats
+from pagination import COMMENT_PAGE_SIZE
+from jobs import run_pending
+from bulk import rebuild_user_directory
+from conftest import register_user, login_user
 
 # ---------- Tests ----------
 
@@ -230,3 +196,242 @@ def test_view_user_tickets_invalid_user(client):
     login_user(client, 'adminv3@example.com')
     resp = client.get('/users/999/tickets', follow_redirects=True)
     assert b'User not found' in resp.data
+
+def test_dashboard_keyset_pagination(client):
+    """Dashboard pages through tickets with a before/after id cursor"""
+    register_user(client, 'pager@example.com', 'EMP2026')
+    login_user(client, 'pager@example.com')
+    for i in range(5):
+        client.post('/submit', data={'title': f'Paged Ticket {i}', 'description': 'Desc'})
+    db = get_db()
+    ids = [r['id'] for r in db.execute('SELECT id FROM tickets ORDER BY id DESC').fetchall()]
+
+    resp = client.get('/dashboard?limit=2')
+    assert b'Paged Ticket 4' in resp.data and b'Paged Ticket 3' in resp.data
+    assert b'Paged Ticket 2' not in resp.data
+    assert f'before={ids[1]}'.encode() in resp.data
+
+    resp = client.get(f'/dashboard?limit=2&before={ids[1]}')
+    assert b'Paged Ticket 2' in resp.data and b'Paged Ticket 1' in resp.data
+    assert b'Paged Ticket 3' not in resp.data
+    assert f'after={ids[2]}'.encode() in resp.data
+
+    resp = client.get(f'/dashboard?limit=2&after={ids[2]}')
+    assert b'Paged Ticket 4' in resp.data and b'Paged Ticket 3' in resp.data
+    assert b'Paged Ticket 2' not in resp.data
+
+def test_ticket_listing_uses_composite_indexes(client):
+    """Filtered listings are index range scans, not table scans"""
+    filters = [
+        ('t.user_id = ?', (1,)),
+        ('t.status = ?', ('Open',)),
+        ('t.user_id = ? AND t.status = ?', (1, 'Open')),
+    ]
+    with app.app_context():
+        db = get_db()
+        for where, params in filters:
+            plan = db.execute(
+                f'EXPLAIN QUERY PLAN SELECT t.* FROM tickets t WHERE {where} AND t.id < ? ORDER BY t.id DESC LIMIT 51',
+                params + (100,)).fetchall()
+            detail = ' '.join(row['detail'] for row in plan)
+            assert 'USING INDEX' in detail and 'TEMP B-TREE' not in detail
+
+def test_search_tickets_and_comments(client):
+    """Search matches titles and comments and highlights the hit"""
+    register_user(client, 'searcher@example.com', 'EMP2027')
+    login_user(client, 'searcher@example.com')
+    client.post('/submit', data={'title': 'VPN drops', 'description': 'Disconnects hourly'})
+    client.post('/submit', data={'title': 'Printer jam', 'description': 'Floor 2'})
+    db = get_db()
+    ticket_id = db.execute('SELECT id FROM tickets WHERE title = ?', ('Printer jam',)).fetchone()['id']
+    client.post(f'/ticket/{ticket_id}/comment', data={'content': 'Toner cartridge replaced'})
+    # Comments are indexed by a background job
+    run_pending(app)
+
+    resp = client.get('/search?q=vpn')
+    assert b'<mark>VPN</mark>' in resp.data
+    assert b'Printer jam' not in resp.data
+
+    resp = client.get('/search?q=toner')
+    assert b'Printer jam' in resp.data
+
+    resp = client.get('/search?q="unbalanced')
+    assert resp.status_code == 200
+
+def test_search_respects_visibility(client):
+    """Employees only find their own tickets, admins find everyone's"""
+    register_user(client, 'owner@example.com', 'EMP2028')
+    login_user(client, 'owner@example.com')
+    client.post('/submit', data={'title': 'Secret laptop issue', 'description': 'Desc'})
+
+    register_user(client, 'other@example.com', 'EMP2029')
+    login_user(client, 'other@example.com')
+    resp = client.get('/search?q=laptop')
+    assert b'Secret laptop issue' not in resp.data
+
+    register_user(client, 'searchadmin@example.com', 'EMP2030', role='admin')
+    login_user(client, 'searchadmin@example.com')
+    resp = client.get('/search?q=laptop')
+    assert b'Secret laptop issue' in resp.data
+
+def test_ticket_stats_follow_writes(client):
+    """Trigger-maintained counters track submits, closes, comments and deletes"""
+    register_user(client, 'counter@example.com', 'EMP2031')
+    login_user(client, 'counter@example.com')
+    client.post('/submit', data={'title': 'Count A', 'description': 'Desc'})
+    client.post('/submit', data={'title': 'Count B', 'description': 'Desc'})
+    db = get_db()
+    user_id = db.execute('SELECT id FROM users WHERE email = ?', ('counter@example.com',)).fetchone()['id']
+    ticket_a = db.execute('SELECT id FROM tickets WHERE title = ?', ('Count A',)).fetchone()['id']
+    ticket_b = db.execute('SELECT id FROM tickets WHERE title = ?', ('Count B',)).fetchone()['id']
+    client.post(f'/ticket/{ticket_a}/comment', data={'content': 'First'})
+    client.post(f'/ticket/{ticket_a}/comment', data={'content': 'Second'})
+
+    register_user(client, 'counteradmin@example.com', 'EMP2032', role='admin')
+    login_user(client, 'counteradmin@example.com')
+    client.post(f'/ticket/{ticket_a}/close')
+    client.post(f'/ticket/{ticket_b}/delete')
+
+    with app.app_context():
+        db = get_db()
+        stats = get_ticket_stats(db, user_id)
+        assert (stats['Open'], stats['Closed'], stats['Total']) == (0, 1, 1)
+        assert get_ticket_stats(db)['Total'] == 1
+        count = db.execute('SELECT comment_count FROM ticket_comment_stats WHERE ticket_id = ?', (ticket_a,)).fetchone()
+        assert count['comment_count'] == 2
+        assert db.execute('SELECT 1 FROM ticket_comment_stats WHERE ticket_id = ?', (ticket_b,)).fetchone() is None
+
+    resp = client.get('/dashboard')
+    assert b'class="comment-count">2<' in resp.data
+
+def test_comment_thread_keyset_pagination(client):
+    """Ticket view shows the latest comment page; older pages load by cursor"""
+    register_user(client, 'thread@example.com', 'EMP2030')
+    login_user(client, 'thread@example.com')
+    client.post('/submit', data={'title': 'Busy Incident', 'description': 'Desc'})
+    with app.app_context():
+        db = get_db()
+        ticket_id = db.execute('SELECT id FROM tickets').fetchone()['id']
+        # Same timestamp for every comment, so ordering falls back to id
+        db.executemany(
+            "INSERT INTO comments (ticket_id, user_id, content, created_at) VALUES (?, 1, ?, '2024-01-01 10:00:00')",
+            [(ticket_id, f'Update #{i:03d}') for i in range(COMMENT_PAGE_SIZE + 5)])
+        db.commit()
+        ids = [r['id'] for r in db.execute('SELECT id FROM comments ORDER BY id').fetchall()]
+
+    resp = client.get(f'/ticket/{ticket_id}')
+    assert f'Update #{COMMENT_PAGE_SIZE + 4:03d}'.encode() in resp.data
+    assert b'Update #005' in resp.data and b'Update #004' not in resp.data
+    assert f'comments?before={ids[5]}'.encode() in resp.data
+
+    resp = client.get(f'/ticket/{ticket_id}/comments?before={ids[5]}')
+    assert resp.status_code == 200
+    assert b'Update #000' in resp.data and b'Update #004' in resp.data
+    assert b'Update #005' not in resp.data and b'Load older' not in resp.data
+    assert b'<html' not in resp.data
+
+def test_ticket_and_comments_limited_to_owner_and_admins(client):
+    """Another employee gets 403 for a ticket and its comment pages; admins can read both"""
+    register_user(client, 'owner@example.com', 'EMP2031')
+    login_user(client, 'owner@example.com')
+    client.post('/submit', data={'title': 'Private Issue', 'description': 'Desc'})
+    client.post('/ticket/1/comment', data={'content': 'Only for the owner'})
+    assert client.get('/ticket/1').status_code == 200
+    assert client.get('/ticket/1/comments').status_code == 200
+    client.get('/logout')
+
+    register_user(client, 'nosy@example.com', 'EMP2032')
+    login_user(client, 'nosy@example.com')
+    assert client.get('/ticket/1').status_code == 403
+    resp = client.get('/ticket/1/comments')
+    assert resp.status_code == 403 and b'Only for the owner' not in resp.data
+    assert client.get('/ticket/99/comments').status_code == 404
+    client.get('/logout')
+
+    register_user(client, 'lead@example.com', 'EMP2033', role='admin')
+    login_user(client, 'lead@example.com')
+    assert b'Only for the owner' in client.get('/ticket/1').data
+    assert b'Only for the owner' in client.get('/ticket/1/comments').data
+
+def test_comment_page_uses_index(client):
+    """Comment pages are an index range scan with no sort step"""
+    with app.app_context():
+        plan = get_db().execute('''
+            EXPLAIN QUERY PLAN SELECT id FROM comments c
+            WHERE c.ticket_id = ? AND (c.created_at, c.id) < (?, ?)
+            ORDER BY c.created_at DESC, c.id DESC LIMIT 51
+        ''', (1, '2024-01-01 00:00:00', 10)).fetchall()
+        detail = ' '.join(row['detail'] for row in plan)
+        assert 'idx_comments_ticket_created' in detail and 'TEMP B-TREE' not in detail
+
+def directory_rows(db):
+    return [tuple(r) for r in db.execute('SELECT * FROM user_directory ORDER BY user_id').fetchall()]
+
+def test_user_directory_follows_writes(client):
+    """The directory read model tracks tickets and comments and matches a full rebuild"""
+    register_user(client, 'dir@example.com', 'EMP2040')
+    login_user(client, 'dir@example.com')
+    client.post('/submit', data={'title': 'Dir A', 'description': 'Desc'})
+    client.post('/submit', data={'title': 'Dir B', 'description': 'Desc'})
+    client.post('/ticket/1/comment', data={'content': 'Note'})
+    register_user(client, 'diradmin@example.com', 'EMP2041', role='admin')
+    login_user(client, 'diradmin@example.com')
+    client.post('/ticket/1/close')
+    client.post('/ticket/1/comment', data={'content': 'Admin note'})
+    client.post('/ticket/2/delete')
+
+    with app.app_context():
+        db = get_db()
+        row = db.execute('SELECT * FROM user_directory WHERE employee_id = ?', ('EMP2040',)).fetchone()
+        assert (row['open_count'], row['closed_count'], row['comment_count']) == (0, 1, 1)
+        assert row['last_activity'] and row['sort_name'] == 'user test'
+        admin = db.execute('SELECT * FROM user_directory WHERE employee_id = ?', ('EMP2041',)).fetchone()
+        assert admin['comment_count'] == 1 and admin['last_activity']
+
+        incremental = directory_rows(db)
+        rebuild_user_directory(db)
+        assert directory_rows(db) == incremental
+
+def test_user_directory_sorting_and_pages(client):
+    """The directory sorts by whitelisted columns, filters by role and pages by cursor"""
+    register_user(client, 'dirpager@example.com', 'EMP2042', role='admin')
+    login_user(client, 'dirpager@example.com')
+    with app.app_context():
+        db = get_db()
+        for i, last in enumerate(['Young', 'Adams', 'Moss', 'Baker']):
+            db.execute("INSERT INTO users (email, password, first_name, last_name, employee_id, role) "
+                       "VALUES (?, 'x', 'Pat', ?, ?, 'employee')", (f'p{i}@example.com', last, f'EMP31{i:02d}'))
+        db.execute("INSERT INTO tickets (title, description, user_id) VALUES ('T', 'D', 5)")
+        db.commit()
+
+    resp = client.get('/admin/users?limit=2')
+    assert b'Adams' in resp.data and b'Baker' in resp.data and b'Moss' not in resp.data
+    assert b'after=5' in resp.data
+
+    resp = client.get('/admin/users?limit=2&after=5')
+    assert b'Moss' in resp.data and b'User' in resp.data and b'Adams' not in resp.data
+    assert b'before=4' in resp.data
+
+    resp = client.get('/admin/users?limit=2&before=4')
+    assert b'Adams' in resp.data and b'Baker' in resp.data and b'Moss' not in resp.data
+
+    resp = client.get('/admin/users?sort=open&dir=desc&role=employee&limit=1')
+    assert b'Baker' in resp.data and b'EMP2042' not in resp.data
+
+    resp = client.get('/admin/users?sort=password')
+    assert resp.status_code == 200 and b'Adams' in resp.data
+
+def test_user_directory_uses_sort_indexes(client):
+    """Each directory sort is an index walk with no sort step, and the lookup columns are indexed"""
+    with app.app_context():
+        db = get_db()
+        for column in ('sort_name', 'employee_id', 'open_count', 'closed_count', 'comment_count', 'last_activity'):
+            plan = db.execute(f'''
+                EXPLAIN QUERY PLAN SELECT user_id FROM user_directory
+                WHERE ({column}, user_id) < ((SELECT {column} FROM user_directory WHERE user_id = ?), ?)
+                ORDER BY {column} DESC, user_id DESC LIMIT 51
+            ''', (1, 1)).fetchall()
+            detail = ' '.join(row['detail'] for row in plan)
+            assert 'INDEX idx_user_directory' in detail and 'TEMP B-TREE' not in detail
+        plan = db.execute('EXPLAIN QUERY PLAN SELECT id FROM users WHERE employee_id = ?', ('EMP0001',)).fetchall()
+        assert 'idx_users_employee_id' in plan[0]['detail']
@@ -0,0 +1,103 @@
+import pytest
+import sys
+import os
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, get_db, get_ticket_stats
+from bulk import rebuild_derived
+from conftest import register_and_login
+
+# ---------- Test Setup ----------
+@pytest.fixture
+def client(client):
+    """The shared test client, logged in as an admin"""
+    register_and_login(client, 'archivist@example.com', 'EMP8001', 'admin')
+    return client
+
+# ---------- Helper Functions ----------
+def make_tickets(client):
+    """Creates an old closed ticket with comments, a recently closed one and an open one"""
+    for title in ('Ancient fax outage', 'Recent close', 'Still open'):
+        client.post('/submit', data={'title': title, 'description': 'Desc'})
+    client.post('/ticket/1/comment', data={'content': 'Replaced the modem'})
+    client.post('/ticket/1/comment', data={'content': 'Confirmed working'})
+    client.post('/ticket/1/close')
+    client.post('/ticket/2/close')
+    with app.app_context():
+        db = get_db()
+        db.execute("UPDATE comments SET created_at = '2020-01-01 00:00:00'")
+        # Write the timestamp directly; the version trigger only fires on status/title/description changes
+        db.execute("UPDATE tickets SET updated_at = '2020-01-01 00:00:00' WHERE id = 1")
+        db.commit()
+
+# ---------- Tests ----------
+
+def test_archive_command_moves_old_closed_tickets(client):
+    """Only tickets closed longer than --days move, with their comments, and the report shows the shrink"""
+    make_tickets(client)
+    result = app.test_cli_runner().invoke(args=['tickets', 'archive', '--days', '30', '--batch-size', '1'])
+    assert result.exit_code == 0, result.output
+    assert 'archived 1 tickets and 2 comments' in result.output
+    assert 'hot tickets: 3 -> 2 (-33.3%)' in result.output
+    assert 'hot comments: 2 -> 0 (-100.0%)' in result.output
+
+    with app.app_context():
+        db = get_db()
+        assert [r['id'] for r in db.execute('SELECT id FROM tickets ORDER BY id')] == [2, 3]
+        assert db.execute('SELECT COUNT(*) FROM comments_archive WHERE ticket_id = 1').fetchone()[0] == 2
+        assert db.execute('SELECT COUNT(*) FROM ticket_search WHERE rowid = 1').fetchone()[0] == 0
+        assert get_ticket_stats(db)['Closed'] == 2
+
+def test_archiving_keeps_stats(client):
+    """Archived tickets and their comments still count in ticket_stats and the user directory"""
+    make_tickets(client)
+
+    def snapshot():
+        with app.app_context():
+            db = get_db()
+            return ([tuple(r) for r in db.execute('SELECT * FROM ticket_stats ORDER BY user_id, status')],
+                    [tuple(r) for r in db.execute(
+                        'SELECT user_id, open_count, closed_count, comment_count FROM user_directory ORDER BY user_id')])
+
+    before = snapshot()
+    result = app.test_cli_runner().invoke(args=['tickets', 'archive', '--days', '30'])
+    assert 'archived 1 tickets' in result.output
+    assert snapshot() == before
+    # A full rebuild after a bulk load arrives at the same counts
+    with app.app_context():
+        rebuild_derived(get_db())
+        get_db().commit()
+    assert snapshot() == before
+
+def test_archive_dry_run(client):
+    """--dry-run counts candidates without moving anything"""
+    make_tickets(client)
+    result = app.test_cli_runner().invoke(args=['tickets', 'archive', '--days', '30', '--dry-run'])
+    assert '1 tickets closed more than 30 days ago would be archived' in result.output
+    with app.app_context():
+        assert get_db().execute('SELECT COUNT(*) FROM tickets_archive').fetchone()[0] == 0
+
+def test_archived_ticket_still_viewable(client):
+    """view_ticket falls back to the archive, read-only, with its comment thread"""
+    make_tickets(client)
+    app.test_cli_runner().invoke(args=['tickets', 'archive', '--days', '30'])
+
+    resp = client.get('/ticket/1')
+    assert resp.status_code == 200
+    assert b'Ancient fax outage' in resp.data and b'Replaced the modem' in resp.data
+    assert b'archived and is read-only' in resp.data
+    assert b'Delete Ticket' not in resp.data
+
+    resp = client.get('/ticket/1/comments')
+    assert b'Confirmed working' in resp.data
+
+def test_archived_tickets_searchable_on_request(client):
+    """Archived tickets drop out of normal search but are found with archived=1"""
+    make_tickets(client)
+    app.test_cli_runner().invoke(args=['tickets', 'archive', '--days', '30'])
+
+    assert b'Ancient fax outage' not in client.get('/search?q=fax').data
+    resp = client.get('/search?q=modem&archived=1')
+    assert b'Ancient fax outage' in resp.data and b'<mark>modem</mark>' in resp.data
@@ -0,0 +1,177 @@
+import pytest
+import asyncio
+import threading
+import sys
+import os
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, asgi_app
+from asgi import AsgiAdapter, build_environ
+from events import get_change_log
+
+# ---------- Test Setup ----------
+@pytest.fixture
+def adapter(database):
+    """A fresh ASGI adapter over the app with a temporary database and a two-thread view pool"""
+    adapter = AsgiAdapter(app, max_workers=2)
+    yield adapter
+    adapter.shutdown()
+
+# ---------- Helper Functions ----------
+def scope_for(method, path, cookies=None, form=None):
+    """An ASGI http scope and request body for one request"""
+    query = ''
+    if '?' in path:
+        path, query = path.split('?', 1)
+    headers = [(b'host', b'testserver')]
+    if cookies:
+        headers.append((b'cookie', '; '.join('%s=%s' % kv for kv in cookies.items()).encode()))
+    body = b''
+    if form is not None:
+        body = urlencode(form).encode()
+        headers.append((b'content-type', b'application/x-www-form-urlencoded'))
+        headers.append((b'content-length', str(len(body)).encode()))
+    scope = {'type': 'http', 'http_version': '1.1', 'method': method, 'scheme': 'http', 'path': path,
+             'root_path': '', 'query_string': query.encode(), 'headers': headers,
+             'server': ('testserver', 80), 'client': ('127.0.0.1', 50000)}
+    return scope, body
+
+async def call(adapter, method, path, cookies=None, form=None):
+    """Runs one complete request through the adapter; returns (status, headers, body)"""
+    scope, body = scope_for(method, path, cookies, form)
+    sent = []
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    await adapter(scope, receive, send)
+    headers = [(k.decode(), v.decode()) for k, v in sent[0]['headers']]
+    for name, value in headers:
+        if name == 'set-cookie':
+            morsel = SimpleCookie(value)
+            for key in morsel:
+                if cookies is not None:
+                    cookies[key] = morsel[key].value
+    return sent[0]['status'], headers, b''.join(m.get('body', b'') for m in sent[1:])
+
+async def login(adapter, cookies, email, emp_id, role='admin'):
+    """Registers a user and logs them in, keeping the session cookie"""
+    await call(adapter, 'POST', '/register', cookies, {
+        'email': email, 'password': 'ValidPass1!', 'confirm_password': 'ValidPass1!',
+        'first_name': 'Async', 'last_name': 'User', 'employee_id': emp_id, 'role': role})
+    status, _, _ = await call(adapter, 'POST', '/login', cookies, {'email': email, 'password': 'ValidPass1!'})
+    assert status == 302
+
+# ---------- Tests ----------
+
+def test_environ_follows_pep_3333():
+    """Paths become latin-1 native strings, the mount point moves to SCRIPT_NAME and cookies are rejoined"""
+    scope, _ = scope_for('GET', '/helpdesk/search?q=caf%C3%A9')
+    scope['path'] = '/helpdesk/tickets/café'
+    scope['root_path'] = '/helpdesk'
+    scope['headers'] += [(b'cookie', b'a=1'), (b'cookie', b'b=2')]
+    environ = build_environ(scope, b'')
+    assert environ['SCRIPT_NAME'] == '/helpdesk'
+    assert environ['PATH_INFO'].encode('latin-1').decode('utf-8') == '/tickets/café'
+    assert environ['QUERY_STRING'] == 'q=caf%C3%A9'
+    assert environ['HTTP_COOKIE'] == 'a=1; b=2'
+
+def test_routes_and_sessions_work_over_asgi(adapter):
+    """Forms, redirects, sessions and JSON behave the same as under WSGI"""
+    async def scenario():
+        cookies = {}
+        await login(adapter, cookies, 'asgi@example.com', 'EMP9101')
+        status, headers, _ = await call(adapter, 'POST', '/submit', cookies,
+                                        {'title': 'Event loop', 'description': 'Served via ASGI'})
+        assert status == 302
+        status, _, body = await call(adapter, 'GET', '/dashboard', cookies)
+        assert status == 200 and b'Event loop' in body
+        status, _, body = await call(adapter, 'GET', '/healthz')
+        assert status == 200 and b'"status":"ok"' in body.replace(b' ', b'')
+
+    asyncio.run(scenario())
+    # Every view ran on the adapter's own bounded pool
+    assert adapter.stats['requests'] >= 5
+    assert len(adapter.executor._threads) <= 2
+
+def test_open_streams_hold_no_threads(adapter):
+    """Many /events subscribers wait on the loop; a write reaches all of them and disconnects end them"""
+    app.config['SSE_HEARTBEAT'] = 30
+    streams = 50
+
+    async def scenario():
+        cookies = {}
+        await login(adapter, cookies, 'watcher@example.com', 'EMP9102')
+        threads_before = threading.active_count()
+        received = [[] for _ in range(streams)]
+        gone = [asyncio.Event() for _ in range(streams)]
+
+        async def subscribe(n):
+            scope, _ = scope_for('GET', '/events', cookies)
+            requested = False
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await gone[n].wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                received[n].append(message.get('body', b''))
+
+            await adapter(scope, receive, send)
+
+        tasks = [asyncio.ensure_future(subscribe(n)) for n in range(streams)]
+        while adapter.stats['open_streams'] < streams:
+            await asyncio.sleep(0.01)
+        # Only the two view threads exist, not one per open stream
+        assert threading.active_count() - threads_before <= 2
+
+        get_change_log(app).append('ticket.created', 1, None, {'title': 'Broadcast'})
+        while not all(any(b'Broadcast' in chunk for chunk in chunks) for chunks in received):
+            await asyncio.sleep(0.01)
+
+        for event in gone:
+            event.set()
+        await asyncio.wait_for(asyncio.gather(*tasks), 5)
+        assert adapter.stats['open_streams'] == 0
+        assert adapter.stats['disconnects'] == streams
+
+    try:
+        asyncio.run(asyncio.wait_for(scenario(), 30))
+    finally:
+        app.config['SSE_HEARTBEAT'] = 15
+
+def test_lifespan_and_app_entry_point():
+    """app:asgi_app is registered on the app and stops its pool on lifespan shutdown"""
+    assert app.extensions['asgi'] is asgi_app
+    assert asgi_app.max_workers == app.config['ASGI_DB_THREADS']
+
+    adapter = AsgiAdapter(app, max_workers=1)
+    adapter.executor.submit(lambda: None).result()
+    messages = iter([{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+    sent = []
+
+    async def receive():
+        return next(messages)
+
+    async def send(message):
+        sent.append(message['type'])
+
+    asyncio.run(adapter({'type': 'lifespan'}, receive, send))
+    assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+    assert adapter._executor is None
@@ -0,0 +1,117 @@
+import pytest
+import gzip
+import os
+import sys
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask, url_for
+from app import app
+import assets
+from assets import AssetManifest, get_manifest
+
+# ---------- Test Setup ----------
+@pytest.fixture
+def client():
+    """Creates a test client; static files need no database"""
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+def hashed_url(filename):
+    with app.test_request_context():
+        return url_for('static', filename=filename)
+
+def read_static(filename):
+    with open(os.path.join(app.static_folder, filename), 'rb') as f:
+        return f.read()
+
+# ---------- Tests ----------
+
+def test_url_for_static_is_fingerprinted():
+    """url_for('static') returns a content-hashed name"""
+    url = hashed_url('js/register.js')
+    assert url.startswith('/static/js/register.') and url.endswith('.js')
+    assert url != '/static/js/register.js'
+    assert hashed_url('js/not-there.js') == '/static/js/not-there.js'
+
+def test_fingerprinted_asset_is_immutable_and_precompressed(client):
+    """Hashed names are cached forever and served gzipped to clients that accept it"""
+    url = hashed_url('css/style.css')
+    resp = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert resp.status_code == 200
+    assert resp.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert resp.mimetype == 'text/css'
+    assert 'Accept-Encoding' in resp.headers['Vary']
+    assert gzip.decompress(resp.data) == read_static('css/style.css')
+
+    resp = client.get(url)
+    assert 'Content-Encoding' not in resp.headers
+    assert resp.data == read_static('css/style.css')
+
+def test_plain_and_unknown_static_names(client):
+    """Unhashed names still work with default caching; a stale hash is a 404"""
+    resp = client.get('/static/js/register.js')
+    assert resp.status_code == 200 and 'immutable' not in resp.headers.get('Cache-Control', '')
+    assert client.get('/static/js/register.000000000000.js').status_code == 404
+
+def test_manifest_refresh_tracks_changes(tmp_path):
+    """Editing a file gives it a new hash; deleting it drops it from the manifest"""
+    static = tmp_path / 'static'
+    static.mkdir()
+    (static / 'app.js').write_text('console.log(1);')
+    manifest = AssetManifest(str(static), str(tmp_path / 'build'))
+    manifest.refresh()
+    first = manifest.hashed['app.js']
+
+    (static / 'app.js').write_text('console.log(2);')
+    os.utime(static / 'app.js', ns=(1, 1))
+    manifest.refresh()
+    assert manifest.hashed['app.js'] != first and first not in manifest.logical
+
+    built = manifest.build()
+    assert built[0][0] == 'app.js'
+    assert (tmp_path / 'build' / (manifest.hashed['app.js'] + '.gz')).exists()
+
+    (static / 'app.js').unlink()
+    manifest.refresh()
+    assert manifest.hashed == {} and manifest.logical == {}
+
+def test_dynamic_html_compressed_above_threshold(client):
+    """Large HTML pages are gzipped when accepted; small ones are left alone"""
+    resp = client.get('/register', headers={'Accept-Encoding': 'gzip'})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert b'<form' in gzip.decompress(resp.data)
+
+    app.config['COMPRESS_MIN_SIZE'] = 10 ** 7
+    try:
+        resp = client.get('/register', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in resp.headers and b'<form' in resp.data
+    finally:
+        app.config['COMPRESS_MIN_SIZE'] = 1024
+
+def test_build_command_lists_assets():
+    """flask assets build reports every compressible asset"""
+    result = app.test_cli_runner().invoke(args=['assets', 'build'])
+    assert result.exit_code == 0, result.output
+    assert 'js/register.js' in result.output and 'gz=' in result.output
+    assert get_manifest(app).hashed['js/register.js'] in result.output
+
+def test_precompression_waits_for_first_request(tmp_path):
+    """init_app only hashes; the compressed copies are written on the first request, once"""
+    static = tmp_path / 'static'
+    static.mkdir()
+    (static / 'site.css').write_text('body { color: black; }' * 20)
+    lazy = Flask(__name__, static_folder=str(static))
+    lazy.config['ASSET_BUILD_DIR'] = str(tmp_path / 'build')
+    assets.init_app(lazy)
+    assert not (tmp_path / 'build').exists()
+
+    manifest = get_manifest(lazy)
+    target = tmp_path / 'build' / (manifest.hashed['site.css'] + '.gz')
+    resp = lazy.test_client().get('/static/' + manifest.hashed['site.css'], headers={'Accept-Encoding': 'gzip'})
+    assert resp.headers['Content-Encoding'] == 'gzip' and target.exists()
+    assert manifest.built
+
@@ -0,0 +1,126 @@
+import pytest
+import sys
+import os
+import time
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, get_db
+from auth import DatabaseThrottle, HashingPool, Throttle, Overloaded, get_hashing_pool
+from conftest import register_user, login_user
+
+# ---------- Tests ----------
+
+def test_hashing_pool_rejects_when_full():
+    """A full queue raises Overloaded instead of queueing more work"""
+    pool = HashingPool(workers=0, max_pending=1, timeout=1)
+    assert pool.run(lambda: 'ok') == 'ok'
+    pool._slots.acquire()
+    with pytest.raises(Overloaded):
+        pool.run(lambda: 'queued')
+    assert pool.stats['rejected'] == 1
+
+def test_hashing_workers_are_not_forked():
+    """Hash workers start from a fresh interpreter, not a fork of the threaded server"""
+    pool = HashingPool(workers=1, max_pending=2, timeout=30)
+    try:
+        assert pool.run(os.getpid) != os.getpid()
+        assert pool._get_executor()._mp_context.get_start_method() in ('forkserver', 'spawn')
+    finally:
+        pool.shutdown()
+
+def test_timed_out_hash_keeps_its_slot():
+    """A hash that outlives the timeout holds its queue slot until it actually finishes"""
+    pool = HashingPool(workers=1, max_pending=1, timeout=0.2)
+    try:
+        with pytest.raises(Overloaded):
+            pool.run(time.sleep, 1)
+        assert pool.stats['pending'] == 1
+        with pytest.raises(Overloaded):
+            pool.run(os.getpid)
+        assert pool.stats['rejected'] == 1
+        deadline = time.monotonic() + 10
+        while pool.stats['pending'] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool.run(os.getpid) != os.getpid()
+    finally:
+        pool.shutdown()
+
+def test_throttle_sliding_window():
+    """Keys over the limit get a retry delay; reset clears it"""
+    throttle = Throttle(limit=2, window=60)
+    throttle.hit('a')
+    assert throttle.retry_after('a') == 0
+    throttle.hit('a')
+    assert 0 < throttle.retry_after('a') <= 61
+    assert throttle.retry_after('b') == 0
+    throttle.reset('a')
+    assert throttle.retry_after('a') == 0
+
+def test_throttle_forgets_idle_keys(monkeypatch):
+    """Keys whose hits have all expired are swept, and the store never exceeds max_keys"""
+    now = [1000.0]
+    monkeypatch.setattr('auth.time.monotonic', lambda: now[0])
+    throttle = Throttle(limit=2, window=60, max_keys=3)
+    for ip in ('10.0.0.1', '10.0.0.2'):
+        throttle.hit(ip)
+    now[0] += 61
+    throttle.hit('10.0.0.3')
+    assert list(throttle._hits) == ['10.0.0.3']
+
+    for n in range(4, 10):
+        throttle.hit('10.0.0.%d' % n)
+    assert list(throttle._hits) == ['10.0.0.7', '10.0.0.8', '10.0.0.9']
+
+def test_database_throttle_is_shared(client):
+    """Attempts recorded by one process's throttle count against every other process's"""
+    with app.app_context():
+        here, there = DatabaseThrottle('ip', 2, 60), DatabaseThrottle('ip', 2, 60)
+        here.hit('10.0.0.1')
+        assert there.retry_after('10.0.0.1') == 0
+        there.hit('10.0.0.1')
+        assert 0 < here.retry_after('10.0.0.1') <= 61
+        assert DatabaseThrottle('email', 2, 60).retry_after('10.0.0.1') == 0
+        here.reset('10.0.0.1')
+        assert there.retry_after('10.0.0.1') == 0
+
+def test_login_throttled_after_repeated_failures(client):
+    """Too many bad passwords for one email answers 429 with Retry-After"""
+    register_user(client, 'throttle@example.com', 'EMP6001', follow_redirects=False)
+    for _ in range(app.config['LOGIN_EMAIL_LIMIT']):
+        assert login_user(client, 'throttle@example.com', 'WrongPass1!', follow_redirects=False).status_code == 200
+    resp = login_user(client, 'throttle@example.com', follow_redirects=False)
+    assert resp.status_code == 429
+    assert int(resp.headers['Retry-After']) > 0
+    assert b'Too many login attempts' in resp.data
+
+def test_login_busy_when_hashing_pool_full(client):
+    """A saturated hashing pool answers 503 rather than stalling the worker"""
+    register_user(client, 'busy@example.com', 'EMP6002', follow_redirects=False)
+    pool = get_hashing_pool(app)
+    for _ in range(pool.max_pending):
+        pool._slots.acquire()
+    try:
+        resp = login_user(client, 'busy@example.com', follow_redirects=False)
+    finally:
+        for _ in range(pool.max_pending):
+            pool._slots.release()
+    assert resp.status_code == 503
+    assert resp.headers['Retry-After']
+
+def test_rehash_on_login_after_method_change(client):
+    """Hashes made with an old method are upgraded on the next successful login"""
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    try:
+        register_user(client, 'rehash@example.com', 'EMP6003', follow_redirects=False)
+    finally:
+        app.config['PASSWORD_HASH_METHOD'] = 'scrypt'
+    stored = get_db().execute('SELECT password FROM users WHERE email = ?', ('rehash@example.com',)).fetchone()
+    assert stored['password'].startswith('pbkdf2:sha256:1000$')
+
+    resp = login_user(client, 'rehash@example.com', follow_redirects=False)
+    assert resp.status_code == 302
+    with app.app_context():
+        stored = get_db().execute('SELECT password FROM users WHERE email = ?', ('rehash@example.com',)).fetchone()
+    assert stored['password'].startswith('scrypt:')
@@ -0,0 +1,162 @@
+import pytest
+import sys
+import os
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, get_db, get_ticket_stats
+from batch import apply_batch
+from events import get_change_log
+from fragment_cache import DiskBackend, MemoryBackend
+from conftest import register_and_login
+
+# ---------- Helper Functions ----------
+def make_tickets(client, n):
+    for i in range(n):
+        client.post('/submit', data={'title': f'Outage {i}', 'description': 'Desc'})
+
+def statuses():
+    with app.app_context():
+        return {r['id']: r['status'] for r in get_db().execute('SELECT id, status FROM tickets')}
+
+# ---------- Tests ----------
+
+def test_bulk_close_reports_per_id_results(client):
+    """Closing a mix of open, closed and missing ids reports each outcome"""
+    register_and_login(client, 'batchadmin@example.com', 'EMP9001', role='admin')
+    make_tickets(client, 3)
+    client.post('/ticket/3/close')
+    first_event = get_change_log().last_id
+
+    resp = client.post('/api/v1/tickets/bulk', json={'action': 'close', 'ids': [1, 2, 3, 99, 1]})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert body['results'] == {'1': 'closed', '2': 'closed', '3': 'unchanged', '99': 'not_found'}
+    assert body['summary'] == {'closed': 2, 'unchanged': 1, 'not_found': 1}
+    assert set(statuses().values()) == {'Closed'}
+
+    events, _ = get_change_log().since(first_event)
+    assert [(e['type'], e['ticket_id']) for e in events] == [('ticket.closed', 1), ('ticket.closed', 2)]
+    with app.app_context():
+        assert get_ticket_stats(get_db())['Closed'] == 3
+
+def test_bulk_close_commits_once(client):
+    """The update and every ticket's event go out in a single commit"""
+    register_and_login(client, 'batchonce@example.com', 'EMP9007', role='admin')
+    make_tickets(client, 20)
+    first_event = get_change_log().last_id
+
+    with app.app_context():
+        db = get_db()
+        statements = []
+        db.set_trace_callback(statements.append)
+        try:
+            results = apply_batch(db, 'close', list(range(1, 21)))
+        finally:
+            db.set_trace_callback(None)
+    assert set(results.values()) == {'closed'}
+    assert [s for s in statements if s.strip().upper() == 'COMMIT'] == ['COMMIT']
+    events, _ = get_change_log().since(first_event)
+    assert [e['ticket_id'] for e in events] == list(range(1, 21))
+
+def test_bulk_filter_reopen_and_reassign(client):
+    """Filters select every matching ticket; reassign moves ownership"""
+    register_and_login(client, 'batchowner@example.com', 'EMP9002')
+    make_tickets(client, 2)
+    client.get('/logout')
+    register_and_login(client, 'batchadmin2@example.com', 'EMP9003', role='admin')
+    client.post('/api/v1/tickets/bulk', json={'action': 'close', 'ids': [1, 2]})
+
+    resp = client.post('/api/v1/tickets/bulk', json={'action': 'reopen', 'filter': {'status': 'Closed'}})
+    assert resp.get_json()['summary'] == {'reopened': 2}
+
+    resp = client.post('/api/v1/tickets/bulk', json={'action': 'reassign', 'ids': [1], 'user_id': 2})
+    assert resp.get_json()['results'] == {'1': 'reassigned'}
+    with app.app_context():
+        assert get_db().execute('SELECT user_id FROM tickets WHERE id = 1').fetchone()[0] == 2
+
+    resp = client.post('/api/v1/tickets/bulk', json={'action': 'reassign', 'ids': [1], 'user_id': 42})
+    assert resp.status_code == 400
+
+def test_reassign_event_reaches_new_owner(client, monkeypatch):
+    """Both the previous owner and the new assignee are told about a reassigned ticket"""
+    monkeypatch.setitem(app.config, 'SSE_MAX_DURATION', 0)
+    register_and_login(client, 'fromowner@example.com', 'EMP9010')
+    make_tickets(client, 1)
+    client.get('/logout')
+    register_and_login(client, 'toowner@example.com', 'EMP9011')
+    client.get('/logout')
+    register_and_login(client, 'batchadmin5@example.com', 'EMP9012', role='admin')
+    start = get_change_log(app).last_id
+    client.post('/api/v1/tickets/bulk', json={'action': 'reassign', 'ids': [1], 'user_id': 2})
+
+    for email in ('fromowner@example.com', 'toowner@example.com', 'batchadmin5@example.com'):
+        client.get('/logout')
+        client.post('/login', data={'email': email, 'password': 'ValidPass1!'})
+        body = client.get('/events', headers={'Last-Event-ID': str(start)}).get_data(as_text=True)
+        assert body.count('event: ticket.reassigned') == 1, email
+        assert '"user_id": 2' in body and '"title": "Outage 0"' in body
+
+def test_bulk_delete_invalidates_cached_pages(client):
+    """Deleting in bulk removes the tickets, their comments and their cached fragments"""
+    register_and_login(client, 'batchadmin3@example.com', 'EMP9004', role='admin')
+    make_tickets(client, 2)
+    client.post('/ticket/1/comment', data={'content': 'Looking into it'})
+    assert b'Outage 0' in client.get('/ticket/1').data
+
+    resp = client.post('/api/v1/tickets/bulk', json={'action': 'delete', 'ids': [1, 2]})
+    assert resp.get_json()['summary'] == {'deleted': 2}
+    assert statuses() == {}
+    with app.app_context():
+        assert get_db().execute('SELECT COUNT(*) FROM comments').fetchone()[0] == 0
+    resp = client.get('/ticket/1', follow_redirects=True)
+    assert b'Ticket not found' in resp.data
+
+def test_bulk_requires_admin_and_valid_request(client):
+    """Employees are refused; bad actions, empty selections and malformed bodies are 400s"""
+    register_and_login(client, 'batchemp@example.com', 'EMP9005')
+    make_tickets(client, 1)
+    assert client.post('/api/v1/tickets/bulk', json={'action': 'close', 'ids': [1]}).status_code == 403
+    resp = client.post('/tickets/bulk', data={'action': 'close', 'ids': ['1']}, follow_redirects=True)
+    assert b'not authorised' in resp.data
+    assert statuses() == {1: 'Open'}
+
+    client.get('/logout')
+    register_and_login(client, 'batchadmin4@example.com', 'EMP9006', role='admin')
+    assert client.post('/api/v1/tickets/bulk', json={'action': 'explode', 'ids': [1]}).status_code == 400
+    assert client.post('/api/v1/tickets/bulk', json={'action': 'close', 'ids': []}).status_code == 400
+
+    # Malformed JSON shapes are 400s with a message, never 500s
+    for body in ({'action': 'close', 'filter': 'Open'}, {'action': 'close', 'filter': {'user_id': 'me'}},
+                 {'action': 'close', 'filter': {'status': ['Open']}}, {'action': 'close', 'ids': '12'},
+                 {'action': 'reassign', 'ids': [1], 'user_id': {'id': 2}}, [1, 2]):
+        resp = client.post('/api/v1/tickets/bulk', json=body)
+        assert resp.status_code == 400 and resp.get_json()['error'], body
+    assert statuses() == {1: 'Open'}
+
+def test_dashboard_bulk_form(client):
+    """The dashboard form closes ticked tickets and flashes a summary"""
+    register_and_login(client, 'batchadmin5@example.com', 'EMP9007', role='admin')
+    make_tickets(client, 3)
+    resp = client.get('/dashboard')
+    assert b'id="bulk-form"' in resp.data and b'name="ids" value="1"' in resp.data
+
+    resp = client.post('/tickets/bulk', data={'action': 'close', 'ids': ['1', '2']}, follow_redirects=True)
+    assert b'Bulk close: 2 closed.' in resp.data
+    assert statuses() == {1: 'Closed', 2: 'Closed', 3: 'Open'}
+
+    resp = client.post('/tickets/bulk', data={'action': 'reassign', 'all_matching': '1', 'status': 'Open',
+                                               'employee_id': 'EMP9007'}, follow_redirects=True)
+    assert b'Bulk reassign: 1 unchanged.' in resp.data
+
+def test_cache_delete_many(tmp_path):
+    """Both backends drop every version of the given ids in one call"""
+    for backend in (MemoryBackend(), DiskBackend(str(tmp_path))):
+        for obj_id in (1, 2, 3):
+            backend.set(('ticket', obj_id, 1), 'x')
+        backend.set(('comments', 1, 1), 'x')
+        assert backend.delete_many('ticket', [1, 3]) == 2
+        assert backend.get(('ticket', 2, 1)) == 'x'
+        assert backend.get(('ticket', 1, 1)) is None
+        assert backend.get(('comments', 1, 1)) == 'x'
@@ -0,0 +1,48 @@
+import pytest
+import sys
+import os
+
+# Allow importing app and the benchmark scripts
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'benchmarks')))
+
+from app import app, get_db
+from datagen import generate
+from loadtest import FlaskClientSession, run, percentile, scenario_context
+from connections import MODES, footprint
+
+# ---------- Tests ----------
+
+def test_percentile_nearest_rank():
+    """Percentiles use the nearest-rank method"""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0.0
+
+def test_generate_and_run_smoke(tmp_path):
+    """A tiny dataset can be generated and driven through every scenario route"""
+    db_path = str(tmp_path / 'bench.db')
+    generate(db_path, users=5, tickets=200, comments=400, log=lambda msg: None)
+    with app.app_context():
+        db = get_db()
+        assert db.execute('SELECT COUNT(*) FROM tickets').fetchone()[0] == 200
+        assert db.execute("SELECT COUNT(*) FROM ticket_search WHERE ticket_search MATCH 'error'").fetchone()[0] > 0
+        assert db.execute('SELECT COUNT(*) FROM ticket_signatures').fetchone()[0] == 200
+        ctx = scenario_context(db)
+    assert ctx['max_ticket'] == 200 and 'bench1@example.com' not in ctx['owned']
+
+    result = run(lambda: FlaskClientSession(app), ctx, virtual_users=2, duration=0.5, user_pool=5)
+    assert result['total']['requests'] > 0
+    assert result['total']['errors'] == 0
+    assert set(result['routes']) <= {'dashboard', 'dashboard_filtered', 'dashboard_deep_page', 'view_ticket',
+                                     'search', 'api_list', 'submit_ticket'}
+
+def test_connection_benchmark_accounting():
+    """Both serving modes are known and the process footprint is read from /proc"""
+    assert MODES['wsgi'][0] == 'app:app' and MODES['asgi'][0] == 'app:asgi_app'
+    if not os.path.exists('/proc/self/status'):
+        pytest.skip('needs Linux /proc')
+    rss, threads = footprint(os.getpid())
+    assert rss > 0 and threads >= 1
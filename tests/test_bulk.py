@@ -0,0 +1,136 @@
+import pytest
+import json
+import sys
+import os
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, get_db, get_ticket_stats
+
+# ---------- Test Setup ----------
+@pytest.fixture
+def runner(database):
+    """Creates a CLI runner against a temporary database with two users"""
+    with app.app_context():
+        db = get_db()
+        db.execute("INSERT INTO users (email, password, first_name, last_name, employee_id, role) "
+                   "VALUES ('a@example.com', 'x', 'Ann', 'A', 'EMP7001', 'employee')")
+        db.execute("INSERT INTO users (email, password, first_name, last_name, employee_id, role) "
+                   "VALUES ('b@example.com', 'x', 'Ben', 'B', 'EMP7002', 'employee')")
+        db.commit()
+
+    return app.test_cli_runner()
+
+def write_jsonl(path, records):
+    with open(path, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+# ---------- Tests ----------
+
+def test_import_resolves_owners_and_rebuilds_derived_tables(runner, tmp_path):
+    """Imported rows are matched by employee_id or email and show up in search and stats"""
+    tickets = tmp_path / 'tickets.jsonl'
+    write_jsonl(tickets, [
+        {'id': 10, 'title': 'Legacy VPN outage', 'description': 'Old system', 'status': 'Closed',
+         'created_at': '2020-01-02T03:04:05', 'employee_id': 'EMP7001'},
+        {'id': 11, 'title': 'Legacy printer', 'description': 'Old system', 'email': 'B@example.com'},
+        {'id': 12, 'title': 'Orphan', 'description': 'No owner', 'employee_id': 'EMP9999'},
+    ])
+    comments = tmp_path / 'comments.csv'
+    comments.write_text('ticket_id,content,employee_id,email\n10,Rebooted the concentrator,EMP7002,\n')
+
+    result = runner.invoke(args=['tickets', 'import', str(tickets), '--batch-size', '2', '--defer'])
+    assert result.exit_code == 0, result.output
+    assert '2 rows, 1 skipped' in result.output
+    # Without --defer comments go through the triggers and are indexed for search as they load
+    result = runner.invoke(args=['tickets', 'import', str(comments), '--kind', 'comments'])
+    assert result.exit_code == 0, result.output
+
+    with app.app_context():
+        db = get_db()
+        assert db.execute('SELECT COUNT(*) FROM tickets').fetchone()[0] == 2
+        ticket = db.execute('SELECT status, created_at, version FROM tickets WHERE id = 10').fetchone()
+        assert ticket['status'] == 'Closed' and ticket['created_at'].year == 2020 and ticket['version'] == 2
+        hits = db.execute("SELECT rowid FROM ticket_search WHERE ticket_search MATCH 'concentrator'").fetchall()
+        assert [h[0] for h in hits] == [10]
+        stats = get_ticket_stats(db)
+        assert (stats['Open'], stats['Closed']) == (1, 1)
+        assert db.execute('SELECT comment_count FROM ticket_comment_stats WHERE ticket_id = 10').fetchone()[0] == 1
+        # Indexes and triggers are back after the deferred load
+        names = {r[0] for r in db.execute("SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger')")}
+        assert {'idx_tickets_user_status_id', 'tickets_search_ai', 'tickets_stats_ai'} <= names
+
+def test_import_without_defer_records_closes(runner, tmp_path):
+    """Closed tickets imported through the triggers still land in the SLA rollups and histogram"""
+    tickets = tmp_path / 'tickets.jsonl'
+    write_jsonl(tickets, [
+        {'id': 20, 'title': 'Legacy close', 'description': 'Old system', 'status': 'Closed',
+         'created_at': '2020-01-02T00:00:00', 'updated_at': '2020-01-05T00:00:00', 'employee_id': 'EMP7001'},
+    ])
+    result = runner.invoke(args=['tickets', 'import', str(tickets)])
+    assert result.exit_code == 0, result.output
+
+    with app.app_context():
+        db = get_db()
+        assert db.execute('SELECT closed_at FROM tickets WHERE id = 20').fetchone()[0].day == 5
+        day = db.execute("SELECT opened, closed, close_seconds FROM ticket_rollups "
+                         "WHERE grain = 'day' AND bucket = '2020-01-05'").fetchone()
+        assert (day['closed'], day['close_seconds']) == (1, 3 * 86400)
+        assert db.execute("SELECT opened FROM ticket_rollups "
+                          "WHERE grain = 'day' AND bucket = '2020-01-02'").fetchone()[0] == 1
+        histogram = db.execute('SELECT day, closed FROM close_time_histogram').fetchall()
+        assert [(str(h['day']), h['closed']) for h in histogram] == [('2020-01-05', 1)]
+
+def test_export_round_trip(runner, tmp_path):
+    """Export streams every ticket in a format import accepts"""
+    with app.app_context():
+        db = get_db()
+        db.execute("INSERT INTO tickets (title, description, user_id) VALUES ('Export me', 'Desc', 1)")
+        db.commit()
+
+    out = tmp_path / 'out.csv'
+    result = runner.invoke(args=['tickets', 'export', str(out)])
+    assert result.exit_code == 0, result.output
+    lines = out.read_text().splitlines()
+    assert lines[0].startswith('id,title,description') and 'EMP7001' in lines[1]
+
+    with app.app_context():
+        db = get_db()
+        db.execute('DELETE FROM tickets')
+        db.commit()
+    result = runner.invoke(args=['tickets', 'import', str(out)])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert get_db().execute('SELECT title FROM tickets').fetchone()['title'] == 'Export me'
+
+def test_import_skips_bad_rows_and_reports_them(runner, tmp_path):
+    """Malformed rows and constraint violations are counted and listed; the good rows still load"""
+    tickets = tmp_path / 'tickets.jsonl'
+    write_jsonl(tickets, [
+        {'id': 20, 'title': 'Good one', 'description': 'Fine', 'employee_id': 'EMP7001'},
+        {'id': 21, 'description': 'No title', 'employee_id': 'EMP7001'},
+        {'id': 22, 'title': 'Bad date', 'description': 'x', 'created_at': 'yesterday', 'employee_id': 'EMP7001'},
+        {'id': 20, 'title': 'Duplicate id', 'description': 'x', 'employee_id': 'EMP7001'},
+        {'id': 23, 'title': 'Also good', 'description': 'Fine', 'employee_id': 'EMP7002'},
+    ])
+    with open(tickets, 'a') as f:
+        f.write('{not json\n')
+
+    result = runner.invoke(args=['tickets', 'import', str(tickets)])
+    assert result.exit_code == 0, result.output
+    assert '2 rows, 0 skipped, 4 failed' in result.output
+    assert 'row 2: missing field' in result.output and 'row 4: UNIQUE constraint failed' in result.output
+    assert 'row 6:' in result.output
+
+    comments = tmp_path / 'comments.csv'
+    comments.write_text('ticket_id,content,employee_id\n20,Looks fine,EMP7002\n999,No such ticket,EMP7002\n')
+    result = runner.invoke(args=['tickets', 'import', str(comments), '--kind', 'comments'])
+    assert result.exit_code == 0, result.output
+    assert '1 rows, 0 skipped, 1 failed' in result.output and 'FOREIGN KEY' in result.output
+
+    with app.app_context():
+        db = get_db()
+        assert [r[0] for r in db.execute('SELECT id FROM tickets ORDER BY id')] == [20, 23]
+        assert db.execute('SELECT COUNT(*) FROM comments').fetchone()[0] == 1
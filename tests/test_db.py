@@ -0,0 +1,95 @@
+import pytest
+import sqlite3
+import threading
+import sys
+import os
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, get_db, get_pool
+
+# ---------- Test Setup ----------
+@pytest.fixture
+def client(client):
+    """The shared test client; pooled connections are closed before the database goes away"""
+    yield client
+    get_pool(app).close_all()
+
+# ---------- Tests ----------
+
+def test_connection_is_tuned(client):
+    """Pooled connections come up in WAL mode with foreign keys enforced"""
+    with app.app_context():
+        db = get_db()
+        assert db.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert db.execute('PRAGMA foreign_keys').fetchone()[0] == 1
+        assert db.execute('PRAGMA synchronous').fetchone()[0] == 1
+        assert db.execute('PRAGMA busy_timeout').fetchone()[0] == app.config['SQLITE_BUSY_TIMEOUT']
+
+def test_pool_reuses_connection_per_thread(client):
+    """The same thread gets the same connection back, other threads get their own until they exit"""
+    with app.app_context():
+        first = get_db()
+    with app.app_context():
+        assert get_db() is first
+
+    seen = []
+    def worker():
+        with app.app_context():
+            seen.append(get_db())
+    t = threading.Thread(target=worker)
+    t.start()
+    t.join()
+    assert seen[0] is not first
+    assert get_pool(app).size() == 1
+
+def test_close_all_leaves_other_threads_connections_to_them(client):
+    """close_all() closes the caller's connection; another thread closes its own on its next acquire"""
+    pool = get_pool(app)
+    held, go, seen = threading.Event(), threading.Event(), []
+    def worker():
+        seen.append(pool.acquire())
+        held.set()
+        go.wait()
+        seen.append(pool.acquire())
+    t = threading.Thread(target=worker, daemon=True)
+    t.start()
+    held.wait()
+    mine = pool.acquire()
+    assert pool.size() == 2
+
+    assert pool.close_all() == 1
+    with pytest.raises(sqlite3.ProgrammingError):
+        mine.execute('SELECT 1')
+    assert pool.size() == 1
+    go.set()
+    t.join()
+    assert seen[1] is not seen[0]
+    with pytest.raises(sqlite3.ProgrammingError):
+        seen[0].execute('SELECT 1')
+    assert pool.size() == 0
+
+def test_pool_rolls_back_unfinished_transactions(client):
+    """A request that forgets to commit leaves nothing behind for the next one"""
+    with app.app_context():
+        get_db().execute("INSERT INTO users (email, password, role) VALUES ('x@example.com', 'x', 'employee')")
+    with app.app_context():
+        assert get_db().execute('SELECT COUNT(*) FROM users').fetchone()[0] == 0
+
+def test_per_request_mode(client):
+    """DB_POOL=False restores one connection per request"""
+    app.config['DB_POOL'] = False
+    try:
+        with app.app_context():
+            first = get_db()
+        with app.app_context():
+            assert get_db() is not first
+    finally:
+        app.config['DB_POOL'] = True
+
+def test_healthz(client):
+    """Health check reports the pool state"""
+    resp = client.get('/healthz')
+    assert resp.status_code == 200
+    assert resp.get_json()['status'] == 'ok'
@@ -0,0 +1,106 @@
+import pytest
+import sys
+import os
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, get_db
+import duplicates
+from duplicates import THRESHOLD, find_similar, pack, signature, similarity, unpack
+from conftest import register_and_login
+
+# ---------- Helper Functions ----------
+OUTAGE = [
+    ('VPN drops every few minutes', 'My VPN connection keeps dropping since this morning'),
+    ('VPN keeps dropping', 'VPN connection drops every few minutes since this morning'),
+    ('VPN drops', 'The VPN connection keeps dropping every few minutes'),
+]
+UNRELATED = ('Printer jammed', 'The printer on the third floor is jammed again')
+
+# ---------- Tests ----------
+
+def test_signatures_estimate_similarity():
+    """Rewordings of one problem score above the threshold, different problems near zero"""
+    vpn = [signature('%s %s' % t) for t in OUTAGE]
+    printer = signature('%s %s' % UNRELATED)
+    assert signature('%s %s' % OUTAGE[0]) == vpn[0]
+    assert unpack(pack(vpn[0])) == vpn[0]
+    assert similarity(vpn[0], vpn[1]) >= THRESHOLD
+    assert similarity(vpn[0], printer) < 0.2
+
+def test_numpy_matches_pure_python(monkeypatch):
+    """Stored signatures are identical whichever implementation computed them"""
+    pytest.importorskip('numpy')
+    text = '%s %s' % OUTAGE[0]
+    vectorized = signature(text)
+    monkeypatch.setattr(duplicates, 'np', None)
+    assert signature(text) == vectorized
+
+def test_submit_suggests_open_duplicates(client):
+    """The submit form's lookup finds open near-duplicates the user may see, best first"""
+    register_and_login(client, 'first@example.com', 'EMP8301')
+    for title, description in OUTAGE[:2] + [UNRELATED]:
+        client.post('/submit', data={'title': title, 'description': description})
+
+    resp = client.get('/api/v1/tickets/similar', query_string={'title': OUTAGE[2][0], 'description': OUTAGE[2][1]})
+    similar = resp.get_json()['similar']
+    assert {t['id'] for t in similar} == {1, 2}
+    scores = [t['similarity'] for t in similar]
+    assert scores == sorted(scores, reverse=True)
+    assert similar[0]['url'] == '/ticket/%d' % similar[0]['id']
+    assert all(t['similarity'] >= THRESHOLD for t in similar)
+
+    # Employees never see other people's tickets
+    client.get('/logout')
+    register_and_login(client, 'other@example.com', 'EMP8302')
+    resp = client.get('/api/v1/tickets/similar', query_string={'title': OUTAGE[2][0], 'description': OUTAGE[2][1]})
+    assert resp.get_json()['similar'] == []
+
+def test_dashboard_groups_duplicates(client):
+    """Admins can fold an outage's copies under the first ticket, with a count"""
+    register_and_login(client, 'agent@example.com', 'EMP8303', role='admin')
+    for title, description in OUTAGE + [UNRELATED]:
+        client.post('/submit', data={'title': title, 'description': description})
+
+    flat = client.get('/dashboard').get_data(as_text=True)
+    assert flat.count('Similar to #1') == 2
+
+    grouped = client.get('/dashboard?group=1').get_data(as_text=True)
+    assert '+2 similar' in grouped
+    assert 'VPN keeps dropping' not in grouped
+    assert 'Printer jammed' in grouped
+
+    client.post('/ticket/1/close')
+    grouped = client.get('/dashboard?group=1&status=Open').get_data(as_text=True)
+    assert '+1 similar' in grouped and 'VPN keeps dropping' in grouped
+
+def test_rebuild_command_and_lookup_plan(client):
+    """`flask duplicates rebuild` recreates the index; lookups go through the band primary key"""
+    register_and_login(client, 'agent2@example.com', 'EMP8304', role='admin')
+    for title, description in OUTAGE + [UNRELATED]:
+        client.post('/submit', data={'title': title, 'description': description})
+    with app.app_context():
+        db = get_db()
+        before = [tuple(r) for r in db.execute('SELECT ticket_id, cluster_id FROM ticket_signatures ORDER BY 1')]
+
+    result = app.test_cli_runner().invoke(args=['duplicates', 'rebuild', '--batch-size', '2'])
+    assert result.exit_code == 0, result.output
+    assert 'indexed 4 tickets' in result.output
+
+    with app.app_context():
+        db = get_db()
+        after = [tuple(r) for r in db.execute('SELECT ticket_id, cluster_id FROM ticket_signatures ORDER BY 1')]
+        assert after == before
+        assert db.execute('SELECT COUNT(*) FROM ticket_lsh_buckets').fetchone()[0] == 4 * duplicates.BANDS
+
+        plans = []
+
+        class Explaining:
+            def execute(self, sql, params=()):
+                plans.extend(row['detail'] for row in db.execute('EXPLAIN QUERY PLAN ' + sql, params))
+                return db.execute(sql, params)
+
+        matches = find_similar(Explaining(), signature('%s %s' % OUTAGE[0]))
+        assert [m['id'] for m in matches][0] == 1
+        assert any('ticket_lsh_buckets USING PRIMARY KEY' in detail for detail in plans)
@@ -0,0 +1,82 @@
+import pytest
+import threading
+import sys
+import os
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, get_db
+from events import ChangeLog, get_change_log
+from conftest import register_and_login
+
+# ---------- Test Setup ----------
+@pytest.fixture
+def app_config():
+    """A stream that ends after the backlog"""
+    return {'SSE_MAX_DURATION': 0}
+
+# ---------- Helper Functions ----------
+def read_stream(client, last_id):
+    """Collects the (event, data) pairs the stream sends for a resume point"""
+    resp = client.get('/events', headers={'Last-Event-ID': str(last_id)})
+    assert resp.mimetype == 'text/event-stream'
+    events = []
+    for block in resp.get_data(as_text=True).split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line)
+        if 'event' in fields:
+            events.append((fields['event'], fields.get('data')))
+    return events
+
+# ---------- Tests ----------
+
+def test_change_log_detects_gaps(client):
+    """Resuming from an evicted or future id is reported as incomplete"""
+    log = ChangeLog(app, maxlen=2)
+    for i in range(3):
+        log.append('ticket.created', i, 1)
+    events, complete = log.since(1)
+    assert [e['id'] for e in events] == [2, 3] and complete
+    assert not log.since(0)[1]
+    assert not log.since(10)[1]
+
+def test_change_log_is_shared_between_workers(client):
+    """A waiting stream in one process is woken by an event another process wrote to the database"""
+    other = ChangeLog(app, poll_interval=0.05)
+    start = other.last_id
+    woken = []
+    waiter = threading.Thread(target=lambda: woken.append(other.wait(start, 5)))
+    waiter.start()
+    event = get_change_log(app).append('ticket.created', 7, 1, {'title': 'Elsewhere'})
+    waiter.join()
+    assert woken == [True]
+    events, complete = other.since(start)
+    assert complete and [(e['id'], e['data']['title']) for e in events] == [(event['id'], 'Elsewhere')]
+
+    # A client that reconnects to a worker which has not polled yet still resumes from its id
+    later = get_change_log(app).append('ticket.closed', 7, 1)
+    events, complete = ChangeLog(app, poll_interval=60).since(event['id'])
+    assert complete and [e['id'] for e in events] == [later['id']]
+
+def test_stream_resumes_and_filters_by_owner(client):
+    """Employees only receive events for their own tickets, from Last-Event-ID onwards"""
+    start = get_change_log(app).last_id
+    register_and_login(client, 'liveone@example.com', 'EMP4001')
+    client.post('/submit', data={'title': 'Mine', 'description': 'Desc'})
+    register_and_login(client, 'livetwo@example.com', 'EMP4002')
+    client.post('/submit', data={'title': 'Theirs', 'description': 'Desc'})
+    db = get_db()
+    ticket_id = db.execute('SELECT id FROM tickets WHERE title = ?', ('Theirs',)).fetchone()['id']
+    client.post(f'/ticket/{ticket_id}/comment', data={'content': 'Note'})
+
+    events = read_stream(client, start)
+    assert [e for e, _ in events] == ['ticket.created', 'comment.created']
+    assert 'Theirs' in events[0][1]
+
+    register_and_login(client, 'liveadmin@example.com', 'EMP4003', role='admin')
+    client.post(f'/ticket/{ticket_id}/close')
+    client.post(f'/ticket/{ticket_id}/delete')
+    events = read_stream(client, start)
+    assert [e for e, _ in events] == ['ticket.created', 'ticket.created', 'comment.created',
+                                      'ticket.closed', 'ticket.deleted']
+    assert read_stream(client, get_change_log(app).last_id) == []
@@ -0,0 +1,75 @@
+import pytest
+import tempfile
+import sys
+import os
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, get_db
+from fragment_cache import FragmentCache, MemoryBackend, DiskBackend, get_fragment_cache
+
+# ---------- Test Setup ----------
+@pytest.fixture
+def client(client):
+    """The shared test client with an empty fragment cache"""
+    cache = get_fragment_cache(app)
+    cache.clear()
+    cache.stats.update(hits=0, misses=0, evictions=0, invalidations=0)
+    return client
+
+# ---------- Tests ----------
+
+def test_memory_backend_is_bounded_lru():
+    """The least recently used entry is evicted and counted"""
+    cache = FragmentCache(MemoryBackend(maxsize=2))
+    cache.get_or_render('ticket', 1, 1, lambda: 'one')
+    cache.get_or_render('ticket', 2, 1, lambda: 'two')
+    cache.get_or_render('ticket', 1, 1, lambda: 'stale')
+    cache.get_or_render('ticket', 3, 1, lambda: 'three')
+    assert cache.get_or_render('ticket', 1, 1, lambda: 'fresh') == 'one'
+    assert cache.get_or_render('ticket', 2, 1, lambda: 'fresh') == 'fresh'
+    assert cache.stats['evictions'] == 2
+
+def test_disk_backend_invalidates_all_versions():
+    """Invalidating a ticket drops every cached version of it and nothing else"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = FragmentCache(DiskBackend(directory))
+        cache.get_or_render('ticket', 7, 1, lambda: 'v1')
+        cache.get_or_render('ticket', 7, 2, lambda: 'v2')
+        cache.get_or_render('ticket', 8, 1, lambda: 'other')
+        cache.invalidate('ticket', 7)
+        assert cache.stats['invalidations'] == 2
+        assert cache.get_or_render('ticket', 7, 2, lambda: 'rerendered') == 'rerendered'
+        assert cache.get_or_render('ticket', 8, 1, lambda: 'rerendered') == 'other'
+
+def test_view_ticket_served_from_cache_until_comment(client):
+    """Repeat views hit the cache; adding a comment invalidates it"""
+    client.post('/register', data={
+        'email': 'cache@example.com', 'password': 'ValidPass1!', 'confirm_password': 'ValidPass1!',
+        'first_name': 'Cache', 'last_name': 'User', 'employee_id': 'EMP5001', 'role': 'employee'
+    })
+    client.post('/login', data={'email': 'cache@example.com', 'password': 'ValidPass1!'})
+    client.post('/submit', data={'title': 'Cached Ticket', 'description': 'Desc'})
+    ticket_id = get_db().execute('SELECT id FROM tickets WHERE title = ?', ('Cached Ticket',)).fetchone()['id']
+
+    client.get(f'/ticket/{ticket_id}')
+    resp = client.get(f'/ticket/{ticket_id}')
+    stats = get_fragment_cache(app).stats
+    assert (stats['misses'], stats['hits']) == (2, 2)
+    assert b'Cached Ticket' in resp.data and b'No comments yet' in resp.data
+
+    client.post(f'/ticket/{ticket_id}/comment', data={'content': 'Fresh comment'})
+    resp = client.get(f'/ticket/{ticket_id}')
+    assert b'Fresh comment' in resp.data
+    assert stats['invalidations'] == 2 and stats['misses'] == 4
+
+def test_view_missing_ticket(client):
+    """Unknown ticket ids redirect back with a message"""
+    client.post('/register', data={
+        'email': 'missing@example.com', 'password': 'ValidPass1!', 'confirm_password': 'ValidPass1!',
+        'first_name': 'Miss', 'last_name': 'Ing', 'employee_id': 'EMP5002', 'role': 'employee'
+    })
+    client.post('/login', data={'email': 'missing@example.com', 'password': 'ValidPass1!'})
+    resp = client.get('/ticket/999', follow_redirects=True)
+    assert b'Ticket not found' in resp.data
@@ -0,0 +1,50 @@
+import pytest
+import random
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import humanize
+from humantime import naturaltime, naturaltime_many, parse_timestamp
+
+# ---------- Tests ----------
+
+def test_bucketed_output_matches_humanize():
+    """Bucketing and memoisation never change the text humanize would produce"""
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    rng = random.Random(42)
+    deltas = [rng.randint(-86400 * 30, 86400 * 800) for _ in range(5000)]
+    deltas += [59, 60, 119, 5399, 5400, 81044, 86399, 86400, 129600]
+    for seconds in deltas:
+        expected = humanize.naturaltime(timedelta(seconds=seconds))
+        assert naturaltime(now - timedelta(seconds=seconds), now) == expected
+
+def test_bucketing_holds_across_unit_boundaries():
+    """Every second around each rounding point and unit change formats as humanize does, both ways in time"""
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    points = [k * 60 + 30 for k in range(60)]                # minutes round at the half minute
+    points += [k * 3600 + 1800 for k in range(1, 24)]        # hours round (half to even) at the half hour
+    points += [k * 3600 for k in range(1, 25)]               # minutes to hours, hours to a day
+    points += [d * 86400 for d in range(2, 800, 7)]          # days, months and years
+    for point in points:
+        for seconds in range(point - 90, point + 90):
+            for signed in (seconds, -seconds):
+                expected = humanize.naturaltime(timedelta(seconds=signed))
+                assert naturaltime(now - timedelta(seconds=signed), now) == expected, signed
+
+def test_accepts_strings_and_epoch_ints():
+    """Legacy string timestamps and epoch seconds still format"""
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    assert naturaltime('2026-01-01 11:00:00', now) == 'an hour ago'
+    assert naturaltime(int((now - datetime(1970, 1, 1)).total_seconds()) - 120, now) == '2 minutes ago'
+    assert naturaltime('not a date', now) == 'not a date'
+    assert naturaltime(None, now) == ''
+    assert naturaltime_many(['2026-01-01 11:59:00', ''], now) == ['a minute ago', '']
+
+def test_converter_parses_sqlite_timestamps():
+    """The registered converter turns CURRENT_TIMESTAMP text into datetimes"""
+    assert parse_timestamp(b'2026-01-01 11:00:00') == datetime(2026, 1, 1, 11, 0, 0)
+    assert parse_timestamp(b'garbage') == 'garbage'
@@ -0,0 +1,151 @@
+import pytest
+import time
+import sys
+import os
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, get_db
+from jobs import JobWorkers, backoff, enqueue, get_job_workers, run_one, run_pending, task
+
+calls = []
+
+@task('test.record')
+def record(value):
+    calls.append(value)
+
+@task('test.explode')
+def explode():
+    raise RuntimeError('boom')
+
+# ---------- Test Setup ----------
+@pytest.fixture
+def client(client):
+    """The shared test client with no recorded task calls"""
+    calls.clear()
+    return client
+
+def job_rows():
+    return get_db().execute('SELECT * FROM jobs ORDER BY id').fetchall()
+
+# ---------- Tests ----------
+
+def test_enqueue_commits_with_caller_and_runs(client):
+    """Jobs become visible on commit and are deleted once they succeed"""
+    with app.app_context():
+        db = get_db()
+        enqueue('test.record', {'value': 1})
+        db.rollback()
+        enqueue('test.record', {'value': 2})
+        db.commit()
+        assert len(job_rows()) == 1
+
+    assert run_pending(app) == 1
+    assert calls == [2]
+    with app.app_context():
+        assert job_rows() == []
+        assert get_job_workers().stats.snapshot()['processed'] >= 1
+
+def test_enqueue_coalesces_by_key(client):
+    """A keyed job is only queued once until a worker picks it up"""
+    with app.app_context():
+        db = get_db()
+        for value in range(3):
+            enqueue('test.record', {'value': value}, key='same')
+        db.commit()
+        assert len(job_rows()) == 1
+
+def test_unknown_task_rejected(client):
+    """Enqueueing an unregistered task fails immediately"""
+    with app.app_context():
+        with pytest.raises(KeyError):
+            enqueue('test.missing')
+
+def test_failed_job_retries_with_backoff_then_dies(client):
+    """Failures are rescheduled with backoff and kept once attempts run out"""
+    with app.app_context():
+        db = get_db()
+        enqueue('test.explode', max_attempts=2)
+        db.commit()
+
+        assert run_one()
+        job = job_rows()[0]
+        assert job['status'] == 'queued' and job['attempts'] == 1
+        assert job['run_at'] > time.time() and 'boom' in job['last_error']
+        assert not run_one()
+
+        db.execute('UPDATE jobs SET run_at = 0')
+        db.commit()
+        assert run_one()
+        job = job_rows()[0]
+        assert job['status'] == 'failed' and job['attempts'] == 2
+
+def test_expired_lease_is_reclaimed(client):
+    """A job whose worker vanished mid-run is claimable again after its lease"""
+    with app.app_context():
+        db = get_db()
+        enqueue('test.record', {'value': 'again'})
+        db.execute("UPDATE jobs SET status = 'running', lease_owner = 'gone', run_at = ?", (time.time() - 1,))
+        db.commit()
+    assert run_pending(app) == 1
+    assert calls == ['again']
+
+def test_backoff_is_capped():
+    """Backoff grows exponentially but never exceeds the cap"""
+    assert 1 <= backoff(1, 2, 300) <= 2
+    assert 8 <= backoff(4, 2, 300) <= 16
+    assert backoff(30, 2, 300) <= 300
+
+def test_comment_indexing_runs_off_request_path(client):
+    """Comments are searchable once the queued indexing job has run"""
+    client.post('/register', data={
+        'email': 'jobs@example.com', 'password': 'ValidPass1!', 'confirm_password': 'ValidPass1!',
+        'first_name': 'Job', 'last_name': 'User', 'employee_id': 'EMP6001', 'role': 'employee'})
+    client.post('/login', data={'email': 'jobs@example.com', 'password': 'ValidPass1!'})
+    client.post('/submit', data={'title': 'Queue ticket', 'description': 'Desc'})
+    client.post('/ticket/1/comment', data={'content': 'Kerberos ticket expired'})
+    client.post('/ticket/1/comment', data={'content': 'Second note'})
+
+    assert b'Queue ticket' not in client.get('/search?q=kerberos').data
+    assert client.get('/healthz').get_json()['jobs']['queued'] == 1
+    run_pending(app)
+    assert b'Queue ticket' in client.get('/search?q=kerberos').data
+
+def test_worker_threads_drain_queue(client):
+    """In-process worker threads pick up jobs without an explicit drain"""
+    workers = JobWorkers(app, workers=2, poll_interval=0.05)
+    with app.app_context():
+        db = get_db()
+        for value in range(5):
+            enqueue('test.record', {'value': value})
+        db.commit()
+    workers.start()
+    try:
+        deadline = time.time() + 5
+        while len(calls) < 5 and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        workers.stop(timeout=5)
+    assert sorted(calls) == [0, 1, 2, 3, 4]
+    assert workers.stats.snapshot()['processed'] == 5
+
+def test_first_request_starts_workers(client, monkeypatch):
+    """Jobs queued before a restart run once the new process serves its first request"""
+    workers = JobWorkers(app, workers=1, poll_interval=0.05)
+    monkeypatch.setitem(app.extensions, 'jobs', workers)
+    with app.app_context():
+        db = get_db()
+        enqueue('test.record', {'value': 'left over'})
+        db.commit()
+    assert workers._threads == []
+
+    monkeypatch.setattr(app, 'testing', False)
+    try:
+        client.get('/login')
+        deadline = time.time() + 5
+        while not calls and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        workers.stop(timeout=5)
+    assert calls == ['left over']
@@ -0,0 +1,162 @@
+import pytest
+import shutil
+import sqlite3
+import sys
+import os
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, init_db, get_db
+from bulk import rebuild_derived
+from migrate import MIGRATIONS_DIR, MigrationError, current_version, discover, upgrade
+
+# ---------- Test Setup ----------
+@pytest.fixture
+def migrations(tmp_path):
+    """A copy of the real migrations that tests can add to"""
+    directory = tmp_path / 'migrations'
+    shutil.copytree(MIGRATIONS_DIR, directory)
+    app.config['MIGRATIONS_DIR'] = str(directory)
+    yield directory
+    app.config['MIGRATIONS_DIR'] = MIGRATIONS_DIR
+
+# ---------- Tests ----------
+
+def test_init_db_applies_every_migration(client):
+    """A fresh database ends at the latest version with planner statistics collected"""
+    with app.app_context():
+        db = get_db()
+        assert current_version(db) == discover()[-1].version
+        assert db.execute('SELECT COUNT(*) FROM sqlite_stat1').fetchone()[0] > 0
+
+    result = app.test_cli_runner().invoke(args=['db', 'upgrade'])
+    assert 'already at version' in result.output
+
+def test_upgrade_keeps_data(client, migrations):
+    """A new migration alters the schema in place instead of recreating it"""
+    client.post('/register', data={
+        'email': 'keep@example.com', 'password': 'ValidPass1!', 'confirm_password': 'ValidPass1!',
+        'first_name': 'Keep', 'last_name': 'Me', 'employee_id': 'EMP7001', 'role': 'employee'})
+    (migrations / '0900_add_user_timezone.sql').write_text(
+        "ALTER TABLE users ADD COLUMN timezone TEXT NOT NULL DEFAULT 'UTC';")
+
+    runner = app.test_cli_runner()
+    assert '  pending  0900_add_user_timezone' in runner.invoke(args=['db', 'status']).output
+    result = runner.invoke(args=['db', 'upgrade'])
+    assert result.exit_code == 0, result.output
+    assert 'upgraded to version 900' in result.output
+
+    with app.app_context():
+        row = get_db().execute('SELECT email, timezone FROM users').fetchone()
+        assert tuple(row) == ('keep@example.com', 'UTC')
+
+def test_failed_sql_migration_rolls_back(client, migrations):
+    """A failing .sql migration leaves no partial changes and is not recorded"""
+    (migrations / '0900_broken.sql').write_text(
+        'CREATE TABLE half_done (id INTEGER);\nINSERT INTO missing_table VALUES (1);')
+    with app.app_context():
+        db = get_db()
+        with pytest.raises(MigrationError, match='0900_broken'):
+            upgrade(db, directory=str(migrations))
+        assert db.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+        assert current_version(db) < 900
+
+def test_python_migration_batches_work(client, migrations):
+    """ctx.backfill walks rowid ranges in batches and ctx.create_index builds the index"""
+    with app.app_context():
+        db = get_db()
+        db.executemany("INSERT INTO tickets (title, description, status) VALUES (?, 'Desc', 'Open')",
+                       [('Ticket %d' % i,) for i in range(25)])
+        db.commit()
+    (migrations / '0900_title_length.py').write_text(
+        'def upgrade(ctx):\n'
+        "    ctx.execute('ALTER TABLE tickets ADD COLUMN title_length INTEGER')\n"
+        "    ctx.backfill('tickets', 'title_length = length(title)', where='title_length IS NULL')\n"
+        "    ctx.create_index('idx_tickets_title_length', 'tickets', 'title_length')\n")
+
+    result = app.test_cli_runner().invoke(args=['db', 'upgrade', '--batch-size', '10', '--pause', '0'])
+    assert result.exit_code == 0, result.output
+    assert 'backfilled 25 rows of tickets' in result.output
+    with app.app_context():
+        db = get_db()
+        assert db.execute('SELECT COUNT(*) FROM tickets WHERE title_length IS NULL').fetchone()[0] == 0
+        plan = db.execute('EXPLAIN QUERY PLAN SELECT id FROM tickets WHERE title_length = 8').fetchall()
+        assert 'idx_tickets_title_length' in plan[0]['detail']
+
+def test_legacy_database_is_stamped(tmp_path, migrations):
+    """A database built from the old schema.sql is treated as the baseline and brought fully up to date"""
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    # 0001 is the pre-migrations schema.sql, minus its DROP TABLE prelude
+    conn.executescript((migrations / '0001_initial.sql').read_text())
+    conn.execute("INSERT INTO users (email, password, role) VALUES ('old@example.com', 'x', 'employee')")
+    conn.execute("INSERT INTO tickets (title, description, status, user_id) VALUES ('Old printer', 'Jammed', 'Open', 1)")
+    conn.execute("INSERT INTO comments (ticket_id, user_id, content) VALUES (1, 1, 'Still jammed')")
+    conn.commit()
+    conn.close()
+    (migrations / '0900_add_note.sql').write_text('ALTER TABLE users ADD COLUMN note TEXT;')
+
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    applied = upgrade(conn, directory=str(migrations), pause=0)
+    later = [m.version for m in discover(str(migrations)) if m.version > 1]
+    assert [m.version for m in applied] == later
+    assert conn.execute('SELECT email FROM users').fetchone()[0] == 'old@example.com'
+    names = [r[0] for r in conn.execute('SELECT name FROM schema_version ORDER BY version')]
+    assert names[0] == 'baseline' and names[-1] == 'add_note'
+    # Derived tables cover the rows that existed before they did
+    assert conn.execute("SELECT rowid FROM ticket_search WHERE ticket_search MATCH 'jammed'").fetchone()[0] == 1
+    assert conn.execute('SELECT ticket_count FROM ticket_stats WHERE user_id = 0').fetchone()[0] == 1
+    assert conn.execute('SELECT comment_count FROM ticket_comment_stats').fetchone()[0] == 1
+    row = conn.execute('SELECT open_count, comment_count FROM user_directory WHERE user_id = 1').fetchone()
+    assert tuple(row) == (1, 1)
+    assert conn.execute('SELECT version FROM tickets').fetchone()[0] == 1
+    conn.close()
+
+def test_legacy_backfills_run_in_batches(tmp_path, migrations):
+    """The counter and search backfills walk small batches and arrive at the same figures as a full rebuild"""
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    conn.executescript((migrations / '0001_initial.sql').read_text())
+    conn.executemany("INSERT INTO users (email, password, role) VALUES (?, 'x', 'employee')",
+                     [('user%d@example.com' % n,) for n in range(5)])
+    conn.executemany("INSERT INTO tickets (title, description, status, user_id) VALUES (?, 'Desc', ?, ?)",
+                     [('Ticket %d' % n, ('Open', 'Closed')[n % 2], n % 5 + 1 if n % 7 else None) for n in range(23)])
+    conn.executemany("INSERT INTO comments (ticket_id, user_id, content) VALUES (?, ?, 'Looked at it')",
+                     [(n % 23 + 1, n % 5 + 1) for n in range(31)])
+    conn.commit()
+    conn.row_factory = sqlite3.Row
+    upgrade(conn, directory=str(migrations), batch_size=3, pause=0)
+
+    def snapshot():
+        return [[tuple(r) for r in conn.execute(sql)] for sql in (
+            'SELECT * FROM ticket_stats ORDER BY user_id, status',
+            'SELECT * FROM ticket_comment_stats ORDER BY ticket_id',
+            'SELECT user_id, open_count, closed_count, comment_count FROM user_directory ORDER BY user_id',
+            'SELECT rowid, title, comments FROM ticket_search ORDER BY rowid')]
+
+    migrated = snapshot()
+    assert len(migrated[3]) == 23 and sum(r[1] for r in migrated[1]) == 31
+    rebuild_derived(conn)
+    assert snapshot() == migrated
+    conn.close()
+
+def test_shipped_database_upgrades(tmp_path):
+    """A copy of the data.db that ships with the repo migrates cleanly to the latest version"""
+    path = str(tmp_path / 'data.db')
+    shutil.copyfile(os.path.join(os.path.dirname(MIGRATIONS_DIR), 'data.db'), path)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    tickets = conn.execute('SELECT COUNT(*) FROM tickets').fetchone()[0]
+    upgrade(conn, pause=0)
+    assert current_version(conn) == discover()[-1].version
+    assert conn.execute('SELECT COUNT(*) FROM tickets').fetchone()[0] == tickets
+    assert conn.execute('SELECT sum(ticket_count) FROM ticket_stats WHERE user_id = 0').fetchone()[0] == tickets
+    conn.close()
+
+def test_duplicate_versions_rejected(migrations):
+    """Two files with the same number are a broken migrations directory"""
+    (migrations / '0001_again.sql').write_text('SELECT 1;')
+    with pytest.raises(MigrationError, match='share version 0001'):
+        discover(str(migrations))
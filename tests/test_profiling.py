@@ -0,0 +1,115 @@
+import pytest
+from collections import OrderedDict
+import logging
+import sys
+import os
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, get_db
+import profiling
+from profiling import Metrics, RequestProfile, full_scans
+from conftest import register_and_login
+
+# ---------- Test Setup ----------
+@pytest.fixture
+def app_config():
+    """Tests flip scan flagging and the slow-request threshold; listing them here restores both"""
+    return {'SQL_FLAG_SCANS': False, 'SLOW_REQUEST_MS': 500}
+
+# ---------- Tests ----------
+
+def test_request_profile_counts_queries(client, monkeypatch):
+    """With SQL_PROFILE_HEADERS on, each request reports its query count and DB time in headers"""
+    register_and_login(client, 'prof@example.com', 'EMP5001')
+    resp = client.get('/dashboard')
+    assert resp.status_code == 200
+    assert 'X-DB-Queries' not in resp.headers and 'X-DB-Time-Ms' not in resp.headers
+
+    monkeypatch.setitem(app.config, 'SQL_PROFILE_HEADERS', True)
+    resp = client.get('/dashboard')
+    assert int(resp.headers['X-DB-Queries']) >= 2
+    assert float(resp.headers['X-DB-Time-Ms']) >= 0
+
+def test_profile_tracks_slowest_statements():
+    """Fetch time is charged to the statement and slowest() sorts by it"""
+    profile = RequestProfile()
+    fast = profile.add('SELECT 1', ())
+    slow = profile.add('SELECT 2', ())
+    profile.spend(fast, 0.001)
+    profile.spend(slow, 0.002)
+    profile.spend(slow, 0.003)
+    assert profile.queries == 2
+    assert profile.slowest(1)[0][1] == 'SELECT 2'
+    assert profile.db_time == pytest.approx(0.006)
+
+def test_full_scan_detection():
+    """Plain SCAN steps are flagged; index and FTS scans are not"""
+    plan = ['SCAN users', 'SCAN t USING INDEX idx_tickets_user_id',
+            'SCAN ticket_search VIRTUAL TABLE INDEX 0:M3', 'SEARCH c USING INDEX x (ticket_id=?)']
+    assert full_scans(plan) == ['SCAN users']
+
+def test_flag_scans_toggle(client, caplog):
+    """With SQL_FLAG_SCANS on, a full table scan is logged and counted in a header"""
+    register_and_login(client, 'scanadmin@example.com', 'EMP5002', role='admin')
+    app.config['SQL_FLAG_SCANS'] = True
+    with caplog.at_level(logging.WARNING, logger='helpdesk.slow'):
+        resp = client.get('/dashboard')
+    assert int(resp.headers['X-SQL-Full-Scans']) >= 1
+    assert 'full table scan' in caplog.text
+
+def test_plan_cache_is_bounded(client, monkeypatch):
+    """Plans are cached per statement text, keeping only the most recently used"""
+    monkeypatch.setattr(profiling, 'PLAN_CACHE_SIZE', 3)
+    monkeypatch.setattr(profiling, '_plan_cache', OrderedDict())
+    profile = RequestProfile()
+    for n in (1, 2, 3, 4, 5, 3):
+        profile.add('SELECT id FROM tickets WHERE id IN (%s)' % ','.join('?' * n), tuple(range(n)))
+    with app.app_context():
+        profiling.check_scans(get_db(), profile)
+    assert [sql.count('?') for sql in profiling._plan_cache] == [4, 5, 3]
+
+def test_slow_request_log_includes_plan(client, caplog):
+    """Requests over SLOW_REQUEST_MS are logged with their slowest queries and plans"""
+    register_and_login(client, 'slow@example.com', 'EMP5003')
+    app.config['SLOW_REQUEST_MS'] = 0
+    with caplog.at_level(logging.WARNING, logger='helpdesk.slow'):
+        client.get('/dashboard')
+    assert 'slow request GET /dashboard' in caplog.text
+    assert 'plan:' in caplog.text
+
+def test_metrics_endpoint(client):
+    """/admin/metrics is admin-only and renders latency histograms"""
+    register_and_login(client, 'metrics@example.com', 'EMP5004')
+    assert client.get('/admin/metrics').status_code == 403
+
+    client.get('/logout')
+    register_and_login(client, 'metricsadmin@example.com', 'EMP5005', role='admin')
+    client.get('/dashboard')
+    resp = client.get('/admin/metrics')
+    assert resp.status_code == 200
+    body = resp.get_data(as_text=True)
+    assert 'helpdesk_request_duration_seconds_bucket{route="dashboard",method="GET",le="+Inf"}' in body
+    assert 'helpdesk_db_queries_total{route="dashboard"}' in body
+    assert '# TYPE helpdesk_fragment_cache_hits counter' in body
+    assert '# TYPE helpdesk_hashing_submitted counter' in body
+    assert '# TYPE helpdesk_hashing_pending gauge' in body
+    assert '# TYPE helpdesk_jobs_processed counter' in body
+    assert '# TYPE helpdesk_jobs_queued gauge' in body
+
+def test_metrics_bearer_token(client, monkeypatch):
+    """Scrapers without a session need the exact METRICS_TOKEN"""
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 's3cret')
+    assert client.get('/admin/metrics').status_code == 403
+    assert client.get('/admin/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    assert client.get('/admin/metrics', headers={'Authorization': 'Bearer s3cret'}).status_code == 200
+
+def test_metrics_histogram_buckets():
+    """Observations land in every bucket at or above their value"""
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.observe('home', 'GET', 0.5)
+    text = metrics.render()
+    assert 'le="0.1"} 0' in text
+    assert 'le="1"} 1' in text
+    assert 'le="+Inf"} 1' in text
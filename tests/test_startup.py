@@ -0,0 +1,119 @@
+import pytest
+import gc
+import json
+import sqlite3
+import sys
+import os
+import time
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, init_db, get_db, create_app
+from migrate import MigrationError
+from startup import StartupTimes, get_startup, precompile_templates
+
+# ---------- Test Setup ----------
+@pytest.fixture
+def client(client, monkeypatch):
+    """The shared test client with fresh per-process startup timings"""
+    monkeypatch.setitem(app.extensions, 'startup', StartupTimes(time.perf_counter()))
+    yield client
+    gc.unfreeze()
+
+# ---------- Tests ----------
+
+def test_templates_compile_into_shared_bytecode_cache(client):
+    """`flask templates compile` creates TEMPLATE_CACHE_DIR and writes every template's bytecode there"""
+    cache_dir = app.config['TEMPLATE_CACHE_DIR']
+    assert not os.path.exists(cache_dir)
+    app.jinja_env.cache.clear()
+
+    result = app.test_cli_runner().invoke(args=['templates', 'compile'])
+    assert result.exit_code == 0, result.output
+    templates = [n for n in os.listdir(os.path.join(app.root_path, 'templates')) if n.endswith('.html')]
+    assert 'compiled %d templates' % len(templates) in result.output
+    assert app.jinja_env.bytecode_cache.directory == cache_dir
+    assert len([n for n in os.listdir(cache_dir) if n.endswith('.cache')]) == len(templates)
+
+    count, _ = precompile_templates(app)
+    assert count == len(templates)
+
+def test_bytecode_cache_waits_for_create_app(client, monkeypatch):
+    """Importing the app and serving requests write nothing; create_app() sets the cache up unless disabled"""
+    cache_dir = app.config['TEMPLATE_CACHE_DIR']
+    assert client.get('/login').status_code == 200
+    assert app.jinja_env.bytecode_cache is None
+    assert not os.path.exists(cache_dir)
+
+    monkeypatch.setitem(app.config, 'TEMPLATE_CACHE_DIR', '')
+    create_app()
+    assert app.jinja_env.bytecode_cache is None
+
+    monkeypatch.setitem(app.config, 'TEMPLATE_CACHE_DIR', cache_dir)
+    monkeypatch.setitem(app.extensions, 'startup', StartupTimes(time.perf_counter()))
+    create_app()
+    assert app.jinja_env.bytecode_cache.directory == cache_dir
+    assert os.path.isdir(cache_dir)
+
+def test_prepare_checks_schema_once(client):
+    """create_app() refuses a database with pending migrations, then does its work only once"""
+    with app.app_context():
+        db = get_db()
+        db.execute('DELETE FROM schema_version WHERE version = (SELECT max(version) FROM schema_version)')
+        db.commit()
+    with pytest.raises(MigrationError, match='pending'):
+        create_app()
+
+    init_db()
+    conn = app.extensions['db_pool'].acquire()
+    assert create_app() is app
+    times = get_startup(app)
+    assert times.boot_seconds > 0 and times.templates > 0
+    # The process that would fork workers no longer holds its SQLite connection
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute('SELECT 1')
+    boot = times.boot_seconds
+    create_app()
+    assert times.boot_seconds == boot
+    assert create_app(asgi=True) is app.extensions['asgi']
+
+def test_first_request_is_timed_per_process(client):
+    """Each process records its own first request; a forked worker starts over"""
+    client.get('/login')
+    client.get('/')
+    first = get_startup(app).first_request
+    assert first['endpoint'] == 'login' and first['ms'] > 0
+    assert client.get('/healthz').get_json()['startup']['first_request'] == first
+
+    if not hasattr(os, 'fork'):
+        pytest.skip('needs fork()')
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            before = get_startup(app).snapshot()
+            app.test_client().get('/')
+            with os.fdopen(write_fd, 'w') as f:
+                json.dump([before, get_startup(app).snapshot()], f)
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        before, after = json.load(f)
+    os.waitpid(pid, 0)
+    assert before['preloaded'] and before['first_request'] is None and before['pid'] == pid
+    assert after['first_request']['endpoint'] == 'home'
+    assert get_startup(app).first_request == first
+
+def test_seed_command_fills_empty_database(client):
+    """Demo data is its own step (`flask seed`), safe to rerun"""
+    runner = app.test_cli_runner()
+    for _ in range(2):
+        result = runner.invoke(args=['seed'])
+        assert result.exit_code == 0, result.output
+    with app.app_context():
+        db = get_db()
+        assert db.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 10
+        assert db.execute('SELECT COUNT(*) FROM tickets').fetchone()[0] == 20
@@ -0,0 +1,102 @@
+import pytest
+import sys
+import os
+
+# Allow importing app from parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app, get_db, search_tickets
+from storage import (PostgresPool, Row, Store, StorageError, get_store, iter_rows,
+                     parse_database_url, to_format_style)
+import migrate
+
+# ---------- Test Setup ----------
+@pytest.fixture
+def postgres():
+    """A pooled connection to the PostgreSQL named by TEST_DATABASE_URL, with a fresh schema"""
+    pytest.importorskip('psycopg')
+    url = os.getenv('TEST_DATABASE_URL')
+    if not url:
+        pytest.skip('TEST_DATABASE_URL is not set')
+    pool = PostgresPool({'DATABASE_URL': url, 'PG_POOL_MIN': 1, 'PG_POOL_MAX': 2, 'PG_POOL_TIMEOUT': 5.0})
+    conn = pool.acquire()
+    migrate.reset(conn)
+    migrate.upgrade(conn)
+    yield conn
+    pool.release(conn)
+    pool.close_all()
+
+# ---------- Tests ----------
+
+def test_parse_database_url():
+    """SQLite file URLs resolve to a path, PostgreSQL URLs pass through, anything else is refused"""
+    assert parse_database_url(None) == ('sqlite', None)
+    assert parse_database_url('sqlite:///tickets.db') == ('sqlite', 'tickets.db')
+    assert parse_database_url('sqlite:////var/lib/tickets.db') == ('sqlite', '/var/lib/tickets.db')
+    assert parse_database_url('postgres://u@db/tickets') == ('postgresql', 'postgres://u@db/tickets')
+    with pytest.raises(StorageError):
+        parse_database_url('mysql://u@db/tickets')
+
+def test_to_format_style():
+    """Placeholders outside string literals become %s and literal percent signs are escaped"""
+    sql = "SELECT '?', title FROM tickets WHERE title LIKE '50%' AND id = ? AND status = 'it''s?'"
+    assert to_format_style(sql) == \
+        "SELECT '?', title FROM tickets WHERE title LIKE '50%%' AND id = %s AND status = 'it''s?'"
+
+def test_row_access_by_name_and_index():
+    """Rows behave like sqlite3.Row for the routes, templates and dict() calls"""
+    row = Row((7, 'Printer'))
+    row._names = {'id': 0, 'title': 1}
+    assert row['title'] == row[1] == 'Printer'
+    assert dict(zip(row.keys(), row)) == {'id': 7, 'title': 'Printer'}
+
+def test_store_round_trip_on_sqlite(client):
+    """The Store covers the per-route reads and writes and returns new ids via RETURNING"""
+    with app.app_context():
+        store = get_store()
+        user_id = store.create_user('store@example.com', 'hash', 'Sto', 'Re', 'EMP8001', 'employee')
+        assert store.user_id_for_employee('EMP8001') == user_id
+        ticket_id = store.create_ticket('Broken printer', 'Jammed again', user_id)
+        comment_id = store.add_comment(ticket_id, user_id, 'Still jammed')
+        store.update_ticket(ticket_id, 'Broken printer on 3F', 'Jammed again')
+        store.close_ticket(ticket_id)
+        store.commit()
+
+        ticket = store.ticket(ticket_id)
+        assert (ticket['title'], ticket['status'], ticket['creator_name']) == ('Broken printer on 3F', 'Closed', 'Sto Re')
+        assert store.comment(comment_id)['author'] == 'Sto Re'
+        assert [c['content'] for c in store.comments(ticket_id)] == ['Still jammed']
+        assert store.comment_total(ticket_id) == 1
+
+        store.delete_ticket(ticket_id)
+        store.commit()
+        assert store.ticket(ticket_id) is None
+
+def test_iter_rows_batches_on_sqlite(client):
+    """Large listings stream through fetchmany without changing the rows returned"""
+    with app.app_context():
+        db = get_db()
+        db.executemany("INSERT INTO tickets (title, description) VALUES (?, 'Desc')",
+                       [('Ticket %d' % i,) for i in range(25)])
+        db.commit()
+        rows = list(iter_rows(db, 'SELECT id, title FROM tickets WHERE id > ? ORDER BY id', (5,), size=7))
+        assert [r['title'] for r in rows] == ['Ticket %d' % i for i in range(5, 25)]
+
+def test_store_and_search_on_postgres(postgres):
+    """The same Store calls, triggers and search work against PostgreSQL"""
+    store = Store(postgres)
+    user_id = store.create_user('pg@example.com', 'hash', 'Post', 'Gres', 'EMP8101', 'employee')
+    ticket_id = store.create_ticket('Broken printer', 'Paper jam on the third floor', user_id)
+    store.add_comment(ticket_id, user_id, 'Replaced the toner')
+    store.commit()
+
+    assert store.ticket(ticket_id)['version'] == 2
+    assert store.comment_total(ticket_id) == 1
+    directory = postgres.execute('SELECT open_count, comment_count FROM user_directory WHERE user_id = ?',
+                                 (user_id,)).fetchone()
+    assert tuple(directory) == (1, 1)
+
+    rows, more = search_tickets(postgres, 'print jam')
+    assert [r['id'] for r in rows] == [ticket_id] and not more
+    assert '\x02' in rows[0]['snippet']
+    assert len(list(iter_rows(postgres, 'SELECT id FROM tickets', size=1))) == 1